@@ -1,7 +1,11 @@
 import os
 import pybamm
 import random
-from utils.resize_gif import resize_gif
+import itertools
+from utils.gif_encoder import encode_gif
+from utils.frame_renderer import QuickPlotFrames
+from utils.parallel_solver import parallel_solve
+from utils.parameter_registry import get_metadata
 from utils.parameter_value_generator import parameter_value_generator
 
 
@@ -49,6 +53,27 @@ class ComparisonGenerator:
             default : None
             A list of varied values which will override the default random values. To be
             used while replying.
+        solution_cache : :class:`utils.solution_cache.SolutionCache`
+            default : None
+            Cache from which already solved configurations are loaded instead of
+            being solved again. The number of simulations loaded from it by the
+            last `solve` is kept in `self.cache_hits`.
+        output_dir : str
+            default : "."
+            Directory in which the GIF is written. Comparisons generated at the
+            same time should use different directories.
+        processes : int
+            default : 1
+            Number of processes in which the (model, parameter values) pairs are
+            solved and the frames of the GIF are rendered. The pairs are solved
+            with pybamm.BatchStudy in this process if 1, and as separate
+            simulations in a pool of processes otherwise (None uses one process
+            per pair, capped by the number of CPUs).
+        media_stream : :class:`twitter_api.upload.MediaStream`
+            default : None
+            Stream to which the GIF is uploaded while it is encoded, see
+            `utils.gif_encoder.encode_gif`. The media id of the upload is stored in
+            `self.gif_settings`.
     """
 
     def __init__(
@@ -61,6 +86,10 @@ class ComparisonGenerator:
         number=None,
         param_to_vary_info=None,
         varied_values_override=None,
+        solution_cache=None,
+        output_dir=".",
+        processes=1,
+        media_stream=None,
     ):
         self.models_for_comp = models_for_comp
         self.chemistry = chemistry
@@ -82,7 +111,7 @@ class ComparisonGenerator:
             if param_to_vary_info is not None
             else None
         )
-        self.parameter_values = pybamm.ParameterValues(self.chemistry)
+        self.default_current = get_metadata(self.chemistry)["default current"]
         self.experiment = (
             dict(list(enumerate([pybamm.Experiment(self.cycle * self.number)])))
             if self.cycle is not None
@@ -91,6 +120,13 @@ class ComparisonGenerator:
         self.comparison_dict = {}
         self.params = params
         self.varied_values_override = varied_values_override
+        self.solution_cache = solution_cache
+        self.output_dir = output_dir
+        self.plot = os.path.join(output_dir, "plot.gif")
+        self.processes = processes
+        self.media_stream = media_stream
+        self.gif_settings = None
+        self.cache_hits = 0
 
     def calculate_t_end(self, parameter_values_for_comp, force=False):
         """
@@ -117,35 +153,143 @@ class ComparisonGenerator:
                     for k, item in parameter_values_for_comp.items()
                 ]
             )
-            factor = min_curr_value / self.parameter_values["Current function [A]"]
+            factor = min_curr_value / self.default_current
             t_end = (1 / factor * 1.1) * 3600
         else:
             t_end = 3700
 
         return t_end
 
-    def create_gif(self, batch_study, testing=False):
+    def solve(self, parameter_values_for_comp, t_eval=None):
         """
-        Create and resize a GIF.
+        Solves every (model, parameter values) pair of the comparison. The pairs
+        which have been solved before are loaded from `solution_cache`, and only
+        the other ones are solved.
 
         Parameters
         ----------
-        batch_study : :class:`pybamm.BatchStudy`
-            Object of BatchStudy.
+            parameter_values_for_comp : dict
+                Of the form -
+                {
+                    0: pybamm.ParameterValues,
+                    1: pybamm.ParameterValues
+                }
+            t_eval : list
+                default : None
+                Time span of the simulation. Provide only when the comparison does
+                not include an experiment.
+
+        Returns
+        -------
+            solutions : list
+                Solutions in the order of pybamm.BatchStudy's permutations, whether
+                they were solved with pybamm.BatchStudy or in a pool of processes.
+        """
+        # pybamm.BatchStudy iterates over the models first and then over the
+        # parameter values
+        pairs = list(
+            itertools.product(
+                self.models_for_comp.values(), parameter_values_for_comp.values()
+            )
+        )
+
+        solutions = [None] * len(pairs)
+        if self.solution_cache is not None:
+            keys = [
+                self.solution_cache.generate_key(
+                    model,
+                    self.chemistry,
+                    params,
+                    cycle=self.cycle,
+                    number=self.number,
+                    t_eval=t_eval,
+                )
+                for model, params in pairs
+            ]
+            solutions = [self.solution_cache.get(key) for key in keys]
+
+        # only the pairs which were not solved before are solved
+        missing = [i for i, solution in enumerate(solutions) if solution is None]
+        self.cache_hits = len(pairs) - len(missing)
+        if not missing:
+            return solutions
+
+        if self.processes == 1:
+            # every missing pair is a simulation of its own, in the same order
+            batch_study = pybamm.BatchStudy(
+                models=dict(enumerate(pairs[i][0] for i in missing)),
+                parameter_values=dict(enumerate(pairs[i][1] for i in missing)),
+                experiments=(
+                    dict.fromkeys(range(len(missing)), self.experiment[0])
+                    if self.experiment is not None
+                    else None
+                ),
+            )
+
+            if self.is_experiment:
+                if self.chemistry == "Ai2020":
+                    batch_study.solve(calc_esoh=False)
+                else:
+                    batch_study.solve()
+            else:
+                batch_study.solve(t_eval)
+
+            new_solutions = [sim.solution for sim in batch_study.sims]
+        else:
+            # solve one simulation per missing pair at the same time
+            if self.is_experiment:
+                experiment = self.experiment[0]
+                if self.chemistry == "Ai2020":
+                    solve_kwargs = {"calc_esoh": False}
+                else:
+                    solve_kwargs = {}
+            else:
+                experiment = None
+                solve_kwargs = {"t_eval": t_eval}
+
+            jobs = [
+                (pairs[i][0], pairs[i][1], experiment, solve_kwargs) for i in missing
+            ]
+            new_solutions = parallel_solve(jobs, self.processes)
+
+        for i, solution in zip(missing, new_solutions):
+            solutions[i] = solution
+            if self.solution_cache is not None:
+                self.solution_cache.put(keys[i], solution)
+
+        return solutions
+
+    def create_gif(self, quick_plot, testing=False, processes=1, adaptive=True):
+        """
+        Create a GIF at `self.plot`, encoded to fit in Twitter's size limit. The
+        settings used to encode it are stored in `self.gif_settings`.
+
+        Parameters
+        ----------
+        quick_plot : :class:`pybamm.QuickPlot`
+            QuickPlot of the solutions to be compared.
         testing : bool
             default : False
             To be used while testing to generate less number of plots.
+        processes : int
+            default : 1
+            Number of processes in which the frames are rendered, None uses one
+            process per CPU. The GIF is the same whatever the number of processes.
+        adaptive : bool
+            default : True
+            If the frames are dense where the solutions change quickly and sparse
+            where they barely change, with at most 80 frames (3 while testing).
+            The frames are evenly spaced in time otherwise.
         """
-        if not testing:
-            batch_study.create_gif()
-        else:
-            batch_study.create_gif(number_of_images=3, duration=1)
+        number_of_images, duration = (80, 100) if not testing else (3, 1000)
 
-        # resizing the GIF for Twitter
-        resize_gif("plot.gif", resize_to=(1440, 1440))
-
-        if os.path.getsize("plot.gif") >= 15728640:  # pragma: no cover
-            resize_gif("plot.gif", resize_to=(1080, 1080))
+        # the frames are rendered in memory at the resolution chosen by the
+        # encoder, and encoded straight into the GIF with the best settings which
+        # fit in Twitter's limit
+        frames = QuickPlotFrames(
+            quick_plot, number_of_images, duration, processes, adaptive
+        )
+        self.gif_settings = encode_gif(frames, self.plot, stream=self.media_stream)
 
     def model_comparison(self, testing=False):
         """
@@ -155,23 +299,13 @@ class ComparisonGenerator:
         # dictionary for pybamm.BatchStudy
         parameter_values_for_comp = dict(list(enumerate([self.params])))
 
-        batch_study = pybamm.BatchStudy(
-            models=self.models_for_comp,
-            parameter_values=parameter_values_for_comp,
-            experiments=self.experiment,
-            permutations=True,
-        )
-
         if self.is_experiment:
-            if self.chemistry == "Ai2020":
-                batch_study.solve(calc_esoh=False)
-            else:
-                batch_study.solve()
+            solutions = self.solve(parameter_values_for_comp)
         else:
             t_end = self.calculate_t_end(parameter_values_for_comp, force=True)
-            batch_study.solve([0, t_end])
+            solutions = self.solve(parameter_values_for_comp, [0, t_end])
 
-        self.create_gif(batch_study, testing)
+        self.create_gif(pybamm.QuickPlot(solutions), testing, self.processes)
 
         self.comparison_dict.update(
             {
@@ -246,26 +380,16 @@ class ComparisonGenerator:
         # for pybamm.BatchStudy
         parameter_values_for_comp = dict(list(enumerate(param_list)))
 
-        batch_study = pybamm.BatchStudy(
-            models=self.models_for_comp,
-            parameter_values=parameter_values_for_comp,
-            experiments=self.experiment,
-            permutations=True,
-        )
-
         if self.is_experiment:
-            if self.chemistry == "Ai2020":
-                batch_study.solve(calc_esoh=False)
-            else:
-                batch_study.solve()
+            solutions = self.solve(parameter_values_for_comp)
         else:
             t_end = self.calculate_t_end(parameter_values_for_comp)
-            batch_study.solve([0, t_end])
+            solutions = self.solve(parameter_values_for_comp, [0, t_end])
 
-        # call the plot method first to pass labels
-        batch_study.plot(labels=labels, testing=True)
-
-        self.create_gif(batch_study, testing)
+        # pass the labels to be used in the GIF
+        self.create_gif(
+            pybamm.QuickPlot(solutions, labels=labels), testing, self.processes
+        )
 
         self.comparison_dict.update(
             {"varied_values": varied_values, "params": parameter_values_for_comp}
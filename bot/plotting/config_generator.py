@@ -1,5 +1,7 @@
 import random
 import pybamm
+from utils.model_factory import build_model
+from utils.parameter_registry import get_parameter_values
 from experiment.experiment_generator import experiment_generator
 from utils.degradation_parameter_generator import degradation_parameter_generator
 from utils.parameter_value_generator import parameter_value_generator
@@ -12,6 +14,17 @@ chemistries = [
     "OKane2022"
 ]
 
+# chemistry of the degradation comparisons, use only Mohtat2020 till others are
+# fixed
+degradation_chemistry = "Mohtat2020"
+
+# possible models for the bot, only the models which are used are built
+model_classes = [
+    pybamm.lithium_ion.DFN,
+    pybamm.lithium_ion.SPM,
+    pybamm.lithium_ion.SPMe,
+]
+
 # possible "particle mechanics" for the bot, to be used with Ai2020 parameters
 particle_mechanics_list = [
     "swelling only",
@@ -75,6 +88,7 @@ def config_generator(
         "number_of_comp": None,
         "degradation_mode": None,
     },
+    cost_estimator=None,
 ):
     """
     Generates a random configuration to plot.
@@ -87,6 +101,12 @@ def config_generator(
         test_config : dict
             Should be used while testing to deterministically test this
             function.
+        cost_estimator : :class:`utils.cost_estimator.CostEstimator`
+            default : None
+            Estimator of the runtime of the configuration. The number of cycles
+            is reduced to fit in the budget of the estimator, and a configuration
+            which does not fit with a single cycle raises
+            :class:`utils.cost_estimator.CostExceeded`.
 
     Returns
     -------
@@ -99,12 +119,11 @@ def config_generator(
     # don't select randomly if testing
     if test_config["chemistry"] is not None:
         chemistry = test_config["chemistry"]
-    # use only Mohtat2020 and SPM till others are fixed
     elif choice == "degradation comparison":
-        chemistry = "Mohtat2020"
+        chemistry = degradation_chemistry
     else:
         chemistry = random.choice(chemistries)
-    parameter_values = pybamm.ParameterValues(chemistry)
+    parameter_values = get_parameter_values(chemistry)
 
     # choose random degradation for a degradation comparison
     if choice == "degradation comparison":
@@ -152,13 +171,6 @@ def config_generator(
     else:
         model_options = None
 
-    # list of all the possible models
-    models = [
-        pybamm.lithium_ion.DFN(options=model_options),
-        pybamm.lithium_ion.SPM(options=model_options),
-        pybamm.lithium_ion.SPMe(options=model_options),
-    ]
-
     # choose random configuration for no degradation
     if choice == "model comparison" or choice == "parameter comparison":
 
@@ -171,9 +183,13 @@ def config_generator(
         elif choice == "parameter comparison":
             number_of_comp = 1
 
-        # selecting the models for comparison
-        random.shuffle(models)
-        models_for_comp = models[:number_of_comp]
+        # selecting the models for comparison and building only them
+        classes_for_comp = list(model_classes)
+        random.shuffle(classes_for_comp)
+        models_for_comp = [
+            build_model(model_class, model_options)
+            for model_class in classes_for_comp[:number_of_comp]
+        ]
         models_for_comp = dict(list(enumerate(models_for_comp)))
 
         # if the comparison should be made with an experiment
@@ -189,7 +205,7 @@ def config_generator(
             number = random.randint(1, 3)
             # generating parameter values with varied "Ambient temperature [K]"
             params = parameter_value_generator(
-                parameter_values.copy(),
+                parameter_values,
                 {
                     "Ambient temperature [K]": (265, 355),
                 },
@@ -200,7 +216,7 @@ def config_generator(
             # generating parameter values with varied "Ambient temperature [K]" and
             # "Current function [A]"
             params = parameter_value_generator(
-                parameter_values.copy(),
+                parameter_values,
                 {
                     "Current function [A]": (None, None),
                     "Ambient temperature [K]": (265, 355),
@@ -236,8 +252,8 @@ def config_generator(
 
     elif choice == "degradation comparison":
 
-        # choosing a random model
-        model = models[1]
+        # use only SPM till others are fixed
+        model = build_model(pybamm.lithium_ion.SPM, model_options)
 
         # choosing a random experiment
         cycle = experiment_generator()
@@ -270,4 +286,9 @@ def config_generator(
             }
         )
 
+    # reduce the number of cycles (or reject the configuration) before anything
+    # is solved
+    if cost_estimator is not None:
+        cost_estimator.fit(choice, config)
+
     return config
@@ -1,6 +1,184 @@
+import os
+import math
+import time
 import pybamm
 import numpy as np
+import multiprocessing
 import matplotlib.pyplot as plt
+from utils.parallel_solver import parallel_solve
+from utils.progress_callback import ProgressCallback, TimeBudgetExceeded
+
+
+def chunk_experiment(experiment, start, end):
+    """
+    Creates an experiment with some of the cycles of another experiment.
+
+    Parameters
+    ----------
+        experiment : :class:`pybamm.Experiment`
+        start : int
+            Index of the first cycle.
+        end : int
+            Index after the last cycle.
+
+    Returns
+    -------
+        experiment : :class:`pybamm.Experiment`
+    """
+    operating_conditions, *args = experiment.args
+
+    return pybamm.Experiment(operating_conditions[start:end], *args)
+
+
+def trim_solution(solution, keep, last_state=False):
+    """
+    Drops the full solutions of the cycles which shouldn't be kept from the
+    solution of a chunk of an experiment. pybamm keeps the first cycle of every
+    solve (and the last cycle of a chunk is kept to continue from it), so a chunked
+    experiment would otherwise keep a few cycles in full per chunk.
+
+    Parameters
+    ----------
+        solution : :class:`pybamm.Solution`
+            Solution of the cycles completed so far.
+        keep : set
+            Numbers (starting at 1) of the cycles whose full solutions are kept.
+        last_state : bool
+            default : False
+            If the solution is replaced by its final state (carrying the kept
+            cycles and the summary variables of every cycle), which is all the
+            next chunk needs to continue from it.
+
+    Returns
+    -------
+        solution : :class:`pybamm.Solution`
+    """
+    cycles = [
+        cycle if cycle_number in keep else None
+        for cycle_number, cycle in enumerate(solution.cycles, start=1)
+    ]
+
+    if last_state:
+        all_summary_variables = solution.all_summary_variables
+        all_first_states = solution.all_first_states
+        solution = solution.last_state
+        solution.set_summary_variables(all_summary_variables)
+        solution.all_first_states = all_first_states
+    solution.cycles = cycles
+
+    return solution
+
+
+def solve_variant(
+    model,
+    parameter_values,
+    experiment,
+    solve_kwargs,
+    callback,
+    checkpoint_store=None,
+    checkpoint_key=None,
+    checkpoint_every=50,
+    keep_simulation=False,
+):
+    """
+    Solves a single variant of a degradation comparison, in this process or in a
+    worker process. With a checkpoint store, the experiment is solved in chunks of
+    `checkpoint_every` cycles, each one starting from the solution of the cycles
+    completed before it, and that solution is stored after every chunk. A variant
+    which has a checkpoint continues from it instead of starting over. Only the
+    cycles asked for by the "save_at_cycles" of `solve_kwargs` (and the first one)
+    are kept in the solutions of the chunks, see `trim_solution`.
+
+    Parameters
+    ----------
+        model : :class:`pybamm.BaseBatteryModel`
+        parameter_values : :class:`pybamm.ParameterValues`
+        experiment : :class:`pybamm.Experiment`
+        solve_kwargs : dict
+            Keyword arguments passed to `pybamm.Simulation.solve`.
+        callback : :class:`utils.progress_callback.ProgressCallback`
+        checkpoint_store : :class:`utils.checkpoint_store.CheckpointStore`
+            default : None
+            Store in which the checkpoints are kept, the experiment is solved in
+            one go if None.
+        checkpoint_key : str
+            default : None
+            Key of the checkpoints of this variant.
+        checkpoint_every : int
+            default : 50
+            Number of cycles solved between 2 checkpoints.
+        keep_simulation : bool
+            default : False
+            If the last solved simulation is returned.
+
+    Returns
+    -------
+        solution : :class:`pybamm.Solution` or None
+            None if the experiment was stopped by `callback`.
+        summary_variables : :class:`pybamm.FuzzyDict`
+            Summary variables of the completed cycles.
+        sim : :class:`pybamm.Simulation` or None
+            The last solved simulation if `keep_simulation` is True.
+    """
+    number_of_cycles = len(experiment.cycle_lengths)
+    chunk_size = number_of_cycles if checkpoint_store is None else checkpoint_every
+
+    solution = None
+    if checkpoint_store is not None:
+        solution = checkpoint_store.get(checkpoint_key)
+        if solution is not None:
+            callback.resume(solution)
+
+    while True:
+        completed = len(solution.all_summary_variables) if solution is not None else 0
+        end = min(completed + chunk_size, number_of_cycles)
+
+        kwargs = dict(solve_kwargs)
+        save_at_cycles = kwargs.get("save_at_cycles")
+        keep = None
+        if chunk_size < number_of_cycles and save_at_cycles is not None:
+            if isinstance(save_at_cycles, int):
+                save_at_cycles = list(
+                    range(save_at_cycles, number_of_cycles + 1, save_at_cycles)
+                )
+            # the cycles which are kept once the chunk is solved
+            keep = set(save_at_cycles) | {1}
+            # the next chunk starts from the last saved state, so the last cycle
+            # of every chunk is saved (and dropped with the other cycles which
+            # weren't asked for once the chunk is solved)
+            kwargs.update({"save_at_cycles": list(save_at_cycles) + [end]})
+
+        sim = pybamm.Simulation(
+            model=model,
+            experiment=experiment
+            if chunk_size == number_of_cycles
+            else chunk_experiment(experiment, completed, end),
+            parameter_values=parameter_values,
+        )
+        try:
+            sim.solve(callbacks=callback, starting_solution=solution, **kwargs)
+        except TimeBudgetExceeded:
+            return (
+                None,
+                callback.summary_variables(),
+                sim if keep_simulation else None,
+            )
+        solution = sim.solution
+
+        # the experiment is over once every cycle is solved, or if it stopped
+        # earlier (because of its termination or an infeasible step), even on the
+        # last cycle of the chunk
+        finished = end == number_of_cycles or callback.termination is not None
+        if keep is not None:
+            solution = trim_solution(solution, keep, last_state=not finished)
+        if finished:
+            break
+        checkpoint_store.put(checkpoint_key, solution)
+
+    if checkpoint_store is not None:
+        checkpoint_store.remove(checkpoint_key)
+
+    return solution, solution.summary_variables, sim if keep_simulation else None
 
 
 class DegradationComparisonGenerator:
@@ -27,6 +205,49 @@ class DegradationComparisonGenerator:
             Experiment cycle to be used in the comparison.
         number : numerical
             Number with which the cycle is multiplied.
+        solution_cache : :class:`utils.solution_cache.SolutionCache`
+            default : None
+            Cache from which already solved configurations are loaded instead of
+            being solved again. The number of variants loaded from it (or
+            continued from a checkpoint) by the last `solve` is kept in
+            `self.cache_hits`.
+        output_dir : str
+            default : "."
+            Directory in which the plot is saved.
+        processes : int
+            default : 1
+            Number of processes in which the variants are solved. The variants are
+            solved one after another in this process if 1, and in a pool of
+            processes otherwise (None uses one process per variant, capped by the
+            number of CPUs).
+        save_at_cycles : int or list
+            default : None
+            Cycles whose full solutions are kept, passed to pybamm.Simulation.solve
+            (the first cycle is always kept). Every cycle is kept if None. The
+            summary variables of every cycle are kept either way, so the plot only
+            needs these, and keeping a few cycles makes the memory used by long
+            experiments flat instead of growing with the number of cycles.
+        time_budget : numerical
+            default : None
+            Wall-clock time (in seconds) in which the variants should be solved.
+            The budget is shared between the variants solved one after another,
+            and a variant which runs out of time is stopped at the end of its
+            current cycle and plotted with the cycles completed so far. Never
+            stopped if None.
+        report : callable
+            default : None
+            Called with the progress of a variant after every cycle, see
+            `utils.progress_callback.ProgressCallback`. The progress is logged if
+            None.
+        checkpoint_store : :class:`utils.checkpoint_store.CheckpointStore`
+            default : None
+            Store in which the solutions of the completed cycles are checkpointed
+            every `checkpoint_every` cycles. A variant which has a checkpoint (for
+            example because the process solving it was killed) continues from it.
+            Not checkpointed if None.
+        checkpoint_every : int
+            default : 50
+            Number of cycles solved between 2 checkpoints.
     """
 
     def __init__(
@@ -37,6 +258,14 @@ class DegradationComparisonGenerator:
         degradation_parameter,
         cycle,
         number,
+        solution_cache=None,
+        output_dir=".",
+        processes=1,
+        save_at_cycles=None,
+        time_budget=None,
+        report=None,
+        checkpoint_store=None,
+        checkpoint_every=50,
     ):
         self.model = model
         self.chemistry = chemistry
@@ -44,6 +273,16 @@ class DegradationComparisonGenerator:
         self.degradation_parameter = degradation_parameter
         self.cycle = cycle
         self.number = number
+        self.solution_cache = solution_cache
+        self.plot = os.path.join(output_dir, "plot.png")
+        self.processes = processes
+        self.save_at_cycles = save_at_cycles
+        self.time_budget = time_budget
+        self.report = report
+        self.checkpoint_store = checkpoint_store
+        self.checkpoint_every = checkpoint_every
+        self.stopped_early = []
+        self.cache_hits = 0
 
     def create_simulation(self, experiment):
         """
@@ -57,44 +296,175 @@ class DegradationComparisonGenerator:
         Returns
         -------
             sim : :class:`pybamm.Simulation`
+                The last solved simulation, None if all the solutions were loaded
+                from `solution_cache` or if the variants were solved in a pool of
+                processes.
             solutions_and_labels : list
                 Of the form -
                 [
-                    [:class:`pybamm.Solution`, label],
-                    [:class:`pybamm.Solution`, label]
+                    [:class:`pybamm.Solution`, label, summary_variables],
+                    [:class:`pybamm.Solution`, label, summary_variables]
                 ]
+                The solution is None if the variant was stopped because it ran out
+                of time, in which case its label is added to `self.stopped_early`.
         """
-        solutions_and_labels = []
+        if self.chemistry == "Ai2020":  # pragma: no cover
+            solve_kwargs = {"calc_esoh": False}
+        elif self.chemistry == "Mohtat2020":
+            solve_kwargs = {"initial_soc": 1}
+        else:  # pragma: no cover
+            solve_kwargs = {}
+        if self.save_at_cycles is not None:
+            solve_kwargs.update({"save_at_cycles": self.save_at_cycles})
+
+        sim = None
+        solutions = [None] * len(self.param_values)
+        summary_variables = [None] * len(self.param_values)
+        labels = [self.generate_label(params) for params in self.param_values]
+        # the checkpoints and the solutions are keyed in the same way
+        keys = [
+            self.generate_key(params, experiment) for params in self.param_values
+        ]
+
+        if self.solution_cache is not None:
+            for i in range(0, len(self.param_values)):
+                solutions[i] = self.solution_cache.get(keys[i])
+
+        # variants which are not in the cache
+        unsolved = [i for i in range(0, len(self.param_values)) if solutions[i] is None]
+        resumed = [
+            i
+            for i in unsolved
+            if self.checkpoint_store is not None
+            and os.path.exists(self.checkpoint_store.path(keys[i]))
+        ]
+        self.cache_hits = len(self.param_values) - len(unsolved) + len(resumed)
+
+        # the variants solved at the same time share the time budget, and the
+        # variants solved one after another split it evenly
+        if self.processes == 1:
+            processes = 1
+        elif self.processes is None:
+            processes = min(len(unsolved), multiprocessing.cpu_count())
+        else:
+            processes = self.processes
+        start_time = time.time()
+        waves = math.ceil(len(unsolved) / max(processes, 1))
+        callbacks = {}
+        for k, i in enumerate(unsolved):
+            deadline = None
+            if self.time_budget is not None:
+                deadline = start_time + self.time_budget * (k // processes + 1) / waves
+            callbacks.update({i: ProgressCallback(labels[i], deadline, self.report)})
+
+        if self.processes == 1:
+            # iterate through all the parameter values, plugging one of them in the
+            # simulation every time
+            for i in unsolved:
+                solutions[i], summary_variables[i], sim = solve_variant(
+                    self.model,
+                    self.param_values[i],
+                    experiment,
+                    solve_kwargs,
+                    callbacks[i],
+                    self.checkpoint_store,
+                    keys[i],
+                    self.checkpoint_every,
+                    keep_simulation=True,
+                )
+        else:
+            # the variants are independent, so they are solved at the same time and
+            # gathered back in order
+            jobs = [
+                (
+                    self.model,
+                    self.param_values[i],
+                    experiment,
+                    solve_kwargs,
+                    callbacks[i],
+                    self.checkpoint_store,
+                    keys[i],
+                    self.checkpoint_every,
+                )
+                for i in unsolved
+            ]
+            for i, (solution, variant_summary_variables, _) in zip(
+                unsolved, parallel_solve(jobs, self.processes, solve_variant)
+            ):
+                solutions[i] = solution
+                summary_variables[i] = variant_summary_variables
+
+        self.stopped_early = [labels[i] for i in unsolved if solutions[i] is None]
+
+        if self.solution_cache is not None:
+            # the variants which were stopped are not complete, so not cached
+            for i in unsolved:
+                if solutions[i] is not None:
+                    self.solution_cache.put(keys[i], solutions[i])
 
-        # iterate through all the parameter values, plugging one of them in the
-        # simulation every time
         for i in range(0, len(self.param_values)):
+            if summary_variables[i] is None:
+                summary_variables[i] = solutions[i].summary_variables
+
+        # storing solutions with the corresponding labels
+        solutions_and_labels = [
+            [solutions[i], labels[i], summary_variables[i]]
+            for i in range(0, len(self.param_values))
+        ]
 
-            sim = pybamm.Simulation(
-                model=self.model,
-                experiment=experiment,
-                parameter_values=self.param_values[i],
-            )
-            if self.chemistry == "Ai2020":  # pragma: no cover
-                sim.solve(calc_esoh=False)
-            elif self.chemistry == "Mohtat2020":
-                sim.solve(initial_soc=1)
-            else:  # pragma: no cover
-                sim.solve()
-            solution = sim.solution
-
-            # storing solution with the corresponding label
-            val = self.param_values[i][self.degradation_parameter]
-            solutions_and_labels.append(
-                [
-                    solution,
-                    self.degradation_parameter
-                    + ": "
-                    + ("{:.5e}".format(val) if val > 10 or val < 1 else str(val)),
-                ]
-            )
         return sim, solutions_and_labels
 
+    def generate_key(self, params, experiment):
+        """
+        Generates the key of a variant in `solution_cache` and `checkpoint_store`.
+
+        Parameters
+        ----------
+            params : :class:`pybamm.ParameterValues`
+                Parameter values of the variant.
+            experiment : :class:`pybamm.Experiment`
+                The experiment to be simulated.
+
+        Returns
+        -------
+            key : str or None
+                None if there is neither a cache nor a checkpoint store.
+        """
+        store = self.solution_cache or self.checkpoint_store
+        if store is None:
+            return None
+
+        return store.generate_key(
+            self.model,
+            self.chemistry,
+            params,
+            cycle=self.cycle,
+            number=self.number,
+            termination=experiment.termination,
+            save_at_cycles=self.save_at_cycles,
+        )
+
+    def generate_label(self, params):
+        """
+        Generates the label of a variant.
+
+        Parameters
+        ----------
+            params : :class:`pybamm.ParameterValues`
+                Parameter values of the variant.
+
+        Returns
+        -------
+            label : str
+        """
+        val = params[self.degradation_parameter]
+
+        return (
+            self.degradation_parameter
+            + ": "
+            + ("{:.5e}".format(val) if val > 10 or val < 1 else str(val))
+        )
+
     def solve(self):
         """
         Solves an experiment with the given configuration.
@@ -116,10 +486,14 @@ class DegradationComparisonGenerator:
 
         self.solutions = [x[0] for x in solutions_and_labels_sorted]
         self.labels = [x[1] for x in solutions_and_labels_sorted]
+        # the summary variables of every completed cycle, which is all the plot
+        # needs
+        self.summary_variables = [x[2] for x in solutions_and_labels_sorted]
 
     def generate_summary_variables(self):
         """
-        Creates and saves a picture of summary variable comparison plot.
+        Creates and saves a picture of summary variable comparison plot at
+        `self.plot`.
         """
         if self.chemistry == "Ai2020":  # pragma: no cover
             vars_to_plot = [
@@ -150,18 +524,18 @@ class DegradationComparisonGenerator:
         # find max cycle number
         x_max = max(
             [
-                solution.summary_variables["Cycle number"][-1]
-                for solution in self.solutions
+                summary_variables["Cycle number"][-1]
+                for summary_variables in self.summary_variables
             ]
         )
 
         # plot the summary variables
         for var, ax in zip(vars_to_plot, axes.flat):
             # iterate through the solutions
-            for solution in self.solutions:
+            for summary_variables in self.summary_variables:
                 ax.plot(
-                    solution.summary_variables["Cycle number"],
-                    solution.summary_variables[var],
+                    summary_variables["Cycle number"],
+                    summary_variables[var],
                 )
             ax.set_xlabel("Cycle number")
             ax.set_ylabel(var)
@@ -170,4 +544,7 @@ class DegradationComparisonGenerator:
         # save the generated plot
         fig.tight_layout()
         fig.legend(self.labels, loc="lower left", bbox_to_anchor=(0.77, -0.08))
-        plt.savefig("plot.png", dpi=300, bbox_inches="tight")
+        fig.savefig(self.plot, dpi=300, bbox_inches="tight")
+        # the workers are long-lived, close the figure so that it does not
+        # pile up in pyplot's figure manager
+        plt.close(fig)
@@ -1,11 +1,31 @@
+import time
 import pybamm
 import logging
-from plotting.config_generator import config_generator
+from utils.model_factory import build_model, from_specs
+from utils.parameter_registry import load_parameter_values
+from plotting.config_generator import (
+    chemistries,
+    model_classes,
+    config_generator,
+    degradation_chemistry,
+)
 from plotting.comparison_generator import ComparisonGenerator
 from plotting.degradation_comparison_generator import DegradationComparisonGenerator
 
 
-def random_plot_generator(return_dict, choice, reply_config=None, testing=False):
+def random_plot_generator(
+    return_dict,
+    choice,
+    reply_config=None,
+    testing=False,
+    solution_cache=None,
+    output_dir=".",
+    processes=1,
+    time_budget=None,
+    checkpoint_store=None,
+    cost_estimator=None,
+    media_stream=None,
+):
     """
     Generates a random plot.
 
@@ -18,7 +38,46 @@ def random_plot_generator(return_dict, choice, reply_config=None, testing=False)
             "degradation comparison".
         reply_config : dict
             Should be passed when the bot is replying to a requested
-            simulation tweet.
+            simulation tweet, or to solve a given configuration again. The
+            Exceptions raised while plotting it are raised, instead of trying
+            another random configuration.
+        solution_cache : :class:`utils.solution_cache.SolutionCache`
+            default : None
+            Cache from which already solved configurations are loaded instead of
+            being solved again.
+        output_dir : str
+            default : "."
+            Directory in which the plot is generated. The path of the plot, its
+            media type and the settings used to encode it (if it is a GIF) are
+            stored in `return_dict` as "plot", "media_type" and "plot_settings".
+        processes : int
+            default : 1
+            Number of processes in which the simulations of a comparison are
+            solved and the frames of its GIF are rendered. None uses one process
+            per simulation (capped by the number of CPUs) and one process per CPU
+            for the frames.
+        time_budget : numerical
+            default : None
+            Wall-clock time (in seconds) in which the simulations of a degradation
+            comparison should be solved. The simulations which run out of time are
+            plotted with the cycles completed so far, and their labels are stored
+            in `return_dict` as "stopped_early".
+        checkpoint_store : :class:`utils.checkpoint_store.CheckpointStore`
+            default : None
+            Store in which the simulations of a degradation comparison are
+            checkpointed, so that they can continue after a restart.
+        cost_estimator : :class:`utils.cost_estimator.CostEstimator`
+            default : None
+            Estimator with which the random configurations are fitted in its
+            budget, see `plotting.config_generator`. The runtime of every plot
+            whose simulations were all solved (none loaded from `solution_cache`
+            or a checkpoint) is recorded in it to improve the next estimates.
+        media_stream : :class:`twitter_api.upload.MediaStream`
+            default : None
+            Stream to which the GIF of a comparison is uploaded while it is
+            encoded. The media id of the upload and its processing information
+            are stored in `return_dict` as "media_id" (None if the plot wasn't
+            uploaded) and "processing_info", the processing is not waited for.
     """
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger()
@@ -28,9 +87,10 @@ def random_plot_generator(return_dict, choice, reply_config=None, testing=False)
 
         try:
             if reply_config is None:
-                config = config_generator(choice)
+                config = config_generator(choice, cost_estimator=cost_estimator)
             else:
                 config = reply_config
+            start_time = time.time()
 
             if not testing:
                 pybamm.set_logging_level("NOTICE")
@@ -45,12 +105,26 @@ def random_plot_generator(return_dict, choice, reply_config=None, testing=False)
                     config["degradation_parameter"],
                     config["cycle"],
                     config["number"],
+                    solution_cache=solution_cache,
+                    output_dir=output_dir,
+                    processes=processes,
+                    # only the summary variables are plotted, so only the first
+                    # and the last cycles are kept in full
+                    save_at_cycles=[config["number"]],
+                    time_budget=time_budget,
+                    checkpoint_store=checkpoint_store,
                 )
 
                 # solving the configuration and creating the plot
                 degradation_comparison_generator.solve()
                 degradation_comparison_generator.generate_summary_variables()
 
+                if degradation_comparison_generator.stopped_early:
+                    logger.info(
+                        "Ran out of time, plotting the completed cycles of "
+                        + ", ".join(degradation_comparison_generator.stopped_early)
+                    )
+
                 return_dict.update(
                     {
                         "model": config["model"],
@@ -63,9 +137,24 @@ def random_plot_generator(return_dict, choice, reply_config=None, testing=False)
                         "varied_values": config["varied_values"],
                         "degradation_mode": config["degradation_mode"],
                         "degradation_value": config["degradation_value"],
+                        "plot": degradation_comparison_generator.plot,
+                        "media_type": "image/png",
+                        "plot_settings": None,
+                        "media_id": None,
+                        "processing_info": None,
+                        "stopped_early": degradation_comparison_generator.stopped_early,
                     }
                 )
 
+                # a run which was stopped early, or which loaded some of its
+                # simulations, does not show its full cost
+                if (
+                    cost_estimator is not None
+                    and not degradation_comparison_generator.stopped_early
+                    and degradation_comparison_generator.cache_hits == 0
+                ):
+                    cost_estimator.record(choice, config, time.time() - start_time)
+
                 return
 
             else:
@@ -81,6 +170,10 @@ def random_plot_generator(return_dict, choice, reply_config=None, testing=False)
                     config["number"],
                     config["param_to_vary_info"],
                     config["varied_values_override"],
+                    solution_cache=solution_cache,
+                    output_dir=output_dir,
+                    processes=processes,
+                    media_stream=media_stream,
                 )
 
                 # create a GIF
@@ -104,10 +197,86 @@ def random_plot_generator(return_dict, choice, reply_config=None, testing=False)
                             "varied_values"
                         ],
                         "params": comparison_generator.comparison_dict["params"],
+                        "plot": comparison_generator.plot,
+                        "media_type": "image/gif",
+                        "plot_settings": comparison_generator.gif_settings,
+                        "media_id": comparison_generator.gif_settings.get("media_id"),
+                        "processing_info": comparison_generator.gif_settings.get(
+                            "processing_info"
+                        ),
                     }
                 )
 
+                # a run which loaded some of its simulations from the cache does
+                # not show its full cost
+                if cost_estimator is not None and comparison_generator.cache_hits == 0:
+                    cost_estimator.record(choice, config, time.time() - start_time)
+
                 return
 
         except Exception as e:  # pragma: no cover
+            # a requested configuration is not replaced by a random one
+            if reply_config is not None:
+                raise
             print(e)
+
+
+def generate_plot(
+    choice,
+    reply_config=None,
+    testing=False,
+    solution_cache=None,
+    output_dir=".",
+    processes=1,
+    time_budget=None,
+    checkpoint_store=None,
+    cost_estimator=None,
+    media_stream=None,
+):
+    """
+    Generates a random plot and returns the values stored by `random_plot_generator`.
+    To be used as a job of :class:`utils.worker_pool.WorkerPool`.
+
+    Parameters
+    ----------
+        The same as `random_plot_generator`, except `return_dict`. The models of
+        `reply_config` can be given as :class:`utils.model_factory.ModelSpec`
+        (see `utils.model_factory.to_specs`), they are then built in this
+        process.
+
+    Returns
+    -------
+        return_dict : dict
+    """
+    return_dict = {}
+    random_plot_generator(
+        return_dict,
+        choice,
+        reply_config=from_specs(reply_config) if reply_config is not None else None,
+        testing=testing,
+        solution_cache=solution_cache,
+        output_dir=output_dir,
+        processes=processes,
+        time_budget=time_budget,
+        checkpoint_store=checkpoint_store,
+        cost_estimator=cost_estimator,
+        media_stream=media_stream,
+    )
+
+    return return_dict
+
+
+def warm_up():
+    """
+    Warms up a worker process by building the models and loading the parameter
+    values used by the bot once, so that the lazily loaded parts of PyBaMM are
+    ready before the first job arrives. The models without options are kept by
+    `utils.model_factory` for the configurations which use them, as the models of
+    a job are sent as :class:`utils.model_factory.ModelSpec` and built in the
+    worker. The chemistries are the ones `plotting.config_generator` chooses
+    from.
+    """
+    for model_class in model_classes:
+        build_model(model_class)
+    for chemistry in chemistries + [degradation_chemistry]:
+        load_parameter_values(chemistry)
@@ -0,0 +1,315 @@
+import os
+import time
+import queue
+import shutil
+import asyncio
+import tweepy
+import logging
+import tempfile
+import itertools
+from requests import RequestException
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ReplyDaemon:
+    """
+    Replies to the mentions of the bot on an asyncio event loop. The mentions are
+    read every `poll_interval` seconds on their own task, every request is
+    answered by its own task, and the requested simulations are generated in the
+    pool of warm worker processes of the reply. The uploads, the checks of the
+    processing status and the replies of different requests run at the same
+    time, so a request never waits for another one to be uploaded or processed.
+    The blocking requests to the Twitter API are sent in threads, through the
+    shared session and rate limits of the reply.
+
+    Parameters
+    ----------
+        reply : :class:`twitter_api.tweet_reply.Reply`
+            Reply with which the mentions are read and answered.
+        poll_interval : numerical
+            default : 60
+            Time (in seconds) between two reads of the mentions.
+        pool_interval : numerical
+            default : 1
+            Maximum time (in seconds) before a submitted simulation is sent to
+            the pool, and between two checks of the time-outs of the pool.
+        max_threads : int
+            default : 8
+            Maximum number of threads in which the requests to the Twitter API
+            are sent at the same time, one of them drives the pool.
+    """
+
+    def __init__(self, reply, poll_interval=60, pool_interval=1, max_threads=8):
+        self.reply = reply
+        self.poll_interval = poll_interval
+        self.pool_interval = pool_interval
+        self.max_threads = max_threads
+        # of the form - queue([(future, func, args, kwargs)])
+        self.submissions = queue.SimpleQueue()
+        # of the form - {job_id: future}
+        self.jobs = {}
+        # future of the simulation being submitted to the pool
+        self.submitting = None
+        self.pool_task = None
+        # the tasks answering the requests
+        self.tasks = set()
+
+    async def run(self, iterations=None):
+        """
+        Reads the mentions and answers them.
+
+        Parameters
+        ----------
+            iterations : int
+                default : None
+                Number of times the mentions are read, forever if None. The
+                requests of the last read are answered before returning.
+        """
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.max_threads)
+        )
+        self.pool_task = asyncio.create_task(self.run_pool())
+
+        try:
+            await self.read_mentions(iterations)
+            # a request which couldn't be answered doesn't cancel the others
+            for result in await asyncio.gather(*self.tasks, return_exceptions=True):
+                if isinstance(result, Exception):  # pragma: no cover
+                    logging.getLogger(__name__).error(
+                        "A request couldn't be answered: %s", result
+                    )
+        finally:
+            self.pool_task.cancel()
+            for task in self.tasks:
+                task.cancel()
+
+    async def read_mentions(self, iterations=None):
+        """
+        Reads the mentions every `poll_interval` seconds and starts a task for
+        every request.
+
+        Parameters
+        ----------
+            iterations : int
+                default : None
+                Number of times the mentions are read, forever if None.
+        """
+        for iteration in itertools.count(1):
+            # the requests which can't be fixed by retrying are raised, the next
+            # mentions are still answered
+            try:
+                requests = await asyncio.to_thread(self.reply.read_mentions)
+            except (RequestException, tweepy.TweepyException) as e:
+                logging.getLogger(__name__).exception(
+                    "Could not read the mentions: %s", e
+                )
+                requests = []
+
+            for mention, choice, reply_config in requests:
+                task = asyncio.create_task(self.answer(mention, choice, reply_config))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+            if iterations is not None and iteration >= iterations:
+                break
+            await asyncio.sleep(self.poll_interval)
+
+    def pump(self):
+        """
+        Submits the queued simulations to the pool and waits (for at most
+        `pool_interval` seconds) for some of them to finish. Runs in a thread, and
+        is the only user of the pool, which is not thread-safe.
+
+        Returns
+        -------
+            finished : list
+                See :meth:`utils.worker_pool.WorkerPool.wait`.
+        """
+        worker_pool = self.reply.get_worker_pool()
+
+        while True:
+            try:
+                future, func, args, kwargs = self.submissions.get_nowait()
+            except queue.Empty:
+                break
+            self.submitting = future
+            job_id = worker_pool.submit(func, *args, **kwargs)
+            self.jobs.update({job_id: future})
+            self.submitting = None
+
+        # the jobs which couldn't be sent are returned by `wait` as well
+        if worker_pool.running or worker_pool.pending or worker_pool.failed:
+            return worker_pool.wait(timeout=self.pool_interval)
+
+        time.sleep(self.pool_interval)
+        return []
+
+    async def run_pool(self):
+        """
+        Drives the pool and resolves the futures of the finished simulations.
+        """
+        while True:
+            # a failure of the pool only fails the simulations which it lost
+            try:
+                finished = await asyncio.to_thread(self.pump)
+            except Exception as e:
+                logging.getLogger(__name__).exception("The pool failed: %s", e)
+                self.fail_lost_jobs(e)
+                continue
+
+            for job_id, result, exception in finished:
+                future = self.jobs.pop(job_id, None)
+                # the task waiting for the simulation was cancelled
+                if future is None or future.done():  # pragma: no cover
+                    continue
+                if exception is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(exception[0])
+
+    def fail_lost_jobs(self, exception):
+        """
+        Fails the futures of the simulations which are not queued, running or
+        failed in the pool anymore, after `pump` raised an exception.
+
+        Parameters
+        ----------
+            exception : Exception
+                Exception raised by `pump`.
+        """
+        worker_pool = self.reply.get_worker_pool()
+        job_ids = (
+            {job[0] for job in worker_pool.pending + worker_pool.failed}
+            | {job_id for job_id, _ in worker_pool.running.values()}
+        )
+
+        lost_futures = [
+            self.jobs.pop(job_id) for job_id in list(self.jobs) if job_id not in job_ids
+        ]
+        # the submission which raised, its job was either queued without
+        # returning its id or lost
+        if self.submitting is not None:
+            new_job_ids = job_ids - set(self.jobs)
+            if new_job_ids:
+                self.jobs.update({new_job_ids.pop(): self.submitting})
+            else:
+                lost_futures.append(self.submitting)
+            self.submitting = None
+
+        for future in lost_futures:
+            if not future.done():
+                future.set_exception(exception)
+
+    async def generate_plot(self, choice, reply_config, output_dir):
+        """
+        Generates the plot of a requested simulation in the pool.
+
+        Parameters
+        ----------
+            choice : str
+            reply_config : dict
+            output_dir : str
+                See :meth:`twitter_api.tweet_reply.Reply.plot_job`.
+
+        Returns
+        -------
+            return_dict : dict
+                The values stored by `plotting.random_plot_generator`.
+        """
+        if self.pool_task is None or self.pool_task.done():
+            raise RuntimeError("The pool of the reply daemon is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        func, args, kwargs = self.reply.plot_job(choice, reply_config, output_dir)
+        self.submissions.put((future, func, args, kwargs))
+
+        return await future
+
+    async def reply_with_plot(
+        self,
+        mention,
+        plot,
+        media_type=None,
+        settings=None,
+        media_id=None,
+        processing_info=None,
+    ):
+        """
+        Uploads a plot and replies to a mention with it once Twitter has processed
+        it, see :meth:`twitter_api.tweet_reply.Reply.reply_with_plot`.
+        """
+        status_poller = await asyncio.to_thread(
+            self.reply.upload_plot, plot, media_type, media_id, processing_info
+        )
+        reply = await asyncio.to_thread(
+            self.reply.plot_reply,
+            mention,
+            plot,
+            media_type,
+            settings,
+            status_poller.media_id,
+        )
+
+        result = await status_poller.wait_async()
+        await asyncio.to_thread(self.reply.post_reply, mention, reply, result)
+
+    async def answer(self, mention, choice, reply_config):
+        """
+        Answers a request, with a stored plot if it was plotted before.
+
+        Parameters
+        ----------
+            mention : :class:`tweepy.models.Status`
+                The tweet in which the bot was mentioned.
+            choice : str
+            reply_config : dict
+                As returned by
+                :meth:`twitter_api.tweet_reply.Reply.generate_reply_config`.
+        """
+        artifact_store = self.reply.artifact_store
+
+        try:
+            key = None
+            if artifact_store is not None:
+                key = artifact_store.generate_key(choice, reply_config)
+                artifact = await asyncio.to_thread(artifact_store.get, key)
+
+                # reuse the stored plot
+                if artifact is not None:
+                    await self.reply_with_plot(mention, artifact[0])
+                    return
+
+            # every request gets its own output directory
+            os.makedirs(self.reply.jobs_dir, exist_ok=True)
+            job_dir = tempfile.mkdtemp(prefix="job_", dir=self.reply.jobs_dir)
+
+            try:
+                try:
+                    return_dict = await self.generate_plot(
+                        choice, reply_config, job_dir
+                    )
+                except Exception as e:
+                    await asyncio.to_thread(self.reply.reply_with_exception, mention, e)
+                    return
+
+                plot = return_dict["plot"]
+
+                # store the plot for repeated requests
+                if artifact_store is not None:
+                    await asyncio.to_thread(artifact_store.put, key, plot)
+
+                await self.reply_with_plot(
+                    mention,
+                    plot,
+                    return_dict["media_type"],
+                    return_dict["plot_settings"],
+                    return_dict["media_id"],
+                    return_dict["processing_info"],
+                )
+            finally:
+                shutil.rmtree(job_dir, ignore_errors=True)
+        # the other requests are still answered
+        except (RequestException, tweepy.TweepyException) as e:
+            logging.getLogger(__name__).warning(
+                "Could not reply to %s: %s", mention._json["id"], e
+            )
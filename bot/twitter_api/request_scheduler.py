@@ -0,0 +1,317 @@
+import time
+import random
+import logging
+import requests
+import threading
+import collections
+import email.utils
+from urllib.parse import urlsplit
+
+
+class RequestScheduler:
+    """
+    Sends the requests to the Twitter API as fast as its rate limits allow. The
+    rate limit of every endpoint is read from the "x-rate-limit-remaining" and
+    "x-rate-limit-reset" headers of its responses, and a request to an endpoint
+    whose limit is used up waits exactly until the limit resets. Throttled
+    responses (429, or any response with a "Retry-After" header) are retried
+    after the asked time, server errors (5xx) and connection errors are retried
+    with an exponential backoff and a random jitter, and client errors (4xx) are
+    raised right away. Can be used from several threads at the same time.
+
+    Parameters
+    ----------
+        session : :class:`requests.Session`
+            default : None
+            Session with which the requests are sent, a new one is used if not
+            passed.
+        max_retries : int
+            default : 5
+            Maximum number of times a request is retried.
+        backoff : numerical
+            default : 1
+            Time (in seconds) before the first retry of a failed request, doubled
+            for every following retry.
+        max_backoff : numerical
+            default : 300
+            Maximum time (in seconds) before a retry.
+        jitter : numerical
+            default : 0.5
+            Maximum fraction by which the time before a retry is lengthened.
+        limits : dict
+            default : None
+            Rate limits of the endpoints. Can be shared with the schedulers of
+            other processes (as a `multiprocessing.Manager().dict()`, with a
+            `limits_lock` from the same manager), so that they all follow the same
+            rate limits. A new dictionary is used if not passed.
+        limits_lock : lock
+            default : None
+            Lock guarding `limits`, a new `threading.Lock` is used if not passed.
+
+    The counters of the scheduler (`self.counters`) are of the form -
+    {
+        "requests": int,
+        "retries": int,
+        "rate limit waits": int,
+        "throttled": int,
+        "server errors": int,
+        "connection errors": int,
+        "client errors": int,
+        "failures": int,
+    }
+    """
+
+    def __init__(
+        self,
+        session=None,
+        max_retries=5,
+        backoff=1,
+        max_backoff=300,
+        jitter=0.5,
+        limits=None,
+        limits_lock=None,
+    ):
+        self.session = session if session is not None else requests.Session()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        # of the form - {endpoint: {"remaining": int, "reset": numerical}}
+        self.limits = limits if limits is not None else {}
+        self.limits_lock = limits_lock if limits_lock is not None else threading.Lock()
+        self.counters = collections.Counter()
+        self.lock = threading.Lock()
+
+    def endpoint(self, url):
+        """
+        Returns the endpoint of a url, whose rate limit is shared by all its
+        requests.
+
+        Parameters
+        ----------
+            url : str
+
+        Returns
+        -------
+            endpoint : str
+        """
+        url = urlsplit(url)
+
+        return url.netloc + url.path
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def wait_for_limit(self, endpoint):
+        """
+        Sleeps until the rate limit of an endpoint resets, if it is used up. A
+        request is taken from the remaining requests otherwise.
+
+        Parameters
+        ----------
+            endpoint : str
+        """
+        with self.limits_lock:
+            limit = self.limits.get(endpoint)
+            wait = 0
+            if limit is not None and limit["remaining"] <= 0:
+                wait = limit["reset"] - time.time()
+            # the limit is replaced, not changed in place, so that a shared
+            # dictionary sees the change
+            if limit is not None:
+                self.limits[endpoint] = dict(limit, remaining=limit["remaining"] - 1)
+
+        if wait > 0:
+            logging.getLogger(__name__).info(
+                "Rate limit of %s used up, waiting %.0f seconds", endpoint, wait
+            )
+            self.count("rate limit waits")
+            time.sleep(wait)
+
+    def update_limit(self, endpoint, response):
+        """
+        Reads the rate limit of an endpoint from the headers of a response.
+
+        Parameters
+        ----------
+            endpoint : str
+            response : :class:`requests.Response`
+        """
+        try:
+            remaining = int(response.headers["x-rate-limit-remaining"])
+            reset = float(response.headers["x-rate-limit-reset"])
+        except (KeyError, ValueError):
+            return
+
+        with self.limits_lock:
+            self.limits[endpoint] = {"remaining": remaining, "reset": reset}
+
+    def retry_after(self, response):
+        """
+        Returns the time (in seconds) asked by a "Retry-After" header, None if
+        there is no such header.
+
+        Parameters
+        ----------
+            response : :class:`requests.Response`
+
+        Returns
+        -------
+            retry_after : numerical or None
+        """
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is None:
+            return None
+
+        # the header is either a number of seconds or a date
+        try:
+            return max(0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            date = email.utils.parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+
+        return max(0, date.timestamp() - time.time())
+
+    def backoff_time(self, retry):
+        """
+        Returns the time (in seconds) before a retry of a failed request.
+
+        Parameters
+        ----------
+            retry : int
+                Number of retries of the request so far.
+
+        Returns
+        -------
+            backoff_time : numerical
+        """
+        backoff_time = min(self.backoff * 2 ** retry, self.max_backoff)
+
+        return backoff_time * random.uniform(1, 1 + self.jitter)
+
+    def http_error(self, response):
+        """
+        Returns the error raised for a response which is not retried (anymore).
+
+        Parameters
+        ----------
+            response : :class:`requests.Response`
+
+        Returns
+        -------
+            error : :class:`requests.HTTPError`
+        """
+        return requests.HTTPError(
+            f"{response.status_code} {response.reason} for url: {response.url}",
+            response=response,
+        )
+
+    def request(self, method, url, max_retries=None, **kwargs):
+        """
+        Sends a request and retries it until it succeeds, fails with a client
+        error or runs out of retries.
+
+        Parameters
+        ----------
+            method : str
+                "GET" or "POST".
+            url : str
+            max_retries : int
+                default : None
+                Maximum number of retries of this request, `self.max_retries` if
+                not passed.
+            kwargs : dict
+                Passed to :meth:`requests.Session.request`.
+
+        Returns
+        -------
+            response : :class:`requests.Response`
+
+        Raises
+        ------
+            requests.HTTPError
+                If the request fails with a client error (or a redirect, or an
+                unknown status), or with a server error (or throttled) after all
+                the retries.
+            requests.ConnectionError
+                If the request can't be sent after all the retries.
+        """
+        logger = logging.getLogger(__name__)
+        endpoint = self.endpoint(url)
+        max_retries = max_retries if max_retries is not None else self.max_retries
+
+        for retry in range(max_retries + 1):
+            self.wait_for_limit(endpoint)
+
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.count("connection errors")
+                if retry == max_retries:
+                    self.count("failures")
+                    raise
+                wait = self.backoff_time(retry)
+                logger.info("%s: %s, retrying in %.0f seconds", endpoint, e, wait)
+                self.count("retries")
+                time.sleep(wait)
+                continue
+
+            self.count("requests")
+            self.update_limit(endpoint, response)
+
+            # none of the endpoints answers with a redirect which should be
+            # left unfollowed, so only a 2xx is a success
+            if 200 <= response.status_code <= 299:
+                return response
+
+            retry_after = self.retry_after(response)
+            if response.status_code == 429 or retry_after is not None:
+                self.count("throttled")
+                # wait until the rate limit resets if the API doesn't say how long
+                if retry_after is None:
+                    limit = self.limits.get(endpoint)
+                    retry_after = (
+                        max(0, limit["reset"] - time.time())
+                        if limit is not None
+                        else self.backoff_time(retry)
+                    )
+                wait = retry_after
+            elif 500 <= response.status_code <= 599:
+                self.count("server errors")
+                wait = self.backoff_time(retry)
+            else:
+                # a client error (or a redirect which wasn't followed, or an
+                # unknown status) won't be fixed by sending the request again
+                self.count("client errors")
+                logger.info("%s: %s %s", endpoint, response.status_code, response.text)
+                raise self.http_error(response)
+
+            if retry == max_retries:
+                self.count("failures")
+                raise self.http_error(response)
+
+            logger.info(
+                "%s: %s %s, retrying in %.0f seconds",
+                endpoint,
+                response.status_code,
+                response.text,
+                wait,
+            )
+            self.count("retries")
+            time.sleep(wait)
+
+    def get(self, url, **kwargs):
+        """
+        Sends a GET request, see `request`.
+        """
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """
+        Sends a POST request, see `request`.
+        """
+        return self.request("POST", url, **kwargs)
@@ -1,12 +1,17 @@
 import os
 import time
 import random
+import shutil
+import tempfile
 import datetime
-import multiprocessing
 import matplotlib.pyplot as plt
-from twitter_api.upload import Upload
-from utils.custom_process import Process
-from plotting.random_plot_generator import random_plot_generator
+from twitter_api.upload import Upload, MediaStream
+from utils.worker_pool import WorkerPool
+from utils.model_factory import to_specs
+from utils.checkpoint_store import CheckpointStore
+from utils.cost_estimator import CostEstimator, CostExceeded
+from plotting.config_generator import config_generator
+from plotting.random_plot_generator import generate_plot, warm_up
 from utils.tweet_text_generator import tweet_text_generator
 
 
@@ -22,18 +27,68 @@ class Tweet(Upload):
             To be used while testing. Can be "model comparison",
             "parameter comparison" or "degradation comparison
             (summary variables)".
+        jobs_dir : str
+            default : None
+            Directory in which the plot gets its own output directory. The system's
+            temporary directory is used if not passed.
+        processes : int
+            default : 1
+            Number of processes in which the simulations of the plot are solved
+            and its frames are rendered, see `plotting.random_plot_generator`.
+        worker_pool : :class:`utils.worker_pool.WorkerPool`
+            default : None
+            Pool of warm worker processes in which the plot is generated. A pool
+            with a single worker is started (and stopped) if not passed.
+        cost_estimator : :class:`utils.cost_estimator.CostEstimator`
+            default : None
+            Estimator with which the random configurations are fitted in its
+            budget before they are solved, see `plotting.config_generator`.
+        stream_upload : bool
+            default : False
+            If a GIF is uploaded while it is encoded, see
+            :class:`twitter_api.upload.MediaStream`. `self.media_id` and
+            `self.processing_info` are then set once the plot is generated, the
+            processing should be followed with `check_status`, and the plot
+            should only be uploaded again if `self.media_id` is None.
+        checkpoint_store : :class:`utils.checkpoint_store.CheckpointStore`
+            default : None
+            Store in which the simulations of a degradation comparison are
+            checkpointed. A degradation comparison which times out is then solved
+            again (at most `max_resumes` times) from its checkpoints, instead of
+            being replaced by a new random configuration.
+        max_resumes : int
+            default : 2
+            Maximum number of times a degradation comparison is continued from
+            its checkpoints.
     """
 
-    def __init__(self, testing=False, choice=None):
+    def __init__(
+        self,
+        testing=False,
+        choice=None,
+        jobs_dir=None,
+        processes=1,
+        worker_pool=None,
+        cost_estimator=None,
+        stream_upload=False,
+        checkpoint_store=None,
+        max_resumes=2,
+    ):
         """
         Defines video tweet properties
         """
         super().__init__()
+        # a single warm worker with a time-out of 20 minutes
+        pool = (
+            worker_pool
+            if worker_pool is not None
+            else WorkerPool(processes=1, timeout=1200, initializer=warm_up)
+        )
+
         # create a random GIF
+        config = None
+        resumes = 0
         while True:
-            manager = multiprocessing.Manager()
-            return_dict = manager.dict()
-
             choice_list = [
                 "degradation comparison",
                 "model comparison",
@@ -42,28 +97,73 @@ class Tweet(Upload):
             if choice is None:
                 choice = random.choice(choice_list)
 
-            p = Process(
-                target=random_plot_generator, args=(return_dict, choice, None, testing)
-            )
+            # the configuration is drawn here, so that it can be solved again
+            # from its checkpoints
+            if config is None:
+                try:
+                    config = config_generator(choice, cost_estimator=cost_estimator)
+                except CostExceeded as e:  # pragma: no cover
+                    print(e)
+                    continue
+
+            # every attempt gets a fresh output directory
+            self.job_dir = tempfile.mkdtemp(prefix="tweet_", dir=jobs_dir)
 
-            p.start()
-            # time-out
-            p.join(1200)
+            try:
+                return_dict = pool.run(
+                    generate_plot,
+                    choice,
+                    # the models are built (or reused) in the worker
+                    reply_config=to_specs(config),
+                    testing=testing,
+                    output_dir=self.job_dir,
+                    processes=processes,
+                    # long degradation experiments are stopped and plotted before
+                    # the worker is killed
+                    time_budget=900,
+                    checkpoint_store=checkpoint_store,
+                    cost_estimator=cost_estimator,
+                    # the streamed upload follows the rate limits of the tweet
+                    media_stream=MediaStream(**self.share_limits())
+                    if stream_upload
+                    else None,
+                )
+                break
+            except TimeoutError:  # pragma: no cover
+                shutil.rmtree(self.job_dir, ignore_errors=True)
+
+                # a checkpointed experiment continues from its last checkpoints
+                if (
+                    checkpoint_store is not None
+                    and choice == "degradation comparison"
+                    and resumes < max_resumes
+                ):
+                    print(
+                        "Simulation is taking too long, "
+                        + "KILLING IT and continuing it from its checkpoints."
+                    )
+                    resumes += 1
+                    continue
 
-            if p.is_alive():  # pragma: no cover
                 print(
                     "Simulation is taking too long, "
                     + "KILLING IT and starting a NEW ONE."
                 )
-                p.kill()
-                p.join()
-            else:  # pragma: no cover
-                break
+                config = None
+                resumes = 0
+            except Exception as e:  # pragma: no cover
+                print(e)
+                shutil.rmtree(self.job_dir, ignore_errors=True)
+                config = None
+                resumes = 0
+
+        if worker_pool is None:
+            pool.close()
 
-        if os.path.exists("plot.gif"):
-            self.plot = "plot.gif"
-        elif os.path.exists("plot.png"):
-            self.plot = "plot.png"
+        self.plot = return_dict["plot"]
+        self.media_type = return_dict["media_type"]
+        self.media_id = return_dict["media_id"]
+        self.processing_info = return_dict["processing_info"]
         self.total_bytes = os.path.getsize(self.plot)
         self.config = None
         self.model = return_dict["model"]
@@ -173,18 +273,30 @@ class Tweet(Upload):
                 # post reply
                 self.post_request(self.post_tweet_url, reply, self.oauth)
 
-        if os.path.exists("plot.gif"):
-            os.remove("plot.gif")
-        if os.path.exists("plot.png"):
-            os.remove("plot.png")
+        shutil.rmtree(self.job_dir, ignore_errors=True)
         plt.close()
 
 
 if __name__ == "__main__":
-    tweet = Tweet()
-    tweet.upload_init()
-    tweet.upload_append()
-    tweet.upload_finalize()
+    # configurations which would not finish before the time-out of the worker
+    # are made smaller (or replaced) before they are solved
+    # a degradation comparison which times out continues from its checkpoints
+    tweet = Tweet(
+        processes=None,
+        cost_estimator=CostEstimator(budget=900),
+        stream_upload=True,
+        checkpoint_store=CheckpointStore(),
+    )
+    # upload the plot if it wasn't uploaded while it was encoded
+    if tweet.media_id is None:
+        tweet.upload_init()
+        tweet.upload_append()
+        result = tweet.upload_finalize().result
+    else:
+        # wait for Twitter to process the streamed plot
+        result = tweet.check_status()
+    if result["state"] != "succeeded":
+        raise RuntimeError(f"Media processing {result['state']}: {result['error']}")
     if not tweet.testing:
         time.sleep(random.randint(0, 3600))
     tweet.tweet()
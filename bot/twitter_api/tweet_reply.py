@@ -1,11 +1,24 @@
 import os
 import time
+import asyncio
+import shutil
 import pybamm
-from PIL import Image
+import tweepy
+import logging
+import tempfile
+import numpy as np
 import matplotlib.pyplot as plt
-from twitter_api.upload import Upload
-from utils.custom_process import Process
-from plotting.random_plot_generator import random_plot_generator
+from requests import RequestException
+from twitter_api.upload import Upload, MediaStream, StatusPoller
+from twitter_api.reply_daemon import ReplyDaemon
+from utils.worker_pool import WorkerPool
+from utils.gif_encoder import read_settings
+from utils.model_factory import build_model, to_specs
+from utils.parameter_registry import get_metadata, get_parameter_values
+from utils.artifact_store import ArtifactStore
+from utils.solution_cache import SolutionCache
+from utils.cost_estimator import CostEstimator
+from plotting.random_plot_generator import generate_plot, warm_up
 
 
 # basic structure inspired from - https://www.youtube.com/watch?v=W0wWwglE1Vc
@@ -17,11 +30,86 @@ class Reply(Upload):
     ----------
         testing : bool
             To be used while testing, so that the function doesn't reply.
+        solution_cache : :class:`utils.solution_cache.SolutionCache`
+            default : None
+            Cache of solved simulations shared by all the replies. Requests which
+            have been simulated before are not solved again.
+        artifact_store : :class:`utils.artifact_store.ArtifactStore`
+            default : None
+            Store of the plots which have already been tweeted. Requests which
+            have been plotted before are uploaded directly.
+        max_workers : int
+            default : 2
+            Maximum number of requested simulations generated at the same time.
+            Ignored if `worker_pool` is passed.
+        timeout : numerical
+            default : 1200
+            Time (in seconds) after which a requested simulation is cancelled.
+            Should match the time-out of `worker_pool` if it is passed.
+        jobs_dir : str
+            default : "jobs"
+            Directory in which every requested simulation gets its own output
+            directory.
+        processes : int
+            default : 1
+            Number of processes in which the simulations of a single request are
+            solved and the frames of its GIF are rendered, see
+            `plotting.random_plot_generator`.
+        worker_pool : :class:`utils.worker_pool.WorkerPool`
+            default : None
+            Pool of warm worker processes in which the requested simulations are
+            generated. A pool of `max_workers` workers with a time-out of
+            `timeout` is started on the first request if not passed.
+        cost_estimator : :class:`utils.cost_estimator.CostEstimator`
+            default : None
+            Estimator of the runtime of the requested simulations. Requests which
+            would take longer than the budget of the estimator (or `timeout` if it
+            has none) are answered with the estimate right away, instead of being
+            cancelled after `timeout`.
+        stream_upload : bool
+            default : False
+            If the GIFs of the requested simulations are uploaded while they are
+            encoded, see :class:`twitter_api.upload.MediaStream`.
     """
 
-    def __init__(self, testing=False):
+    def __init__(
+        self,
+        testing=False,
+        solution_cache=None,
+        artifact_store=None,
+        max_workers=2,
+        timeout=1200,
+        jobs_dir="jobs",
+        processes=1,
+        worker_pool=None,
+        cost_estimator=None,
+        stream_upload=False,
+    ):
         super().__init__()
         self.testing = testing
+        self.solution_cache = solution_cache
+        self.artifact_store = artifact_store
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.jobs_dir = os.path.abspath(jobs_dir)
+        self.processes = processes
+        self.worker_pool = worker_pool
+        self.cost_estimator = cost_estimator
+        self.stream_upload = stream_upload
+        # of the form - [(status_poller, mention, reply)]
+        self.pending_replies = []
+
+    def get_worker_pool(self):
+        """
+        Returns the pool of warm worker processes in which the requested
+        simulations are generated, starting it on the first call.
+        """
+        if self.worker_pool is None:
+            self.worker_pool = WorkerPool(
+                processes=self.max_workers, timeout=self.timeout, initializer=warm_up
+            )
+
+        return self.worker_pool
 
     def retrieve_tweet_id(self, file_name):
         """
@@ -63,6 +151,27 @@ class Reply(Upload):
             tweet_text : str
                 Text extracted from the tweet.
         """
+        choice, reply_config = self.generate_reply_config(tweet_text)
+
+        # generate the simulation and GIF
+        self.generate_plot(choice, reply_config, testing=testing)
+
+    def generate_reply_config(self, tweet_text):
+        """
+        Reads the requested simulation from the given tweet text.
+
+        Parameters
+        ----------
+            tweet_text : str
+                Text extracted from the tweet.
+
+        Returns
+        -------
+            choice : str
+                Can be "model comparison" or "parameter comparison".
+            reply_config : dict
+                Configuration to be passed to `random_plot_generator`.
+        """
         request_examples = (
             "https://github.com/pybamm-team/BattBot/blob/main/REQUEST_EXAMPLES.md"
         )
@@ -92,25 +201,25 @@ class Reply(Upload):
 
         # if there are, append SPM and SPMe to models
         if len(single_indices) > 1:
-            models.append(pybamm.lithium_ion.SPM())
-            models.append(pybamm.lithium_ion.SPMe())
+            models.append(build_model(pybamm.lithium_ion.SPM))
+            models.append(build_model(pybamm.lithium_ion.SPMe))
         # if user wants "SPM"
         elif (
             "single" in text_list
             and "particle" in text_list
             and "electrolyte" not in text_list
         ) or "spm" in text_list:
-            models.append(pybamm.lithium_ion.SPM())
+            models.append(build_model(pybamm.lithium_ion.SPM))
         # if user wants "SPMe"
         elif (
             "single" in text_list
             and "particle" in text_list
             and "electrolyte" in text_list
         ) or "spme" in text_list:
-            models.append(pybamm.lithium_ion.SPMe())
+            models.append(build_model(pybamm.lithium_ion.SPMe))
         # if user wants "DFN" model
         if "doyle-fuller-newman" in text_list or "dfn" in text_list:
-            models.append(pybamm.lithium_ion.DFN())
+            models.append(build_model(pybamm.lithium_ion.DFN))
 
         # if less than 2 models are provided for "model comparison"
         # or no model is provided for "parameter comparison"
@@ -140,7 +249,7 @@ class Reply(Upload):
             )
 
         # parameter values
-        params = pybamm.ParameterValues(chemistry)
+        params = get_parameter_values(chemistry)
 
         # update "Ambient temperature [K]" from the tweet text
         temp_is_present = False
@@ -171,10 +280,7 @@ class Reply(Upload):
                         c_rate = float(x[:-1])
                         c_rate_is_present = True
                         params["Current function [A]"] = (
-                            c_rate
-                            * pybamm.ParameterValues(chemistry)[
-                                "Nominal cell capacity [A.h]"
-                            ]
+                            c_rate * get_metadata(chemistry)["nominal capacity"]
                         )
                         break
             except Exception:
@@ -304,16 +410,453 @@ class Reply(Upload):
             }
         )
 
-        # generate the simulation and GIF
-        return_dict = {}
-        random_plot_generator(
-            return_dict, choice, reply_config=reply_config, testing=testing
+        # reject the requests which would not finish in time before solving them
+        if self.cost_estimator is not None and self.cost_estimator.calibrated():
+            budget = (
+                self.cost_estimator.budget
+                if self.cost_estimator.budget is not None
+                else self.timeout
+            )
+            estimate = self.cost_estimator.estimate(choice, reply_config)
+            if estimate > budget:
+                max_number = self.cost_estimator.max_number(
+                    choice, reply_config, budget
+                )
+                raise Exception(
+                    "Hi there! This simulation would take about "
+                    + f"{int(np.ceil(estimate / 60))} minutes, which is more than "
+                    + f"the limit of {int(budget / 60)} minutes. Please try again "
+                    + (
+                        f"with at most {max_number} cycles."
+                        if max_number
+                        else "with a simpler simulation."
+                    )
+                )
+
+        return choice, reply_config
+
+    def generate_plot(self, choice, reply_config, testing=False, output_dir="."):
+        """
+        Generates the GIF for a requested simulation in this process.
+
+        Parameters
+        ----------
+            choice : str
+                Can be "model comparison" or "parameter comparison".
+            reply_config : dict
+                Configuration returned by `generate_reply_config`.
+            output_dir : str
+                default : "."
+                Directory in which the GIF is generated.
+
+        Returns
+        -------
+            return_dict : dict
+                The values stored by `random_plot_generator`.
+        """
+        return generate_plot(
+            choice,
+            reply_config=reply_config,
+            testing=testing,
+            solution_cache=self.solution_cache,
+            output_dir=output_dir,
+            processes=self.processes,
+            cost_estimator=self.cost_estimator,
         )
 
-    def reply(self):
+    def reply_with_status(self, mention, status):
         """
-        Replies to a tweet where the bot was mentioned with the
-        hashtag "battbot".
+        Replies to a mention with a text only tweet.
+
+        Parameters
+        ----------
+            mention : :class:`tweepy.models.Status`
+                The tweet in which the bot was mentioned.
+            status : str
+                Text of the reply.
+        """
+        self.api.update_status(
+            "@" + mention.user.screen_name + " " + status,
+            mention._json["id"],
+        )
+
+    def reply_with_exception(self, mention, exception):
+        """
+        Replies to a mention whose requested simulation could not be generated.
+
+        Parameters
+        ----------
+            mention : :class:`tweepy.models.Status`
+                The tweet in which the bot was mentioned.
+            exception : Exception
+                Exception raised while generating the simulation.
+        """
+        # time-out
+        if isinstance(exception, TimeoutError):  # pragma: no cover
+            self.reply_with_status(
+                mention,
+                "Hi there! The simulation took more than "
+                + f"{int(self.timeout / 60)} minutes and hence, it was "
+                + "cancelled. Please try again with a simpler simulation "
+                + "(this feature is still in the testing phase).",
+            )
+        # if there was an Exception in the worker
+        else:
+            self.reply_with_status(mention, f"{exception}")
+
+    def upload_plot(self, plot, media_type=None, media_id=None, processing_info=None):
+        """
+        Uploads a plot without waiting for Twitter to process it. Every plot gets
+        its own upload, so that several plots can be uploaded at the same time,
+        and all the uploads share `self.scheduler`.
+
+        Parameters
+        ----------
+            plot : str
+                Path of the plot to be uploaded.
+            media_type : str
+                default : None
+                Media type of the plot. Guessed from the extension of `plot` if
+                not passed.
+            media_id : int
+                default : None
+                Media id of the plot if it was already uploaded while it was
+                encoded.
+            processing_info : dict
+                default : None
+                Processing information of the plot if it was already uploaded.
+
+        Returns
+        -------
+            status_poller : :class:`twitter_api.upload.StatusPoller`
+                Poller of the processing status of the plot.
+        """
+        # a streamed plot was already finalized, only its processing is followed
+        if media_id is not None:
+            return StatusPoller(self, media_id, processing_info)
+
+        upload = Upload(
+            plot,
+            os.path.getsize(plot),
+            media_type,
+            append_window=self.append_window,
+            scheduler=self.scheduler,
+        )
+        # initiate the upload
+        upload.upload_init()
+        # append the chunks
+        upload.upload_append()
+        # finalize uplaod
+        return upload.upload_finalize(wait=False)
+
+    def plot_reply(self, mention, plot, media_type=None, settings=None, media_id=None):
+        """
+        Returns the reply to a mention with an uploaded plot.
+
+        Parameters
+        ----------
+            mention : :class:`tweepy.models.Status`
+                The tweet in which the bot was mentioned.
+            plot : str
+                Path of the plot.
+            media_type : str
+                default : None
+                Media type of the plot.
+            settings : dict
+                default : None
+                Settings used to encode the GIF, as returned by
+                `utils.gif_encoder.encode_gif`. Read from the GIF if not passed.
+            media_id : int
+                default : None
+                Media id of the uploaded plot.
+
+        Returns
+        -------
+            reply : dict
+                Data of the request which posts the reply.
+        """
+        status = None
+        if media_type == "image/gif" or plot.endswith(".gif"):
+            if settings is None:
+                settings = read_settings(plot)
+            if settings is not None and settings["compressed"]:  # pragma: no cover
+                status = (
+                    "This GIF has been compressed (to "
+                    + f"{settings['size'][0]}x{settings['size'][1]} pixels, "
+                    + f"{settings['number_of_frames']} frames and "
+                    + f"{settings['colors']} colors) to bring its size down to 15 MB (twitter's limit). "  # noqa
+                    + "Please request a smaller simulation for a better quality GIF."  # noqa
+                )
+
+        return {
+            "status": status,
+            "in_reply_to_status_id": mention._json["id"],
+            "auto_populate_reply_metadata": True,
+            "media_ids": media_id,
+        }
+
+    def post_reply(self, mention, reply, result):
+        """
+        Posts the reply to a mention once its plot has been processed.
+
+        Parameters
+        ----------
+            mention : :class:`tweepy.models.Status`
+                The tweet in which the bot was mentioned.
+            reply : dict
+                Reply returned by `plot_reply`.
+            result : dict
+                Result of the processing of the plot, see
+                :class:`twitter_api.upload.StatusPoller`.
+        """
+        if result["state"] == "succeeded":
+            # post the reply
+            self.post_request(self.post_tweet_url, reply, self.oauth)
+        else:  # pragma: no cover
+            self.reply_with_status(
+                mention,
+                "Hi there! Twitter couldn't process the plot of this "
+                + f"simulation (processing {result['state']}). Please try "
+                + "again later.",
+            )
+
+    def reply_with_plot(
+        self,
+        mention,
+        plot,
+        media_type=None,
+        settings=None,
+        media_id=None,
+        processing_info=None,
+        wait=True,
+    ):
+        """
+        Uploads a plot and replies to a mention with it once Twitter has processed
+        it.
+
+        Parameters
+        ----------
+            mention : :class:`tweepy.models.Status`
+                The tweet in which the bot was mentioned.
+            plot : str
+                Path of the plot to be uploaded.
+            media_type : str
+                default : None
+                Media type of the plot. Guessed from the extension of `plot` if
+                not passed.
+            settings : dict
+                default : None
+                Settings used to encode the GIF, as returned by
+                `utils.gif_encoder.encode_gif`. Read from the GIF if not passed.
+            media_id : int
+                default : None
+                Media id of the plot if it was already uploaded while it was
+                encoded.
+            processing_info : dict
+                default : None
+                Processing information of the plot if it was already uploaded.
+            wait : bool
+                default : True
+                If this waits for the processing of the plot. The reply is kept
+                in `self.pending_replies` otherwise, and is posted by
+                `post_processed_replies` once the plot is processed.
+        """
+        status_poller = self.upload_plot(plot, media_type, media_id, processing_info)
+        reply = self.plot_reply(
+            mention, plot, media_type, settings, status_poller.media_id
+        )
+
+        self.pending_replies.append((status_poller, mention, reply))
+        if wait:
+            status_poller.wait()
+            self.post_processed_replies()
+
+    def post_processed_replies(self):
+        """
+        Posts the pending replies whose plots have been processed, without
+        waiting for the others. A check of the processing status is only sent
+        when it is due.
+        """
+        pending_replies = []
+        for status_poller, mention, reply in self.pending_replies:
+            result = status_poller.poll()
+            if result is None:
+                pending_replies.append((status_poller, mention, reply))
+                continue
+
+            # the other replies are still posted
+            try:
+                self.post_reply(mention, reply, result)
+            except (RequestException, tweepy.TweepyException) as e:
+                self.log_failed_reply(mention, e)
+        self.pending_replies = pending_replies
+
+    def log_failed_reply(self, mention, exception):
+        """
+        Logs a reply which could not be uploaded or posted.
+
+        Parameters
+        ----------
+            mention : :class:`tweepy.models.Status`
+                The tweet in which the bot was mentioned.
+            exception : Exception
+                Exception raised while replying.
+        """
+        logging.getLogger(__name__).warning(
+            "Could not reply to %s: %s", mention._json["id"], exception
+        )
+
+    def seconds_until_next_check(self):
+        """
+        Returns the time (in seconds) until the processing status of a pending
+        reply should be checked, None if there are no pending replies.
+        """
+        if not self.pending_replies:
+            return None
+
+        return min(
+            status_poller.seconds_until_next_check()
+            for status_poller, _, _ in self.pending_replies
+        )
+
+    def plot_job(self, choice, reply_config, output_dir):
+        """
+        Returns the job which generates the plot of a requested simulation in
+        the pool of warm worker processes.
+
+        Parameters
+        ----------
+            choice : str
+                Can be "model comparison" or "parameter comparison".
+            reply_config : dict
+                Configuration returned by `generate_reply_config`.
+            output_dir : str
+                Directory in which the plot is generated.
+
+        Returns
+        -------
+            func : callable
+            args : tuple
+            kwargs : dict
+                To be passed to :meth:`utils.worker_pool.WorkerPool.submit`.
+        """
+        return (
+            generate_plot,
+            (choice,),
+            {
+                # the models are built (or reused) in the worker
+                "reply_config": to_specs(reply_config),
+                "testing": self.testing,
+                "solution_cache": self.solution_cache,
+                "output_dir": output_dir,
+                "processes": self.processes,
+                "cost_estimator": self.cost_estimator,
+                # the streamed uploads follow the rate limits of the reply
+                "media_stream": MediaStream(**self.share_limits())
+                if self.stream_upload
+                else None,
+            },
+        )
+
+    def process_mentions(self, requests):
+        """
+        Generates the requested simulations in the pool of warm worker processes
+        and replies to every request as soon as its simulation is ready. The
+        replies wait for their plots to be processed by Twitter while the other
+        simulations are generated and uploaded.
+
+        Parameters
+        ----------
+            requests : list
+                Of the form -
+                [
+                    (mention, choice, reply_config),
+                    (mention, choice, reply_config)
+                ]
+        """
+        # of the form - {job_id: (mention, key, job_dir)}
+        jobs = {}
+
+        for mention, choice, reply_config in requests:
+            key = None
+            if self.artifact_store is not None:
+                key = self.artifact_store.generate_key(choice, reply_config)
+                artifact = self.artifact_store.get(key)
+
+                # reuse the stored plot
+                if artifact is not None:
+                    try:
+                        self.reply_with_plot(mention, artifact[0], wait=False)
+                    except (RequestException, tweepy.TweepyException) as e:
+                        self.log_failed_reply(mention, e)
+                    continue
+
+            # every request gets its own output directory
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            job_dir = tempfile.mkdtemp(prefix="job_", dir=self.jobs_dir)
+
+            # queue the requested simulation, the pool runs at most
+            # `max_workers` of them at the same time
+            func, args, kwargs = self.plot_job(choice, reply_config, job_dir)
+            job_id = self.get_worker_pool().submit(func, *args, **kwargs)
+            jobs.update({job_id: (mention, key, job_dir)})
+
+        # reply in the order in which the simulations finish and their plots are
+        # processed
+        while jobs or self.pending_replies:
+            # wake up for the next status check of a pending reply
+            timeout = self.seconds_until_next_check()
+            if jobs:
+                finished = self.get_worker_pool().wait(timeout=timeout)
+            else:
+                time.sleep(timeout)
+                finished = []
+
+            for job_id, return_dict, exception in finished:
+                mention, key, job_dir = jobs.pop(job_id)
+
+                # a failed upload or reply doesn't stop the other requests
+                try:
+                    if exception is None:
+                        plot = return_dict["plot"]
+
+                        # store the plot for repeated requests
+                        if self.artifact_store is not None:
+                            self.artifact_store.put(key, plot)
+
+                        self.reply_with_plot(
+                            mention,
+                            plot,
+                            return_dict["media_type"],
+                            return_dict["plot_settings"],
+                            return_dict["media_id"],
+                            return_dict["processing_info"],
+                            wait=False,
+                        )
+                    else:
+                        self.reply_with_exception(mention, exception[0])
+                except (RequestException, tweepy.TweepyException) as e:
+                    self.log_failed_reply(mention, e)
+                finally:
+                    shutil.rmtree(job_dir, ignore_errors=True)
+                    plt.close()
+
+            self.post_processed_replies()
+
+    def read_mentions(self):
+        """
+        Reads the mentions of the bot with the hashtag "battbot" which were not
+        seen yet, and answers the invalid requests right away.
+
+        Returns
+        -------
+            requests : list
+                Of the form -
+                [
+                    (mention, choice, reply_config),
+                    (mention, choice, reply_config)
+                ]
+                Always empty while testing.
         """
         if self.testing:
             last_seen_id = self.retrieve_tweet_id("bot/last_seen_id.txt")
@@ -326,6 +869,7 @@ class Reply(Upload):
         )
 
         # iterating through all the mentions if not testing
+        requests = []
         if not self.testing:
             for mention in reversed(mentions):
                 # storing the id
@@ -343,83 +887,35 @@ class Reply(Upload):
                     )
                     tweet_text = mention.full_text
 
-                    # creating a custom process to generate the requested simulation
-                    p = Process(target=self.generate_reply, args=(tweet_text,))
-
-                    p.start()
-                    # time-out
-                    p.join(1200)
-
-                    # if the process is alive after 10 minutes
-                    if p.is_alive():  # pragma: no cover
-                        self.api.update_status(
-                            "@"
-                            + mention.user.screen_name
-                            + " Hi there! The simulation took more than "
-                            + "20 minutes and hence, it was cancelled."
-                            + "Please try again with a simpler simulation "
-                            + "(this feature is still in the testing phase).",
-                            mention._json["id"],
-                        )
-
-                        p.kill()
-                        p.join()
-                        return
+                    # read the requested simulation before starting a process, so
+                    # that an invalid request is answered right away
+                    try:
+                        choice, reply_config = self.generate_reply_config(tweet_text)
+                    except Exception as e:
+                        self.reply_with_status(mention, f"{e}")
+                        continue
 
-                    # if there was an Exception in the process
-                    if p.exception:
-                        e, traceback = p.exception
-                        self.api.update_status(
-                            "@" + mention.user.screen_name + f" {e}",
-                            mention._json["id"],
-                        )
+                    requests.append((mention, choice, reply_config))
 
-                        p.kill()
-                        p.join()
-                        return
-
-                    # finding the file which has to be tweeted
-                    if os.path.exists("plot.gif"):
-                        self.plot = "plot.gif"
-                    elif os.path.exists("plot.png"):
-                        self.plot = "plot.png"
-                    self.total_bytes = os.path.getsize(self.plot)
-
-                    # initiate the upload
-                    self.upload_init()
-                    # append the chunks
-                    self.upload_append()
-                    # finalize uplaod
-                    self.upload_finalize()
-
-                    # reply configuration
-                    img = Image.open("plot.gif").size
-                    if img[0] <= 1080:  # pragma: no cover
-                        status = (
-                            "This GIF has been compressed twice, to bring its size down to 15 MB (twitter's limit). "  # noqa
-                            + "Please request a smaller simulation for a better quality GIF."  # noqa
-                        )
-                    else:
-                        status = None
-                    reply = {
-                        "status": status,
-                        "in_reply_to_status_id": mention._json["id"],
-                        "auto_populate_reply_metadata": True,
-                        "media_ids": self.media_id,
-                    }
+        return requests
 
-                    # post the reply
-                    self.post_request(self.post_tweet_url, reply, self.oauth)
-
-                    if os.path.exists("plot.gif"):
-                        os.remove("plot.gif")
-                    if os.path.exists("plot.png"):
-                        os.remove("plot.png")
-                    plt.close()
+    def reply(self):
+        """
+        Replies to a tweet where the bot was mentioned with the
+        hashtag "battbot".
+        """
+        self.process_mentions(self.read_mentions())
 
 
 if __name__ == "__main__":
-    reply = Reply()
-    while True:
-        reply.reply()
-        time.sleep(60)
+    reply = Reply(
+        solution_cache=SolutionCache(),
+        artifact_store=ArtifactStore(),
+        cost_estimator=CostEstimator(),
+        stream_upload=True,
+    )
+    # start the warm workers before the first request arrives
+    reply.get_worker_pool()
+    # the mentions are read every minute while the requested simulations are
+    # generated, uploaded and replied to
+    asyncio.run(ReplyDaemon(reply).run())
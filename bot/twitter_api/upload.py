@@ -1,10 +1,16 @@
-import os
-import sys
+import math
 import time
+import random
+import asyncio
 import tweepy
 import logging
+import mimetypes
 import requests
+import collections
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from twitter_api.api_keys import Keys
+from twitter_api.request_scheduler import RequestScheduler
 from requests_oauthlib import OAuth1
 
 
@@ -24,9 +30,35 @@ class Upload:
             Size of the passed file. Should be used during testing. In a subclasses,
             it can be accessed as `self.total_bytes`, thus passing it as a parameter
             will be redundant.
+        media_type : str
+            default : None
+            Media type of the passed file, "image/gif" or "image/png". Guessed
+            from the extension of `plot` if not passed. In a subclasses, it can be
+            accessed as `self.media_type`.
+        append_window : int
+            default : 4
+            Maximum number of chunks being appended at the same time. Every
+            chunk has an explicit index, so they can be appended in any order.
+        scheduler : :class:`twitter_api.request_scheduler.RequestScheduler`
+            default : None
+            Scheduler (and its session) through which the requests are sent, to
+            be shared by uploads running at the same time so that they all follow
+            the same rate limits. A new one is used if not passed.
     """
 
-    def __init__(self, plot=None, total_bytes=None):
+    # media category of every supported media type
+    media_categories = {"image/gif": "tweet_gif", "image/png": "tweet_image"}
+    # size of the appended chunks, Twitter accepts at most 5 MB
+    chunk_size = 4 * 1024 * 1024
+
+    def __init__(
+        self,
+        plot=None,
+        total_bytes=None,
+        media_type=None,
+        append_window=4,
+        scheduler=None,
+    ):
         self.media_endpoint_url = "https://upload.twitter.com/1.1/media/upload.json"
         self.post_tweet_url = "https://api.twitter.com/1.1/statuses/update.json"
         self.keys = Keys()
@@ -43,10 +75,47 @@ class Upload:
             self.keys.ACCESS_TOKEN_SECRET,
         )
         self.api = tweepy.API(self.auth)
+        # a single session keeps the connections to the API open between the
+        # requests, with a connection for every chunk being appended
+        self.append_window = append_window
+        if scheduler is not None:
+            self.session = scheduler.session
+            self.scheduler = scheduler
+        else:
+            self.session = requests.Session()
+            self.session.mount(
+                "https://", requests.adapters.HTTPAdapter(pool_maxsize=append_window)
+            )
+            # shared by the threads appending the chunks, so that they all follow
+            # the same rate limits
+            self.scheduler = RequestScheduler(self.session)
         self.total_bytes = total_bytes
         self.media_id = None
         self.processing_info = None
         self.plot = plot
+        self.media_type = media_type
+
+    def share_limits(self):
+        """
+        Moves the rate limits of `self.scheduler` to a `multiprocessing.Manager`,
+        so that they can be shared with the uploads of other processes, see
+        :class:`MediaStream`.
+
+        Returns
+        -------
+            shared_limits : dict
+                Of the form - {"limits": dict, "limits_lock": lock}, the proxies
+                of the shared rate limits and of their lock.
+        """
+        if not hasattr(self, "limits_manager"):
+            self.limits_manager = multiprocessing.Manager()
+            self.scheduler.limits = self.limits_manager.dict(self.scheduler.limits)
+            self.scheduler.limits_lock = self.limits_manager.Lock()
+
+        return {
+            "limits": self.scheduler.limits,
+            "limits_lock": self.scheduler.limits_lock,
+        }
 
     def upload_init(self):
         """
@@ -54,21 +123,19 @@ class Upload:
         """
         print("INIT")
 
+        media_type = (
+            self.media_type
+            if self.media_type is not None
+            else mimetypes.guess_type(self.plot)[0]
+        )
+
         # initiate uploading the data
-        if os.path.exists("plot.gif"):
-            request_data = {
-                "command": "INIT",
-                "media_type": "image/gif",
-                "total_bytes": self.total_bytes,
-                "media_category": "tweet_gif",
-            }
-        else:
-            request_data = {
-                "command": "INIT",
-                "media_type": "image/png",
-                "total_bytes": self.total_bytes,
-                "media_category": "tweet_image",
-            }
+        request_data = {
+            "command": "INIT",
+            "media_type": media_type,
+            "total_bytes": self.total_bytes,
+            "media_category": self.media_categories[media_type],
+        }
 
         # post the initial request
         req = self.post_request(self.media_endpoint_url, request_data, self.oauth)
@@ -82,43 +149,89 @@ class Upload:
 
     def upload_append(self):
         """
-        Uploads media in chunks and appends to chunks uploaded
+        Uploads media in chunks and appends to chunks uploaded. At most
+        `append_window` chunks are appended at the same time, and the chunks are
+        read into the buffers of the chunks which were already appended.
         """
-        segment_id = 0
         bytes_sent = 0
-        file = open(self.plot, "rb")
-
-        # upload the media in chunks
-        while bytes_sent < self.total_bytes:
-
-            # initialise a single chunk
-            chunk = file.read(4 * 1024 * 1024)
+        # of the form - deque([(future, buffer, size)])
+        appends = collections.deque()
+
+        def wait_for_oldest():
+            # wait for the oldest chunk being appended and return its buffer
+            nonlocal bytes_sent
+            future, buffer, size = appends.popleft()
+            future.result()
+            bytes_sent += size
+            print("%s of %s bytes uploaded" % (str(bytes_sent), str(self.total_bytes)))
+            return buffer
+
+        with open(self.plot, "rb") as file, ThreadPoolExecutor(
+            max_workers=self.append_window
+        ) as executor:
+            for segment_index in range(math.ceil(self.total_bytes / self.chunk_size)):
+                buffer = (
+                    wait_for_oldest()
+                    if len(appends) == self.append_window
+                    else bytearray(self.chunk_size)
+                )
 
-            print("APPEND")
+                # initialise a single chunk, without copying the buffer
+                size = file.readinto(buffer)
+                future = executor.submit(
+                    self.append_segment, memoryview(buffer)[:size], segment_index
+                )
+                appends.append((future, buffer, size))
 
-            # append the chunks
-            request_data = {
-                "command": "APPEND",
-                "media_id": self.media_id,
-                "segment_index": segment_id,
-            }
+            while appends:
+                wait_for_oldest()
 
-            files = {"media": chunk}
+        print("Upload chunks complete.")
 
-            # post request to append the chunks
-            self.post_request(self.media_endpoint_url, request_data, self.oauth, files)
+    def append_segment(self, chunk, segment_index):
+        """
+        Appends a single chunk to the media being uploaded.
+
+        Parameters
+        ----------
+            chunk : bytes-like
+                At most 5 MB of the media.
+            segment_index : int
+                Position of the chunk in the media, starting from 0.
+        """
+        print("APPEND")
 
-            segment_id = segment_id + 1
-            bytes_sent = file.tell()
+        request_data = {
+            "command": "APPEND",
+            "media_id": self.media_id,
+            "segment_index": segment_index,
+        }
 
-            print("%s of %s bytes uploaded" % (str(bytes_sent), str(self.total_bytes)))
+        files = {"media": chunk}
 
-        print("Upload chunks complete.")
-        file.close()
+        # post request to append the chunk
+        self.post_request(self.media_endpoint_url, request_data, self.oauth, files)
 
-    def upload_finalize(self):
+    def upload_finalize(self, wait=True, max_wait=300):
         """
         Finalizes uploads and starts video processing
+
+        Parameters
+        ----------
+            wait : bool
+                default : True
+                If this waits until the processing of the media is over. The
+                processing can be followed with the returned poller otherwise.
+            max_wait : numerical
+                default : 300
+                Time (in seconds) after which the processing is considered to
+                have timed out.
+
+        Returns
+        -------
+            status_poller : :class:`StatusPoller`
+                Poller of the processing status, its `result` is set if `wait` is
+                True.
         """
         print("FINALIZE")
 
@@ -133,45 +246,45 @@ class Upload:
         # extract the processing information of the GIF and check status
         # until it either passes or fails
         self.processing_info = req.json().get("processing_info", None)
-        self.check_status()
+        status_poller = StatusPoller(
+            self, self.media_id, self.processing_info, max_wait=max_wait
+        )
+        if wait:
+            status_poller.wait()
+            self.processing_info = status_poller.processing_info
+
+        return status_poller
 
-    def check_status(self):
+    def check_status(self, max_wait=300):
         """
-        Checks video processing status
+        Checks video processing status until it either passes, fails or times out.
+
+        Parameters
+        ----------
+            max_wait : numerical
+                default : 300
+                Time (in seconds) after which the processing is considered to
+                have timed out.
+
+        Returns
+        -------
+            result : dict
+                See :class:`StatusPoller`.
         """
-        if self.processing_info is None:  # pragma: no cover
-            return
-
-        state = self.processing_info["state"]
-
-        print("Media processing status is %s " % state)
-
-        if state == u"succeeded":
-            return
-
-        if state == u"failed":  # pragma: no cover
-            sys.exit(0)
-
-        check_after_secs = self.processing_info["check_after_secs"]
-
-        print("Checking after %s seconds" % str(check_after_secs))
-        time.sleep(check_after_secs)
-
-        print("STATUS")
-
-        request_params = {"command": "STATUS", "media_id": self.media_id}
-
-        req = requests.get(
-            url=self.media_endpoint_url, params=request_params, auth=self.oauth
+        status_poller = StatusPoller(
+            self, self.media_id, self.processing_info, max_wait=max_wait
         )
+        result = status_poller.wait()
+        self.processing_info = status_poller.processing_info
 
-        self.processing_info = req.json().get("processing_info", None)
-        self.check_status()
+        return result
 
     def post_request(self, url, data, auth, files=None):
         """
-        Posts a request on the Twitter API and makes
-        sure that the given post request succeeds.
+        Posts a request on the Twitter API through `self.scheduler`, which
+        retries it as soon as the rate limits of the API allow and raises the
+        errors which can't be fixed by retrying, see
+        :class:`twitter_api.request_scheduler.RequestScheduler`.
 
         Paremeters
         ---------
@@ -185,26 +298,350 @@ class Upload:
                 default : None
                 Single chunk of a media file.
         """
-        # logging configs
-        logging.basicConfig(level=logging.INFO)
-        logger = logging.getLogger()
-        logger.setLevel(logging.INFO)
-
-        # try to post request, if the API gives an error, sleep for 5 minutes
-        # and then try again
-        while True:
-            if files is None:
-                req = requests.post(url=url, data=data, auth=auth)
-            else:
-                req = requests.post(url=url, data=data, files=files, auth=auth)
-            if req.status_code >= 200 and req.status_code <= 299:
-                break
-            else:  # pragma: no cover
-                logger.info(req.status_code)
-                logger.info(req.text)
-                logger.info(
-                    "Twitter API internal error." + " Trying again in 5 minutes"
-                )
-                time.sleep(300)
+        if files is None:
+            return self.scheduler.post(url=url, data=data, auth=auth)
+
+        return self.scheduler.post(url=url, data=data, files=files, auth=auth)
+
+
+class StatusPoller:
+    """
+    Follows the processing of an uploaded media without blocking between the
+    STATUS requests. `poll` only sends a request once the check is due, so that a
+    loop can keep doing other work and call it whenever
+    `seconds_until_next_check` has passed. `wait` and `wait_async` poll until the
+    processing is over. The time between the checks is the time asked by Twitter
+    (`check_after_secs`), growing exponentially with the number of checks (up to
+    `max_interval`) and randomly lengthened by up to `jitter`.
+
+    Parameters
+    ----------
+        upload : :class:`Upload`
+            Upload whose scheduler and credentials are used for the requests.
+        media_id : int
+            Media id of the uploaded media.
+        processing_info : dict
+            default : None
+            Processing information returned by FINALIZE, the media needs no
+            processing if None.
+        max_wait : numerical
+            default : 300
+            Time (in seconds) after which the processing is considered to have
+            timed out.
+        max_interval : numerical
+            default : 30
+            Maximum time (in seconds) between 2 checks.
+        jitter : numerical
+            default : 0.2
+            Maximum fraction by which the time between 2 checks is lengthened.
+
+    The result of the processing is of the form -
+    {
+        "media_id": int,
+        "state": "succeeded", "failed" or "timed out",
+        "error": dict or None,
+        "checks": int,
+        "waited": numerical,
+    }
+    """
+
+    def __init__(
+        self,
+        upload,
+        media_id,
+        processing_info=None,
+        max_wait=300,
+        max_interval=30,
+        jitter=0.2,
+    ):
+        self.upload = upload
+        self.media_id = media_id
+        self.processing_info = processing_info
+        self.max_wait = max_wait
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.start_time = time.time()
+        self.checks = 0
+        self.result = None
+        self.next_check = self.start_time + self.interval()
+
+    def interval(self):
+        """
+        Returns the time (in seconds) until the next check.
+        """
+        check_after_secs = (self.processing_info or {}).get("check_after_secs", 1)
+        interval = min(max(check_after_secs, 2 ** self.checks), self.max_interval)
+
+        return interval * random.uniform(1, 1 + self.jitter)
+
+    def seconds_until_next_check(self):
+        """
+        Returns the time (in seconds) until a check is due, 0 if the processing is
+        over. Never later than the time-out.
+        """
+        if self.done():
+            return 0
+
+        next_check = min(self.next_check, self.start_time + self.max_wait)
+
+        return max(0, next_check - time.time())
+
+    def done(self):
+        """
+        Returns True if the processing is over, updating `result` if it just
+        ended.
+        """
+        if self.result is not None:
+            return True
+
+        state = (
+            self.processing_info["state"]
+            if self.processing_info is not None
+            else "succeeded"
+        )
+        if state not in ["succeeded", "failed"]:
+            if time.time() - self.start_time < self.max_wait:
+                return False
+            state = "timed out"
+
+        print("Media processing status is %s " % state)
+
+        self.result = {
+            "media_id": self.media_id,
+            "state": state,
+            "error": (self.processing_info or {}).get("error"),
+            "checks": self.checks,
+            "waited": time.time() - self.start_time,
+        }
+
+        return True
+
+    def request_status(self):
+        """
+        Sends a STATUS request and updates the processing information. A failed
+        request is checked again later.
+        """
+        print("STATUS")
+
+        request_params = {"command": "STATUS", "media_id": self.media_id}
+
+        # a failed request is retried by the poller, without blocking
+        try:
+            req = self.upload.scheduler.get(
+                url=self.upload.media_endpoint_url,
+                params=request_params,
+                auth=self.upload.oauth,
+                max_retries=0,
+            )
+            self.processing_info = req.json().get("processing_info", None)
+        except (requests.RequestException, ValueError) as e:  # pragma: no cover
+            logging.getLogger(__name__).warning("STATUS request failed: %s", e)
+
+        self.checks += 1
+        self.next_check = time.time() + self.interval()
+
+    def poll(self):
+        """
+        Checks the status if a check is due, without waiting.
+
+        Returns
+        -------
+            result : dict or None
+                None while the media is still being processed.
+        """
+        if not self.done() and self.seconds_until_next_check() == 0:
+            self.request_status()
+            self.done()
+
+        return self.result
+
+    def wait(self):
+        """
+        Checks the status until the processing is over, sleeping between the
+        checks.
+
+        Returns
+        -------
+            result : dict
+        """
+        while self.poll() is None:
+            time.sleep(self.seconds_until_next_check())
+
+        return self.result
+
+    async def wait_async(self):
+        """
+        The same as `wait`, but lets the event loop run between the checks and
+        sends the requests in a thread.
+
+        Returns
+        -------
+            result : dict
+        """
+        while not self.done():
+            await asyncio.sleep(self.seconds_until_next_check())
+            if not self.done() and self.seconds_until_next_check() == 0:
+                await asyncio.to_thread(self.request_status)
 
-        return req
+        return self.result
+
+
+class MediaStream:
+    """
+    Uploads a media while it is being written, to be used as the `stream` of
+    `utils.gif_encoder.encode_gif`. The upload is initialized with the size of the
+    media before it is written, every complete segment is appended (in background
+    threads, at most `append_window` at the same time) while the rest of the media
+    is still being written, and the upload is finalized when the stream is closed.
+    The processing of the media is not waited for, it should be followed (with
+    :class:`StatusPoller`, from `media_id` and `processing_info`) by the process
+    which uses the media. A stream which was not started can be passed to another
+    process.
+
+    Parameters
+    ----------
+        media_type : str
+            default : "image/gif"
+            Media type of the media.
+        segment_size : int
+            default : 4194304 (4 MB)
+            Size of the appended segments, at most 5 MB.
+        append_window : int
+            default : 4
+            Maximum number of segments being appended at the same time, writing
+            waits for a segment to be appended once the window is full.
+        limits : dict
+            default : None
+            Rate limits shared with the other uploads, see
+            :meth:`Upload.share_limits`. The upload only follows its own rate
+            limits if None.
+        limits_lock : lock
+            default : None
+            Lock of `limits`, see :meth:`Upload.share_limits`.
+    """
+
+    def __init__(
+        self,
+        media_type="image/gif",
+        segment_size=Upload.chunk_size,
+        append_window=4,
+        limits=None,
+        limits_lock=None,
+    ):
+        self.media_type = media_type
+        self.segment_size = segment_size
+        self.append_window = append_window
+        self.limits = limits
+        self.limits_lock = limits_lock
+        self.upload = None
+        self.media_id = None
+        self.processing_info = None
+        self.buffer = bytearray()
+        self.segment_index = 0
+        self.executor = None
+        self.appends = []
+
+    def start(self, total_bytes):
+        """
+        Initializes the upload.
+
+        Parameters
+        ----------
+            total_bytes : int
+                Exact size of the media which will be written.
+        """
+        # a stream can be started again after it was aborted
+        self.buffer = bytearray()
+        self.segment_index = 0
+        self.appends = []
+
+        session = requests.Session()
+        session.mount(
+            "https://", requests.adapters.HTTPAdapter(pool_maxsize=self.append_window)
+        )
+        self.upload = Upload(
+            total_bytes=total_bytes,
+            media_type=self.media_type,
+            append_window=self.append_window,
+            scheduler=RequestScheduler(
+                session, limits=self.limits, limits_lock=self.limits_lock
+            ),
+        )
+        self.upload.upload_init()
+        self.media_id = self.upload.media_id
+        self.executor = ThreadPoolExecutor(max_workers=self.append_window)
+
+    def write(self, data):
+        """
+        Writes a part of the media, the complete segments are appended right away.
+
+        Parameters
+        ----------
+            data : bytes
+        """
+        self.buffer += data
+        while len(self.buffer) >= self.segment_size:
+            self.append(bytes(self.buffer[:self.segment_size]))
+            del self.buffer[:self.segment_size]
+
+    def append(self, segment):
+        """
+        Appends a segment in the background.
+
+        Parameters
+        ----------
+            segment : bytes
+        """
+        # the errors of the appends are only raised when the stream is closed, so
+        # that a failed upload doesn't stop the media from being written
+        in_flight = [append for append in self.appends if not append.done()]
+        if len(in_flight) >= self.append_window:
+            wait(in_flight, return_when=FIRST_COMPLETED)
+
+        self.appends.append(
+            self.executor.submit(
+                self.upload.append_segment, segment, self.segment_index
+            )
+        )
+        self.segment_index += 1
+
+    def close(self):
+        """
+        Appends the last segment, waits for all the segments to be appended and
+        finalizes the upload, without waiting for the media to be processed. The
+        errors of the appends are raised here.
+
+        Returns
+        -------
+            status_poller : :class:`StatusPoller`
+                Poller of the processing status of the media, its processing
+                information is also stored in `self.processing_info`.
+        """
+        if self.buffer:
+            self.append(bytes(self.buffer))
+            self.buffer.clear()
+
+        try:
+            for append in self.appends:
+                append.result()
+        finally:
+            self.executor.shutdown()
+
+        # a worker shouldn't be blocked while Twitter processes the media
+        status_poller = self.upload.upload_finalize(wait=False)
+        self.processing_info = status_poller.processing_info
+
+        return status_poller
+
+    def abort(self):
+        """
+        Stops the upload, the media is never finalized (and is discarded by
+        Twitter).
+        """
+        self.buffer.clear()
+        for append in self.appends:
+            append.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.media_id = None
+        self.processing_info = None
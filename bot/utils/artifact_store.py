@@ -0,0 +1,90 @@
+import os
+import shutil
+from utils.disk_cache import DiskCache
+from utils.canonical_hash import canonical_hash
+
+
+class ArtifactStore(DiskCache):
+    """
+    An on-disk store of the Twitter-ready plots (GIFs and PNGs), keyed by the
+    configuration of the simulation which generated them. A request which has
+    already been plotted can then be uploaded directly. The least recently used
+    plots are evicted once the size of the store exceeds `max_size`.
+
+    Parameters
+    ----------
+        store_dir : str
+            default : "artifact_store"
+            Directory in which the plots are stored.
+        max_size : numerical
+            default : 524288000 (500 MB)
+            Maximum size of the store in bytes.
+    """
+
+    extensions = [".gif", ".png"]
+
+    def __init__(self, store_dir="artifact_store", max_size=524288000):
+        super().__init__(store_dir, max_size)
+
+    def generate_key(self, choice, config):
+        """
+        Generates the key of a plot from the normalized configuration of the
+        simulation.
+
+        Parameters
+        ----------
+            choice : str
+                Can be "model comparison", "parameter comparison" or
+                "degradation comparison".
+            config : dict
+                The configuration passed to `random_plot_generator`.
+
+        Returns
+        -------
+            key : str
+        """
+        return canonical_hash({"choice": choice, "config": config})
+
+    def get(self, key):
+        """
+        Finds a plot in the store.
+
+        Parameters
+        ----------
+            key : str
+
+        Returns
+        -------
+            artifact : tuple or None
+                (path, total_bytes) of the stored plot, None if the plot is not in
+                the store.
+        """
+        for extension in self.extensions:
+            path = os.path.join(self.cache_dir, key + extension)
+            if os.path.exists(path):
+                self.touch(path)
+                return path, os.path.getsize(path)
+
+        return None
+
+    def put(self, key, plot):
+        """
+        Copies a plot in the store and evicts the least recently used plots if
+        the store is too big.
+
+        Parameters
+        ----------
+            key : str
+            plot : str
+                Path of the plot to be stored.
+        """
+        extension = os.path.splitext(plot)[1]
+        path = os.path.join(self.cache_dir, key + extension)
+
+        # copy to a temporary file first so that a concurrent reader never sees
+        # a partially written plot
+        tmp_path = path + "." + str(os.getpid()) + ".tmp"
+        shutil.copyfile(plot, tmp_path)
+        os.replace(tmp_path, path)
+
+        self.evict()
@@ -0,0 +1,99 @@
+import json
+import hashlib
+import numbers
+import pybamm
+import numpy as np
+from utils.parameter_value_generator import FunctionLike
+
+
+def canonicalize(obj, significant_digits=10):
+    """
+    Converts an object used in a configuration into a JSON serializable structure
+    which is the same for equivalent objects, in every process.
+
+    Parameters
+    ----------
+        obj : object
+            Can be a model, ParameterValues, a (nested) container or a scalar.
+        significant_digits : int
+            default : 10
+            Number of significant digits to which floats are rounded, so that
+            values which only differ by floating point noise are treated as equal.
+
+    Returns
+    -------
+        canonical_obj : object
+
+    Raises
+    ------
+        TypeError
+            If the object is of a type which has no canonical form. Its repr would
+            contain its address, so the keys generated from it would never match
+            in another process.
+    """
+    if obj is None or isinstance(obj, (bool, str)):
+        return obj
+    elif isinstance(obj, numbers.Real):
+        # integers and floats with the same value are treated as equal
+        return float("{:.{}g}".format(float(obj), significant_digits))
+    elif isinstance(obj, np.ndarray):
+        return canonicalize(obj.tolist(), significant_digits)
+    elif isinstance(obj, np.generic):
+        return canonicalize(obj.item(), significant_digits)
+    elif isinstance(obj, dict):
+        return {
+            str(key): canonicalize(value, significant_digits)
+            for key, value in obj.items()
+        }
+    elif isinstance(obj, (list, tuple)):
+        return [canonicalize(item, significant_digits) for item in obj]
+    elif isinstance(obj, (set, frozenset)):
+        return sorted(
+            (canonicalize(item, significant_digits) for item in obj),
+            key=lambda x: json.dumps(x, sort_keys=True),
+        )
+    elif isinstance(obj, pybamm.BaseModel):
+        return {
+            "model": type(obj).__module__ + "." + type(obj).__qualname__,
+            "options": canonicalize(
+                dict(obj.options) if isinstance(obj.options, dict) else None,
+                significant_digits,
+            ),
+        }
+    elif isinstance(obj, pybamm.ParameterValues):
+        return canonicalize(dict(obj.items()), significant_digits)
+    elif isinstance(obj, pybamm.Symbol):
+        # the parameters which are given as expressions
+        return {
+            "symbol": type(obj).__module__ + "." + type(obj).__qualname__,
+            "expression": str(obj),
+        }
+    elif isinstance(obj, FunctionLike):
+        return {
+            "function": canonicalize(obj.fun, significant_digits),
+            "parameter": canonicalize(obj.parameter, significant_digits),
+        }
+    elif callable(obj) and hasattr(obj, "__qualname__"):
+        return obj.__module__ + "." + obj.__qualname__
+
+    raise TypeError(f"Can't canonicalize an object of type {type(obj).__name__}")
+
+
+def canonical_hash(obj):
+    """
+    Generates a hash which only depends on the content of the given object.
+
+    Parameters
+    ----------
+        obj : object
+            Any object accepted by `canonicalize`.
+
+    Returns
+    -------
+        hash : str
+            SHA-256 hex digest of the canonical form of the object.
+    """
+    canonical_obj = json.dumps(
+        canonicalize(obj), sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical_obj.encode("utf-8")).hexdigest()
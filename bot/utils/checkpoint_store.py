@@ -0,0 +1,39 @@
+import os
+from utils.solution_cache import SolutionCache
+
+
+class CheckpointStore(SolutionCache):
+    """
+    An on-disk store of partially solved experiments, keyed like
+    :class:`utils.solution_cache.SolutionCache`. Every checkpoint is the solution
+    of the cycles completed so far, which can be passed to
+    `pybamm.Simulation.solve` as the starting solution of the remaining cycles,
+    so that long experiments can continue after the process was killed or
+    restarted. The least recently used checkpoints are evicted once the size of
+    the store exceeds `max_size`.
+
+    Parameters
+    ----------
+        checkpoint_dir : str
+            default : "checkpoints"
+            Directory in which the checkpoints are stored.
+        max_size : numerical
+            default : 1073741824 (1 GB)
+            Maximum size of the store in bytes.
+    """
+
+    def __init__(self, checkpoint_dir="checkpoints", max_size=1073741824):
+        super().__init__(checkpoint_dir, max_size)
+
+    def remove(self, key):
+        """
+        Removes the checkpoint of an experiment, once it is completely solved.
+
+        Parameters
+        ----------
+            key : str
+        """
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,474 @@
+import os
+import re
+import json
+import fcntl
+import numbers
+import numpy as np
+
+
+class CostExceeded(Exception):
+    """
+    Raised when the estimated runtime of a configuration does not fit in its
+    budget, even after reducing its number of cycles.
+
+    Parameters
+    ----------
+        estimate : numerical
+            Estimated runtime (in seconds) of the configuration.
+        budget : numerical
+            Budget (in seconds) of the configuration.
+        max_number : int
+            Largest number of cycles which fits in the budget, 0 if none does, None
+            if the configuration is not an experiment.
+    """
+
+    def __init__(self, estimate, budget, max_number):
+        super().__init__(
+            f"Estimated runtime of {estimate:.0f} s exceeds the budget of "
+            + f"{budget:.0f} s"
+        )
+        self.estimate = estimate
+        self.budget = budget
+        self.max_number = max_number
+
+
+# the costs below are rough guesses of the relative cost of the configurations
+# (the DFN is slower than the SPMe, which is slower than the SPM, and the
+# degradation options add equations to solve), not measurements. Only their
+# ratios matter once the estimates are corrected with the recorded runtimes, and
+# the configurations are not shrunk or rejected on them alone, see
+# `CostEstimator.calibrated`
+
+# seconds to solve a single one hour step with the model
+step_costs = {
+    "SPM": 0.1,
+    "SPMe": 0.2,
+    "DFN": 0.3,
+}
+
+# factors by which the model options (option: value) make the solve slower
+option_factors = {
+    ("SEI", "ec reaction limited"): 1.5,
+    ("SEI", "reaction limited"): 1.5,
+    ("SEI", "solvent-diffusion limited"): 1.5,
+    ("SEI", "electron-migration limited"): 1.5,
+    ("SEI", "interstitial-diffusion limited"): 1.5,
+    ("SEI porosity change", "true"): 1.5,
+    ("particle mechanics", "swelling only"): 2,
+    ("particle mechanics", "swelling and cracking"): 2.5,
+    ("loss of active material", "stress-driven"): 1.5,
+}
+
+# factors by which the parameter values make the solve slower
+chemistry_factors = {
+    "Ai2020": 1.2,
+    "OKane2022": 1.5,
+}
+
+# seconds to build, discretise and set up a single simulation
+setup_cost = 2
+# seconds to plot a comparison (GIF) and a degradation comparison (PNG), and the
+# additional seconds for every simulation in the plot
+plot_costs = {
+    "model comparison": (10, 2),
+    "parameter comparison": (10, 2),
+    "degradation comparison": (2, 0.5),
+}
+
+
+def step_duration(step, capacity):
+    """
+    Estimates the duration (in hours) of an experiment step.
+
+    Parameters
+    ----------
+        step : str
+            An experiment step, for example "Discharge at 1 C until 3.3 V".
+        capacity : numerical
+            Nominal capacity of the cell in A.h, used for the steps with a current.
+
+    Returns
+    -------
+        duration : numerical
+    """
+    if not isinstance(step, str):
+        return 1
+
+    step = step.lower()
+    units = {"hour": 1, "minute": 1 / 60, "second": 1 / 3600}
+
+    # explicit durations - "Rest for 1 hour", "Discharge at C/10 for 10 hours"
+    duration = re.search(r"for (\d*\.?\d+) ?(hour|minute|second)", step)
+    if duration is not None:
+        return float(duration.group(1)) * units[duration.group(2)]
+
+    # holds and rests until a condition
+    if step.startswith("hold") or step.startswith("rest"):
+        return 0.5
+
+    # C-rates - "at C/10", "at 2 C", "at 0.5C"
+    c_rate = re.search(r"at c/(\d*\.?\d+)", step)
+    if c_rate is not None:
+        return float(c_rate.group(1))
+    c_rate = re.search(r"at (\d*\.?\d+) ?c\b", step)
+    if c_rate is not None and float(c_rate.group(1)) > 0:
+        return 1 / float(c_rate.group(1))
+
+    # currents - "at 1 A", "at 500 mA"
+    current = re.search(r"at (\d*\.?\d+) ?(ma|a)\b", step)
+    if current is not None and float(current.group(1)) > 0:
+        current_value = float(current.group(1)) * (
+            1e-3 if current.group(2) == "ma" else 1
+        )
+        return capacity / current_value
+
+    return 1
+
+
+class CostEstimator:
+    """
+    Estimates the runtime (solve and plot) of a configuration before it is
+    solved, from the models, their options, the chemistry and the length of the
+    experiment. The estimates are corrected with the runtimes of the previous
+    configurations of the same kind, which are recorded in a JSON file. The
+    configurations are only reduced or rejected once `min_history` runtimes have
+    been recorded, as the uncorrected estimates are only rough guesses.
+
+    The history is locked with `fcntl`, so this module can only be used on POSIX
+    systems.
+
+    Parameters
+    ----------
+        history_file : str
+            default : "cost_history.json"
+            File in which the runtimes of the previous configurations are stored.
+        budget : numerical
+            default : None
+            Runtime (in seconds) which the configurations should fit in, see
+            `fit`.
+        max_history : int
+            default : 500
+            Maximum number of runtimes kept in `history_file`.
+        min_history : int
+            default : 10
+            Number of runtimes which should be recorded before the estimates are
+            used to reduce or reject configurations.
+    """
+
+    def __init__(
+        self,
+        history_file="cost_history.json",
+        budget=None,
+        max_history=500,
+        min_history=10,
+    ):
+        # an absolute path keeps the history usable after a change of the working
+        # directory
+        self.history_file = os.path.abspath(history_file)
+        self.budget = budget
+        self.max_history = max_history
+        self.min_history = min_history
+
+    def simulations(self, choice, config):
+        """
+        Returns the model and the parameter values of every simulation of a
+        configuration.
+
+        Parameters
+        ----------
+            choice : str
+                Can be "model comparison", "parameter comparison" or
+                "degradation comparison".
+            config : dict
+                Configuration returned by `plotting.config_generator` or
+                `twitter_api.tweet_reply.Reply.generate_reply_config`.
+
+        Returns
+        -------
+            simulations : list
+                Of the form -
+                [
+                    (model, parameter_values),
+                    (model, parameter_values)
+                ]
+        """
+        if choice == "degradation comparison":
+            return [(config["model"], params) for params in config["param_values"]]
+        elif choice == "model comparison":
+            return [
+                (model, config["params"]) for model in config["models_for_comp"].values()
+            ]
+        else:
+            # a random parameter comparison has 2 or 3 simulations
+            number_of_comp = (
+                len(config["varied_values_override"])
+                if config.get("varied_values_override") is not None
+                else 3
+            )
+            model = list(config["models_for_comp"].values())[0]
+            return [(model, config["params"])] * number_of_comp
+
+    def signature(self, choice, config):
+        """
+        Returns the kind of a configuration, the runtimes of the previous
+        configurations of the same kind correct its estimate.
+
+        Parameters
+        ----------
+            choice : str
+            config : dict
+
+        Returns
+        -------
+            signature : str
+        """
+        models = sorted(
+            type(model).__name__ for model, _ in self.simulations(choice, config)
+        )
+        return "|".join([choice, config["chemistry"]] + models)
+
+    def heuristic(self, choice, config):
+        """
+        Estimates the runtime of a configuration without its history.
+
+        Parameters
+        ----------
+            choice : str
+            config : dict
+
+        Returns
+        -------
+            fixed_cost : numerical
+                Seconds to set up the simulations and to plot them.
+            cycle_cost : numerical
+                Seconds to solve a single cycle of every simulation, or the whole
+                simulations if the configuration is not an experiment.
+        """
+        simulations = self.simulations(choice, config)
+        plot_cost, plot_cost_per_simulation = plot_costs[choice]
+        fixed_cost = plot_cost + len(simulations) * (
+            setup_cost + plot_cost_per_simulation
+        )
+
+        cycle_cost = 0
+        for model, params in simulations:
+            factor = step_costs.get(type(model).__name__, step_costs["DFN"])
+            for option, value in (model.options or {}).items():
+                factor *= option_factors.get((option, value), 1)
+            factor *= chemistry_factors.get(config["chemistry"], 1)
+
+            capacity = params["Nominal cell capacity [A.h]"]
+            if config.get("cycle") is not None:
+                steps = [
+                    step
+                    for cycle in config["cycle"]
+                    for step in (cycle if isinstance(cycle, tuple) else (cycle,))
+                ]
+            else:
+                # a single discharge with the current function, at 1C if the
+                # current is not a constant
+                current = params["Current function [A]"]
+                steps = [
+                    f"Discharge at {current} A"
+                    if isinstance(current, numbers.Number)
+                    else "Discharge at 1 C"
+                ]
+
+            # every step costs a fixed part and a part growing with its duration
+            cycle_cost += factor * sum(
+                0.5 + min(step_duration(step, capacity), 24) for step in steps
+            )
+
+        return fixed_cost, cycle_cost
+
+    def load_history(self):
+        """
+        Returns the runtimes of the previous configurations.
+
+        Returns
+        -------
+            history : list
+                Of the form -
+                [
+                    {"signature": str, "estimate": numerical, "runtime": numerical},
+                ]
+        """
+        try:
+            with open(self.history_file) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def correction(self, signature, history):
+        """
+        Returns the factor by which the heuristic estimates of a kind of
+        configuration are off, the median ratio of the recorded runtimes to their
+        estimates. The runtimes of all the configurations are used if none of
+        the same kind were recorded.
+
+        Parameters
+        ----------
+            signature : str
+            history : list
+
+        Returns
+        -------
+            correction : numerical
+        """
+        ratios = [
+            entry["runtime"] / entry["estimate"]
+            for entry in history
+            if entry["signature"] == signature and entry["estimate"] > 0
+        ]
+        if not ratios:
+            ratios = [
+                entry["runtime"] / entry["estimate"]
+                for entry in history
+                if entry["estimate"] > 0
+            ]
+
+        return float(np.median(ratios)) if ratios else 1
+
+    def calibrated(self):
+        """
+        Returns True if enough runtimes have been recorded for the estimates to
+        reduce or reject configurations.
+        """
+        return len(self.load_history()) >= self.min_history
+
+    def costs(self, choice, config):
+        """
+        Returns the fixed and the per cycle costs of a configuration, corrected
+        with the history. See `heuristic`.
+        """
+        fixed_cost, cycle_cost = self.heuristic(choice, config)
+        correction = self.correction(
+            self.signature(choice, config), self.load_history()
+        )
+
+        return fixed_cost * correction, cycle_cost * correction
+
+    def estimate(self, choice, config):
+        """
+        Estimates the runtime (in seconds) of a configuration.
+
+        Parameters
+        ----------
+            choice : str
+            config : dict
+
+        Returns
+        -------
+            estimate : numerical
+        """
+        fixed_cost, cycle_cost = self.costs(choice, config)
+
+        return fixed_cost + cycle_cost * (config.get("number") or 1)
+
+    def max_number(self, choice, config, budget=None):
+        """
+        Returns the largest number of cycles (at most the number of the
+        configuration) with which the configuration fits in a budget.
+
+        Parameters
+        ----------
+            choice : str
+            config : dict
+            budget : numerical
+                default : None
+                Budget in seconds, `self.budget` if not passed.
+
+        Returns
+        -------
+            max_number : int
+                0 if not even a single cycle fits in the budget, None if the
+                configuration is not an experiment.
+        """
+        if config.get("number") is None:
+            return None
+
+        budget = budget if budget is not None else self.budget
+        fixed_cost, cycle_cost = self.costs(choice, config)
+        if cycle_cost <= 0:  # pragma: no cover
+            return config["number"]
+
+        return int(
+            np.clip(np.floor((budget - fixed_cost) / cycle_cost), 0, config["number"])
+        )
+
+    def fit(self, choice, config, budget=None):
+        """
+        Reduces the number of cycles of a configuration (in place) so that it fits
+        in a budget.
+
+        Parameters
+        ----------
+            choice : str
+            config : dict
+            budget : numerical
+                default : None
+                Budget in seconds, `self.budget` if not passed. Nothing is done if
+                both are None, or if the estimator is not `calibrated` yet.
+
+        Returns
+        -------
+            config : dict
+
+        Raises
+        ------
+            CostExceeded
+                If the configuration does not fit in the budget with a single
+                cycle.
+        """
+        budget = budget if budget is not None else self.budget
+        if budget is None or not self.calibrated():
+            return config
+
+        estimate = self.estimate(choice, config)
+        if estimate <= budget:
+            return config
+
+        max_number = self.max_number(choice, config, budget)
+        if not max_number:
+            raise CostExceeded(estimate, budget, max_number)
+        config["number"] = max_number
+
+        return config
+
+    def record(self, choice, config, runtime):
+        """
+        Records the runtime of a configuration, to correct the next estimates.
+        Can be called from several processes at the same time.
+
+        Parameters
+        ----------
+            choice : str
+            config : dict
+            runtime : numerical
+                Runtime of the configuration in seconds.
+        """
+        fixed_cost, cycle_cost = self.heuristic(choice, config)
+        directory = os.path.dirname(self.history_file)
+        os.makedirs(directory, exist_ok=True)
+
+        # the processes recording at the same time take turns, so that no entry
+        # is lost between reading and rewriting the history
+        with open(self.history_file + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            history = self.load_history()
+            history.append(
+                {
+                    "signature": self.signature(choice, config),
+                    "estimate": fixed_cost + cycle_cost * (config.get("number") or 1),
+                    "runtime": runtime,
+                }
+            )
+            history = history[-self.max_history:]
+
+            # a complete file replaces the old one, so that a concurrent reader
+            # never sees a partial history
+            tmp_file = self.history_file + f".{os.getpid()}.tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(history, f)
+            os.replace(tmp_file, self.history_file)
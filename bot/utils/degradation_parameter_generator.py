@@ -1,5 +1,6 @@
 import pybamm
 import random
+from utils.parameter_registry import get_parameter_values
 from utils.parameter_value_generator import parameter_value_generator
 
 
@@ -60,7 +61,7 @@ def degradation_parameter_generator(
             Parameter that has been varied.
     """
 
-    params = pybamm.ParameterValues(chemistry)
+    params = get_parameter_values(chemistry)
 
     if chemistry == "Mohtat2020":
         params.update(
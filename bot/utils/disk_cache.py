@@ -0,0 +1,63 @@
+import os
+
+
+class DiskCache:
+    """
+    Base class for the on-disk caches of the bot. Every entry is a single file in
+    `cache_dir`, and the least recently used entries are evicted once the size of
+    the cache exceeds `max_size`.
+
+    Parameters
+    ----------
+        cache_dir : str
+            Directory in which the entries are stored.
+        max_size : numerical
+            Maximum size of the cache in bytes.
+    """
+
+    def __init__(self, cache_dir, max_size):
+        # an absolute path keeps the cache usable after a change of the working
+        # directory
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def touch(self, path):
+        """
+        Marks an entry as recently used.
+
+        Parameters
+        ----------
+            path : str
+                Path of the entry.
+        """
+        os.utime(path)
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the size of the cache is
+        less than or equal to `max_size`.
+        """
+        entries = []
+        for file in os.listdir(self.cache_dir):
+            # skip the entries which are still being written
+            if file.endswith(".tmp"):
+                continue
+            path = os.path.join(self.cache_dir, file)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # pragma: no cover
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(entry[1] for entry in entries)
+
+        # oldest entries first
+        for mtime, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:  # pragma: no cover
+                pass
+            total_size -= size
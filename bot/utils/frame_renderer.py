@@ -0,0 +1,432 @@
+import copy
+import numpy as np
+import multiprocessing
+import matplotlib.pyplot as plt
+from PIL import Image
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+def render_chunk(chunk):
+    """
+    Renders a chunk of consecutive frames, in a worker process.
+
+    Parameters
+    ----------
+        chunk : tuple
+            Of the form - (QuickPlotFrames, indices, resolution)
+            with the indices of the frames and the dimensions which the frames
+            should fit in.
+
+    Returns
+    -------
+        frames : list
+            "RGB" mode frames, in the order of the indices.
+    """
+    frames, indices, resolution = chunk
+
+    return list(frames.render_frames(indices, resolution))
+
+
+def adaptive_time_array(
+    quick_plot,
+    max_frames=80,
+    min_change=1 / 80,
+    time_weight=0.25,
+    number_of_samples=1000,
+):
+    """
+    Picks the frame times from the solutions, so that the frames are dense where
+    the plotted variables change quickly and sparse where they barely change
+    (rests, holds). The frames are evenly spaced along an "arc length" which adds
+    up how much the plotted variables change (relative to their range) and, with
+    a smaller weight, how much time passes.
+
+    Parameters
+    ----------
+        quick_plot : :class:`pybamm.QuickPlot`
+            QuickPlot of the solutions.
+        max_frames : int
+            default : 80
+            Maximum number of frames.
+        min_change : numerical
+            default : 1 / 80
+            Arc length between 2 frames below which frames are dropped, the
+            default gives a GIF with 80 frames for variables changing steadily.
+        time_weight : numerical
+            default : 0.25
+            Weight of the time in the arc length, relative to the variables. Should
+            be positive so that the frames cover the whole time span.
+        number_of_samples : int
+            default : 1000
+            Number of times at which the variables are sampled to measure how
+            much they change.
+
+    Returns
+    -------
+        time_array : numpy.ndarray
+            Times (in the QuickPlot's time unit) of the frames.
+    """
+    t = np.linspace(quick_plot.min_t, quick_plot.max_t, number_of_samples)
+    time_in_seconds = t * quick_plot.time_scaling_factor
+
+    changes = []
+    for key, variable_lists in quick_plot.variables.items():
+        spatial_vars = quick_plot.spatial_variable_dict[key]
+        for i, variable_list in enumerate(variable_lists):
+            # a solution which ends earlier doesn't change after its end
+            ts_seconds = quick_plot.ts_seconds[i]
+            clipped_time = np.clip(time_in_seconds, ts_seconds[0], ts_seconds[-1])
+            for variable in variable_list:
+                values = np.reshape(
+                    variable(clipped_time, **spatial_vars, warn=False),
+                    (-1, number_of_samples),
+                )
+                # constant variables (up to the solver's noise) don't change
+                variable_range = np.nanmax(values) - np.nanmin(values)
+                if not variable_range > 1e-6 * np.nanmax(np.abs(values)):
+                    continue
+                # the change of the point which changes the most
+                change = np.nanmax(np.abs(np.diff(values, axis=1)), axis=0)
+                changes.append(np.nan_to_num(change) / variable_range)
+
+    change = np.mean(changes, axis=0) if changes else np.zeros(number_of_samples - 1)
+    arc_length = np.concatenate([[0], np.cumsum(change)]) + time_weight * (
+        t - t[0]
+    ) / (t[-1] - t[0])
+
+    number_of_frames = int(
+        np.clip(
+            np.ceil(arc_length[-1] / min_change) + 1, min(2, max_frames), max_frames
+        )
+    )
+
+    return np.interp(np.linspace(0, arc_length[-1], number_of_frames), arc_length, t)
+
+
+class QuickPlotFrames:
+    """
+    Renders the frames of a GIF from a QuickPlot in memory. Every frame is drawn
+    with the DPI which makes the figure fit in the requested resolution, so the
+    frames are never written to the disk or downsampled from a bigger image.
+
+    The figure (axes, labels, legends and layout) is built once for all the frames
+    rendered together, and only the time markers and the y-data of the lines are
+    updated for every frame. When the axes don't change between frames, the
+    static parts of the figure are drawn once and the updated lines are blitted
+    on top of them. The lines are then updated from arrays in which the plotted
+    variables are evaluated once on all the frame times, instead of evaluating
+    every variable of every solution at every frame.
+
+    Parameters
+    ----------
+        quick_plot : :class:`pybamm.QuickPlot`
+            QuickPlot of the solutions.
+        number_of_frames : int
+            default : 80
+            Number of frames, evenly spaced between the first and the last time
+            of the QuickPlot. The maximum number of frames if `adaptive` is True.
+        duration : numerical
+            default : 100
+            Time (in milliseconds) for which every frame is shown.
+        processes : int
+            default : 1
+            Number of processes in which the frames are rendered. The frames are
+            split in chunks of consecutive frames, one per process, and are
+            yielded in order, so the GIF is the same as the one rendered in this
+            process. None uses one process per CPU.
+        adaptive : bool
+            default : False
+            If the frame times are picked with `adaptive_time_array`, instead of
+            being evenly spaced. Every frame is shown for `duration`, so the GIF
+            slows down where the variables change quickly.
+    """
+
+    def __init__(
+        self,
+        quick_plot,
+        number_of_frames=80,
+        duration=100,
+        processes=1,
+        adaptive=False,
+    ):
+        self.quick_plot = quick_plot
+        self.duration = duration
+        self.processes = processes
+        if adaptive:
+            self.time_array = adaptive_time_array(quick_plot, number_of_frames)
+        else:
+            self.time_array = np.linspace(
+                quick_plot.min_t, quick_plot.max_t, number_of_frames
+            )
+        self.number_of_frames = len(self.time_array)
+        self.arrays = None
+        self.fig = None
+        self.canvas = None
+        self.background = None
+        self.animated_artists = []
+
+    def __getstate__(self):
+        # the figure can't be shared with other processes, so only the data
+        # needed to build it is sent
+        state = self.__dict__.copy()
+        state.update(
+            {"fig": None, "canvas": None, "background": None, "animated_artists": []}
+        )
+        quick_plot = copy.copy(self.quick_plot)
+        for attr in ["fig", "gridspec", "plots", "time_lines", "colorbars", "axes"]:
+            quick_plot.__dict__.pop(attr, None)
+        state.update({"quick_plot": quick_plot})
+
+        return state
+
+    def can_blit(self):
+        """
+        Checks if only the lines change between frames. 2D plots are redrawn
+        completely and 1D plots without fixed y limits rescale their axes, so
+        these need the whole figure to be redrawn.
+
+        Returns
+        -------
+            can_blit : bool
+        """
+        for key, variable_lists in self.quick_plot.variables.items():
+            dimensions = variable_lists[0][0].dimensions
+            if dimensions == 2:
+                return False
+            if dimensions == 1 and None in self.quick_plot.axis_limits[key][2:]:
+                return False
+        return True
+
+    def interpolate(self):
+        """
+        Evaluates the 1D variables of every solution on all the frame times at
+        once. The values are stored in `self.arrays`, of the form -
+        {key: [[numpy.ndarray]]}
+        with one (time x space) array for every variable of every solution, in
+        the order of `quick_plot.variables`.
+        """
+        if self.arrays is not None:
+            return
+
+        time_in_seconds = self.time_array * self.quick_plot.time_scaling_factor
+        self.arrays = {}
+        for key, variable_lists in self.quick_plot.variables.items():
+            if variable_lists[0][0].dimensions != 1:
+                continue
+            spatial_vars = self.quick_plot.spatial_variable_dict[key]
+            self.arrays.update(
+                {
+                    key: [
+                        [
+                            np.ascontiguousarray(
+                                variable(time_in_seconds, **spatial_vars, warn=False).T
+                            )
+                            for variable in variable_list
+                        ]
+                        for variable_list in variable_lists
+                    ]
+                }
+            )
+
+    def draw_figure(self, index, resolution):
+        """
+        Builds the figure, draws it at the DPI which makes it fit in `resolution`
+        and keeps its static parts as the background of the next frames.
+
+        Parameters
+        ----------
+            index : int
+                Index of the first frame.
+            resolution : tuple
+                Dimensions which the frames should fit in.
+        """
+        self.close()
+
+        self.quick_plot.plot(self.time_array[index])
+        self.fig = self.quick_plot.fig
+
+        width, height = self.fig.get_size_inches()
+        self.fig.set_dpi(min(resolution[0] / width, resolution[1] / height))
+        self.canvas = FigureCanvasAgg(self.fig)
+
+        if self.can_blit():
+            # the animated artists are left out of the background
+            self.animated_artists = list(self.quick_plot.time_lines.values()) + [
+                line
+                for key, plot in self.quick_plot.plots.items()
+                if self.quick_plot.variables[key][0][0].dimensions == 1
+                for lines in plot.values()
+                for line in lines.values()
+            ]
+            for artist in self.animated_artists:
+                artist.set_animated(True)
+            self.canvas.draw()
+            self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+            self.draw_artists()
+        else:
+            self.canvas.draw()
+
+    def draw_artists(self):
+        """
+        Blits the animated artists on top of the background.
+        """
+        self.canvas.restore_region(self.background)
+        for artist in self.animated_artists:
+            artist.axes.draw_artist(artist)
+
+    def update(self, index):
+        """
+        Updates the figure to a new frame.
+
+        Parameters
+        ----------
+            index : int
+                Index of the frame.
+        """
+        t = self.time_array[index]
+
+        if self.background is None:
+            # pybamm.QuickPlot.slider_update redraws the whole figure
+            self.quick_plot.slider_update(t)
+            return
+
+        for key, plot in self.quick_plot.plots.items():
+            if key in self.arrays:
+                for i, arrays in enumerate(self.arrays[key]):
+                    for j, array in enumerate(arrays):
+                        plot[i][j].set_ydata(array[index])
+            else:
+                self.quick_plot.time_lines[key].set_xdata([t, t])
+
+        self.draw_artists()
+
+    def capture(self):
+        """
+        Captures the figure drawn on the canvas.
+
+        Returns
+        -------
+            frame : :class:`PIL.Image.Image`
+                "RGB" mode frame.
+        """
+        frame = Image.frombuffer(
+            "RGBA",
+            self.canvas.get_width_height(),
+            self.canvas.buffer_rgba(),
+            "raw",
+            "RGBA",
+            0,
+            1,
+        ).convert("RGB")
+
+        return frame
+
+    def close(self):
+        """
+        Closes the figure.
+        """
+        if self.fig is not None:
+            plt.close(self.fig)
+        self.fig = None
+        self.canvas = None
+        self.background = None
+        self.animated_artists = []
+
+    def render(self, index, resolution):
+        """
+        Renders a single frame, with a figure of its own.
+
+        Parameters
+        ----------
+            index : int
+                Index of the frame.
+            resolution : tuple
+                Dimensions which the frame should fit in.
+
+        Returns
+        -------
+            frame : :class:`PIL.Image.Image`
+                "RGB" mode frame.
+        """
+        return list(self.render_frames([index], resolution))[0]
+
+    def render_frames(self, indices, resolution):
+        """
+        Renders some of the frames in this process, reusing the same figure.
+
+        Parameters
+        ----------
+            indices : iterable
+                Indices of the frames to render, in the order they should be
+                rendered.
+            resolution : tuple
+                Dimensions which the frames should fit in.
+
+        Yields
+        ------
+            frame : :class:`PIL.Image.Image`
+                "RGB" mode frame.
+        """
+        if self.can_blit():
+            self.interpolate()
+
+        try:
+            for index in indices:
+                if self.fig is None:
+                    self.draw_figure(index, resolution)
+                else:
+                    self.update(index)
+                frame = self.capture()
+
+                # the size of the canvas is rounded, so it can be a pixel too big
+                frame.thumbnail(resolution, Image.LANCZOS)
+
+                yield frame
+        finally:
+            self.close()
+
+    def frames(self, indices, resolution):
+        """
+        Renders some of the frames.
+
+        Parameters
+        ----------
+            indices : iterable
+                Indices of the frames to render, in the order they should be
+                rendered.
+            resolution : tuple
+                Dimensions which the frames should fit in.
+
+        Yields
+        ------
+            frame : :class:`PIL.Image.Image`
+                "RGB" mode frame.
+            duration : numerical
+                Time (in milliseconds) for which the frame is shown.
+        """
+        indices = list(indices)
+
+        processes = self.processes
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        processes = min(processes, len(indices))
+
+        # a single process doesn't need a pool
+        if processes <= 1:
+            for frame in self.render_frames(indices, resolution):
+                yield frame, self.duration
+            return
+
+        # the variables are evaluated once here instead of in every process
+        if self.can_blit():
+            self.interpolate()
+
+        # every process renders consecutive frames, so that it can reuse its figure
+        chunks = [
+            (self, [int(i) for i in chunk], resolution)
+            for chunk in np.array_split(indices, processes)
+        ]
+        with multiprocessing.Pool(processes) as pool:
+            for rendered_frames in pool.imap(render_chunk, chunks):
+                for frame in rendered_frames:
+                    yield frame, self.duration
@@ -0,0 +1,452 @@
+import os
+import json
+import math
+import logging
+from PIL import Image
+from utils.resize_gif import extract_frames
+from utils.gif_writer import GifWriter, encode_frame
+
+# Twitter's limit for the size of a GIF
+twitter_gif_limit = 15728640
+
+
+class GifFrames:
+    """
+    Decodes the frames of a GIF, so that a GIF can be re-encoded with
+    `encode_gif`.
+
+    Parameters
+    ----------
+        path : str
+            Path of the GIF.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with Image.open(path) as im:
+            self.number_of_frames = im.n_frames
+
+    def frames(self, indices, resolution):
+        """
+        Decodes some of the frames and resizes them.
+
+        Parameters
+        ----------
+            indices : iterable
+                Indices of the frames to decode, in increasing order.
+            resolution : tuple
+                Dimensions which the frames are resized to fit in.
+
+        Yields
+        ------
+            frame : :class:`PIL.Image.Image`
+                "RGB" mode frame.
+            duration : numerical
+                Time (in milliseconds) for which the frame is shown.
+        """
+        indices = set(indices)
+        for i, (frame, duration) in enumerate(extract_frames(self.path)):
+            if i in indices:
+                frame = frame.convert("RGB")
+                frame.thumbnail(resolution, Image.LANCZOS)
+                yield frame, duration
+
+
+def encode_gif(
+    frames,
+    save_as,
+    max_bytes=twitter_gif_limit,
+    resolutions=((1440, 1440), (1080, 1080), (720, 720)),
+    frame_steps=(1, 2, 3),
+    colors=(256, 128, 64),
+    number_of_samples=3,
+    safety_factor=1.1,
+    stream=None,
+    max_padding=0.2,
+):
+    """
+    Encodes a GIF with the best settings which fit in `max_bytes`. The size of the
+    GIF is estimated for every (resolution, frame step, colors) candidate by
+    encoding a few sample frames, and the GIF is then encoded once with the first
+    candidate which fits. The candidates are tried from the highest resolution to
+    the lowest, then from keeping every frame to dropping the most frames, and
+    then from the biggest palette to the smallest.
+
+    Parameters
+    ----------
+        frames : str or object
+            Path of a GIF to re-encode, or a source of frames like
+            `utils.frame_renderer.QuickPlotFrames`, with a `number_of_frames`
+            attribute and a `frames(indices, resolution)` method yielding
+            (frame, duration) pairs.
+        save_as : str
+            Path of the encoded GIF, can be the same as the path of `frames`.
+        max_bytes : numerical
+            default : 15728640 (15 MB)
+            Maximum size of the encoded GIF in bytes.
+        resolutions : tuple
+            default : ((1440, 1440), (1080, 1080), (720, 720))
+            Dimensions which the frames are resized to fit in.
+        frame_steps : tuple
+            default : (1, 2, 3)
+            Only every `frame_step`th frame is kept, the kept frames are shown for
+            longer so that the GIF plays at the same speed.
+        colors : tuple
+            default : (256, 128, 64)
+            Sizes of the shared palette.
+        number_of_samples : int
+            default : 3
+            Number of frames (and of changes between frames) sampled for every
+            candidate.
+        safety_factor : numerical
+            default : 1.1
+            The estimated size of a candidate should be smaller than
+            `max_bytes / safety_factor`.
+        stream : object
+            default : None
+            A stream like `twitter_api.upload.MediaStream` to which the GIF is
+            written while it is encoded, with `start(total_bytes)`, `write(data)`,
+            `close()` and `abort()` methods and `media_id` and `processing_info`
+            attributes. It is started with the estimated size of the chosen
+            candidate (times `safety_factor`, at most `max_bytes`) and the
+            streamed GIF is padded to that size with a comment, so it usually
+            carries a few percent (up to `max_padding`) of padding. The GIF saved
+            at `save_as` is never padded. The stream is aborted (and the GIF is
+            uploaded once it is encoded) if the GIF turns out to be bigger than
+            that size, or if it would need more padding.
+        max_padding : numerical
+            default : 0.2
+            Maximum fraction of a streamed GIF which can be padding.
+
+    Returns
+    -------
+        settings : dict
+            Of the form -
+            {
+                "resolution": tuple,
+                "size": tuple,
+                "frame_step": int,
+                "colors": int,
+                "number_of_frames": int,
+                "estimated_bytes": int,
+                "total_bytes": int,
+                "compressed": bool,
+                "media_id": int or None,
+                "processing_info": dict or None,
+            }
+            "compressed" is True if the GIF couldn't be encoded with the best
+            candidate. "media_id" and "processing_info" (the processing
+            information of the streamed GIF) are only present if a stream is
+            passed, and are None if the GIF couldn't be streamed.
+    """
+    resolutions = sorted(resolutions, reverse=True)
+    frame_steps = sorted(frame_steps)
+    colors = sorted(colors, reverse=True)
+
+    candidates = [
+        (resolution, frame_step, number_of_colors)
+        for resolution in resolutions
+        for frame_step in frame_steps
+        for number_of_colors in colors
+    ]
+    if isinstance(frames, str):
+        frames = GifFrames(frames)
+
+    estimates = estimate_sizes(frames, candidates, number_of_samples)
+
+    # the first candidate which fits, or the smallest one
+    smallest = min(candidates, key=lambda x: estimates[x])
+    chosen = next(
+        (x for x in candidates if estimates[x] * safety_factor <= max_bytes),
+        smallest,
+    )
+
+    # the size of a streamed GIF is needed before it is encoded, so an upper
+    # bound is used and the GIF is padded to it
+    total_bytes = None
+    if stream is not None:
+        total_bytes = min(max_bytes, math.ceil(estimates[chosen] * safety_factor))
+        stream.start(total_bytes)
+
+    # a bad estimate can't be allowed to break the upload, so the smallest
+    # candidate is used if the chosen one turns out to be too big
+    tmp_path = save_as + ".encoded"
+    media_id = None
+    processing_info = None
+    for candidate in [chosen] if chosen == smallest else [chosen, smallest]:
+        settings = write_gif(
+            frames,
+            tmp_path,
+            *candidate,
+            compressed=candidate != candidates[0],
+            stream=stream,
+            total_bytes=total_bytes if stream is not None else None,
+            max_padding=max_padding,
+        )
+        # only the first attempt is streamed, an upload which didn't go through
+        # is dropped before falling back
+        if stream is not None:
+            media_id = settings.pop("media_id")
+            processing_info = settings.pop("processing_info")
+            if media_id is None:
+                stream.abort()
+            stream = None
+        if settings["total_bytes"] <= max_bytes:
+            break
+    os.replace(tmp_path, save_as)
+
+    settings.update({"estimated_bytes": int(estimates[candidate])})
+    if total_bytes is not None:
+        settings.update({"media_id": media_id, "processing_info": processing_info})
+
+    return settings
+
+
+def estimate_sizes(frames, candidates, number_of_samples=3):
+    """
+    Estimates the size of the GIF encoded with every candidate, by encoding the
+    first frame and a few evenly spaced changes between frames.
+
+    Parameters
+    ----------
+        frames : object
+            Source of the frames, see `encode_gif`.
+        candidates : list
+            Of the form - [(resolution, frame_step, colors)]
+        number_of_samples : int
+            default : 3
+            Number of changes between frames sampled for every frame step.
+
+    Returns
+    -------
+        estimates : dict
+            Estimated size in bytes of every candidate.
+    """
+    number_of_frames = frames.number_of_frames
+    resolutions = sorted(set(x[0] for x in candidates), reverse=True)
+
+    # the pairs of frames (i, i + frame_step) used to sample the changes
+    pairs = {}
+    for frame_step in set(x[1] for x in candidates):
+        last_start = max(number_of_frames - 1 - frame_step, 0)
+        starts = set(
+            round(last_start * i / max(number_of_samples - 1, 1))
+            for i in range(number_of_samples)
+        )
+        pairs.update(
+            {
+                frame_step: [
+                    (start, min(start + frame_step, number_of_frames - 1))
+                    for start in sorted(starts)
+                ]
+            }
+        )
+    indices = set([0]).union(*[set(x) for y in pairs.values() for x in y])
+
+    # get the sampled frames once, at the highest resolution
+    sampled_frames = dict(
+        zip(
+            sorted(indices),
+            (frame for frame, _ in frames.frames(sorted(indices), resolutions[0])),
+        )
+    )
+
+    estimates = {}
+    resized_frames = {}
+    for resolution in resolutions:
+        # resize from the previous (bigger) resized frames
+        source = resized_frames if resized_frames else sampled_frames
+        resized_frames = {}
+        for i, frame in source.items():
+            resized_frame = frame.copy()
+            resized_frame.thumbnail(resolution, Image.LANCZOS)
+            resized_frames.update({i: resized_frame})
+
+        for number_of_colors in set(x[2] for x in candidates):
+            palette = resized_frames[0].quantize(number_of_colors)
+            first_frame_bytes = len(encode_frame(resized_frames[0], palette))
+
+            for frame_step in set(x[1] for x in candidates):
+                change_bytes = [
+                    len(
+                        encode_frame(
+                            resized_frames[end], palette, resized_frames[start]
+                        )
+                    )
+                    for start, end in pairs[frame_step]
+                ]
+                kept_frames = math.ceil(number_of_frames / frame_step)
+
+                # ~800 bytes for the header, the palette and the comment
+                estimates.update(
+                    {
+                        (resolution, frame_step, number_of_colors): 800
+                        + first_frame_bytes
+                        + (kept_frames - 1) * sum(change_bytes) / len(change_bytes)
+                    }
+                )
+
+    return estimates
+
+
+def write_gif(
+    frames,
+    save_as,
+    resolution,
+    frame_step,
+    colors,
+    compressed=False,
+    stream=None,
+    total_bytes=None,
+    max_padding=None,
+):
+    """
+    Encodes a GIF with the given settings in a single pass. The settings are
+    stored as a JSON comment in the GIF, so they can be read back with
+    `read_settings`.
+
+    Parameters
+    ----------
+        frames : object
+            Source of the frames, see `encode_gif`.
+        save_as : str
+            Path of the encoded GIF, should be different from the path of the
+            GIF being re-encoded.
+        resolution : tuple
+            Dimensions which the frames are resized to fit in.
+        frame_step : int
+            Only every `frame_step`th frame is kept.
+        colors : int
+            Size of the shared palette.
+        compressed : bool
+            default : False
+            If these settings are not the best ones available.
+        stream : object
+            default : None
+            Stream to which the GIF is written while it is encoded, see
+            `encode_gif`. It should already be started with `total_bytes`.
+        total_bytes : int
+            default : None
+            Size which the streamed GIF is padded to.
+        max_padding : numerical
+            default : None
+            Maximum fraction of `total_bytes` which can be padding, the stream is
+            aborted if the GIF needs more. Not bounded if None.
+
+    Returns
+    -------
+        settings : dict
+            Of the form -
+            {
+                "resolution": tuple,
+                "size": tuple,
+                "frame_step": int,
+                "colors": int,
+                "number_of_frames": int,
+                "compressed": bool,
+                "total_bytes": int,
+                "media_id": int or None,
+                "processing_info": dict or None,
+            }
+            "media_id" and "processing_info" are only present if a stream is
+            passed.
+    """
+    number_of_frames = frames.number_of_frames
+
+    settings = {
+        "resolution": tuple(resolution),
+        "frame_step": frame_step,
+        "colors": colors,
+        "number_of_frames": math.ceil(number_of_frames / frame_step),
+        "compressed": compressed,
+    }
+    writer = GifWriter(save_as, loop=1000, colors=colors, stream=stream)
+
+    try:
+        for frame, duration in frames.frames(
+            range(0, number_of_frames, frame_step), resolution
+        ):
+            # the header (and the comment) is written with the first frame
+            if writer.size is None:
+                settings.update({"size": frame.size})
+                writer.comment = json.dumps({"battbot": settings})
+
+            writer.write_frame(frame, duration * frame_step if duration else None)
+    except BaseException:
+        writer.abort()
+        if stream is not None:
+            stream.abort()
+        raise
+
+    logger = logging.getLogger(__name__)
+    if stream is not None:
+        # 1 byte is left for the trailer
+        padding = total_bytes - writer.bytes_written - 1
+        if max_padding is not None and padding > max_padding * total_bytes:
+            # the size was overestimated, the GIF is uploaded once it is written
+            logger.info(
+                "Not streaming the GIF, it would need %d bytes of padding", padding
+            )
+            stream.abort()
+            stream = None
+        else:
+            logger.info("Padding the streamed GIF with %d bytes", max(padding, 0))
+
+    try:
+        writer.close(total_bytes if stream is not None else None)
+    except ValueError:
+        # the GIF is bigger than the size the stream was started with
+        stream.abort()
+        stream = None
+
+    media_id = None
+    processing_info = None
+    if stream is not None:
+        # the GIF is still complete on disk if the stream fails
+        try:
+            stream.close()
+            media_id = stream.media_id
+            processing_info = stream.processing_info
+        except Exception as e:
+            logger.warning("Streaming the GIF failed: %s", e)
+            stream.abort()
+
+    settings.update({"total_bytes": os.path.getsize(save_as)})
+    if total_bytes is not None:
+        settings.update({"media_id": media_id, "processing_info": processing_info})
+
+    return settings
+
+
+def read_settings(path):
+    """
+    Reads the settings stored in a GIF by `write_gif`.
+
+    Parameters
+    ----------
+        path : str
+            Path of the GIF.
+
+    Returns
+    -------
+        settings : dict or None
+            Of the same form as the settings returned by `write_gif`. None if the
+            GIF wasn't encoded by `write_gif`.
+    """
+    with Image.open(path) as im:
+        comment = im.info.get("comment")
+
+    try:
+        settings = json.loads(comment)["battbot"]
+    except (TypeError, ValueError, KeyError):
+        return None
+
+    settings.update(
+        {
+            "resolution": tuple(settings["resolution"]),
+            "size": tuple(settings["size"]),
+            "total_bytes": os.path.getsize(path),
+        }
+    )
+
+    return settings
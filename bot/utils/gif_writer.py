@@ -0,0 +1,270 @@
+import os
+import math
+import struct
+from PIL import Image, ImageChops, GifImagePlugin
+
+
+def encode_frame(frame, palette, previous_frame=None, duration=None):
+    """
+    Encodes a frame of a GIF with a shared palette. Only the region which changed
+    since the previous frame is encoded.
+
+    Parameters
+    ----------
+        frame : :class:`PIL.Image.Image`
+            "RGB" mode frame.
+        palette : :class:`PIL.Image.Image`
+            A "P" mode image whose palette is used.
+        previous_frame : :class:`PIL.Image.Image`
+            default : None
+            "RGB" mode frame shown before this one, the whole frame is encoded if
+            None.
+        duration : numerical
+            default : None
+            Time (in milliseconds) for which the frame is shown.
+
+    Returns
+    -------
+        data : bytes
+    """
+    offset = (0, 0)
+    region = frame
+    if previous_frame is not None:
+        bbox = ImageChops.difference(frame, previous_frame).getbbox()
+        if bbox is None:
+            # an unchanged frame still needs a (single pixel) image
+            bbox = (0, 0, 1, 1)
+        offset = bbox[:2]
+        region = frame.crop(bbox)
+
+    # map the region to the shared palette, dithering makes the plots noisier and
+    # bigger
+    region = region.quantize(palette=palette, dither=Image.NONE)
+
+    params = {}
+    if duration:
+        params.update({"duration": duration})
+
+    # getdata is not part of Pillow's public API, it is relied upon because
+    # Pillow is pinned (pillow<=8.4.0 in requirements.txt), and should be checked
+    # if the pin is lifted
+    data = GifImagePlugin.getdata(region, offset, **params)
+    encoded_frame = b"".join(data)
+    # older versions of Pillow collect the data of every call in the same list
+    data.clear()
+
+    return encoded_frame
+
+
+def padding_comment(number_of_bytes):
+    """
+    Returns a comment extension of exactly `number_of_bytes` bytes (filled with
+    spaces), which can be placed anywhere between the blocks of a GIF to make it
+    bigger without changing its frames.
+
+    Parameters
+    ----------
+        number_of_bytes : int
+            0 or at least 3, other than 4. An empty comment takes 3 bytes and
+            every non-empty sub-block adds at least 2 bytes to it. A ValueError is
+            raised otherwise.
+
+    Returns
+    -------
+        comment : bytes
+    """
+    if number_of_bytes == 0:
+        return b""
+    if number_of_bytes < 3 or number_of_bytes == 4:
+        raise ValueError(f"A GIF can't be padded with {number_of_bytes} bytes")
+
+    # the comment data is split in as few sub-blocks (of 1 to 255 bytes) as
+    # possible, every sub-block takes a byte for its length
+    number_of_blocks = math.ceil((number_of_bytes - 3) / 256)
+    data_bytes = number_of_bytes - 3 - number_of_blocks
+    block_sizes = [
+        data_bytes // number_of_blocks + (i < data_bytes % number_of_blocks)
+        for i in range(number_of_blocks)
+    ]
+
+    return (
+        b"!\xfe"
+        + b"".join(bytes([size]) + b" " * size for size in block_sizes)
+        + b"\x00"
+    )
+
+
+class GifWriter:
+    """
+    Writes a looping GIF frame by frame, so that only the frame being written and
+    the previous frame are kept in memory. All the frames share a single palette
+    and only the region which changed since the previous frame is encoded. The
+    GIF is written to a temporary file which replaces `path` once the writer is
+    closed.
+
+    Parameters
+    ----------
+        path : str
+            Path of the GIF to write.
+        loop : int
+            default : 0
+            Number of times the GIF is repeated, 0 repeats it forever.
+        colors : int
+            default : 256
+            Maximum number of colors in the palette.
+        palette : :class:`PIL.Image.Image`
+            default : None
+            A "P" mode image whose palette is used for every frame. The palette is
+            generated from the first frame if None.
+        comment : str
+            default : None
+            Comment stored in the GIF.
+        stream : object
+            default : None
+            Object with a `write(data)` method, like
+            `twitter_api.upload.MediaStream`, to which the GIF is also written as
+            soon as every frame is encoded. `bytes_written` counts the bytes of
+            the streamed GIF.
+    """
+
+    def __init__(
+        self, path, loop=0, colors=256, palette=None, comment=None, stream=None
+    ):
+        self.path = path
+        self.loop = loop
+        self.colors = colors
+        self.palette = palette
+        self.comment = comment
+        self.size = None
+        self.previous_frame = None
+        self.number_of_frames = 0
+        self.stream = stream
+        self.bytes_written = 0
+        self.tmp_path = path + "." + str(os.getpid()) + ".tmp"
+        self.file = open(self.tmp_path, "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, data):
+        """
+        Writes encoded data to the GIF and to the stream.
+
+        Parameters
+        ----------
+            data : bytes
+        """
+        self.file.write(data)
+        if self.stream is not None:
+            self.stream.write(data)
+        self.bytes_written += len(data)
+
+    def write_header(self):
+        """
+        Writes the header of the GIF with the shared palette, the NETSCAPE2.0
+        extension which makes it loop and the comment.
+        """
+        palette = bytes(self.palette.getpalette()[:768])
+        palette += bytes(768 - len(palette))
+
+        self.write(
+            b"GIF89a"
+            # logical screen descriptor, with a global color table of 256 colors
+            + struct.pack("<HHBBB", self.size[0], self.size[1], 0xF7, 0, 0)
+            + palette
+            # application extension for looping
+            + b"!\xff\x0bNETSCAPE2.0\x03\x01"
+            + struct.pack("<H", self.loop)
+            + b"\x00"
+        )
+
+        if self.comment:
+            comment = self.comment.encode()
+            self.write(
+                b"!\xfe"
+                + b"".join(
+                    bytes([len(comment[i:i + 255])]) + comment[i:i + 255]
+                    for i in range(0, len(comment), 255)
+                )
+                + b"\x00"
+            )
+
+    def write_frame(self, frame, duration=None):
+        """
+        Encodes a frame and appends it to the GIF. The size of the first frame is
+        the size of the GIF.
+
+        Parameters
+        ----------
+            frame : :class:`PIL.Image.Image`
+            duration : numerical
+                default : None
+                Time (in milliseconds) for which the frame is shown.
+        """
+        frame = frame.convert("RGB")
+
+        if self.size is None:
+            self.size = frame.size
+            if self.palette is None:
+                self.palette = frame.quantize(self.colors)
+            self.write_header()
+
+        self.write(encode_frame(frame, self.palette, self.previous_frame, duration))
+        self.previous_frame = frame
+
+        self.number_of_frames += 1
+
+    def close(self, total_bytes=None):
+        """
+        Writes the trailer of the GIF and moves it to `path`.
+
+        Parameters
+        ----------
+            total_bytes : int
+                default : None
+                Size which the GIF is padded to (with a comment before the
+                trailer), for a stream which was told the size of the GIF before
+                it was encoded. Only the streamed GIF is padded if there is a
+                stream, the GIF written to `path` (which can be stored and
+                uploaded again) is kept without the padding.
+
+        Raises
+        ------
+            ValueError
+                If the GIF can't be padded to `total_bytes`. The GIF is still
+                written to `path`, without the padding.
+        """
+        padding = b""
+        if total_bytes is not None:
+            try:
+                # 1 byte is left for the trailer
+                padding = padding_comment(total_bytes - self.bytes_written - 1)
+            except ValueError:
+                pass
+        if self.stream is not None:
+            self.stream.write(padding)
+            self.bytes_written += len(padding)
+            self.write(b";")
+        else:
+            self.write(padding + b";")
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+        if total_bytes is not None and self.bytes_written != total_bytes:
+            raise ValueError(
+                f"The GIF ({self.bytes_written} bytes) can't be padded to "
+                + f"{total_bytes} bytes"
+            )
+
+    def abort(self):
+        """
+        Discards the partially written GIF.
+        """
+        self.file.close()
+        os.remove(self.tmp_path)
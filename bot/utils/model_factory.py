@@ -0,0 +1,167 @@
+# built models, of the form - {(model class, frozen options): model}
+models = {}
+
+# specs of the built models, of the form - {id(model): ModelSpec}, the models are
+# kept alive by `models`, so their ids are never reused
+specs = {}
+
+
+class ModelSpec:
+    """
+    Picklable description of a model built by `build_model`, sent to the worker
+    processes in place of the model, so that they build it (or reuse the one
+    built earlier) themselves instead of unpickling a copy of it.
+
+    Parameters
+    ----------
+        model_class : type
+            A PyBaMM model class.
+        options : dict
+            Model options.
+    """
+
+    def __init__(self, model_class, options=None):
+        self.model_class = model_class
+        self.options = options
+
+    def build(self):
+        """
+        Builds the described model in this process, see `build_model`.
+
+        Returns
+        -------
+            model : :class:`pybamm.BaseBatteryModel`
+        """
+        return build_model(self.model_class, self.options)
+
+
+def freeze(options):
+    """
+    Converts model options to a hashable form which doesn't depend on the order
+    of the options.
+
+    Parameters
+    ----------
+        options : dict or None
+            Model options.
+
+    Returns
+    -------
+        frozen_options : tuple
+    """
+    if options is None:
+        return ()
+
+    def freeze_value(value):
+        if isinstance(value, (list, tuple)):
+            return tuple(freeze_value(x) for x in value)
+        elif isinstance(value, dict):
+            return freeze(value)
+        return value
+
+    return tuple(sorted((key, freeze_value(value)) for key, value in options.items()))
+
+
+def build_model(model_class, options=None):
+    """
+    Builds a model, or returns the model built earlier in this process with the
+    same class and options. The returned model is shared, so it should not be
+    modified; pybamm.Simulation works on copies of the model it is given.
+
+    Parameters
+    ----------
+        model_class : type
+            A PyBaMM model class, for example pybamm.lithium_ion.DFN.
+        options : dict
+            default : None
+            Model options.
+
+    Returns
+    -------
+        model : :class:`pybamm.BaseBatteryModel`
+    """
+    key = (model_class, freeze(options))
+
+    if key not in models:
+        # pybamm adds its own entries to the options it is given, so a copy is
+        # passed to keep the caller's options (and the key) unchanged
+        model = model_class(options=dict(options) if options is not None else None)
+        models.update({key: model})
+        specs.update(
+            {
+                id(model): ModelSpec(
+                    model_class, dict(options) if options is not None else None
+                )
+            }
+        )
+
+    return models[key]
+
+
+def to_specs(config):
+    """
+    Replaces the models of a configuration, which were built by `build_model`,
+    by their :class:`ModelSpec`. The other models are kept as they are.
+
+    Parameters
+    ----------
+        config : dict
+            Configuration generated by `plotting.config_generator` or
+            :meth:`twitter_api.tweet_reply.Reply.generate_reply_config`.
+
+    Returns
+    -------
+        config : dict
+            A copy of the configuration.
+    """
+    config = dict(config)
+
+    if "model" in config:
+        config.update({"model": specs.get(id(config["model"]), config["model"])})
+    if "models_for_comp" in config:
+        config.update(
+            {
+                "models_for_comp": {
+                    key: specs.get(id(model), model)
+                    for key, model in config["models_for_comp"].items()
+                }
+            }
+        )
+
+    return config
+
+
+def from_specs(config):
+    """
+    Builds the models of a configuration which were replaced by their
+    :class:`ModelSpec` in `to_specs`.
+
+    Parameters
+    ----------
+        config : dict
+            Configuration returned by `to_specs`.
+
+    Returns
+    -------
+        config : dict
+            A copy of the configuration.
+    """
+
+    def build(model):
+        return model.build() if isinstance(model, ModelSpec) else model
+
+    config = dict(config)
+
+    if "model" in config:
+        config.update({"model": build(config["model"])})
+    if "models_for_comp" in config:
+        config.update(
+            {
+                "models_for_comp": {
+                    key: build(model)
+                    for key, model in config["models_for_comp"].items()
+                }
+            }
+        )
+
+    return config
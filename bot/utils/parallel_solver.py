@@ -0,0 +1,71 @@
+import pybamm
+import multiprocessing
+
+
+def solve_simulation(model, parameter_values, experiment=None, solve_kwargs=None):
+    """
+    Creates and solves a single simulation.
+
+    Parameters
+    ----------
+        model : :class:`pybamm.BaseBatteryModel`
+            Model to be used in the simulation.
+        parameter_values : :class:`pybamm.ParameterValues`
+            Parameter values to be used in the simulation.
+        experiment : :class:`pybamm.Experiment`
+            default : None
+            Experiment to be simulated.
+        solve_kwargs : dict
+            default : None
+            Keyword arguments passed to `pybamm.Simulation.solve`.
+
+    Returns
+    -------
+        solution : :class:`pybamm.Solution`
+    """
+    sim = pybamm.Simulation(
+        model=model,
+        experiment=experiment,
+        parameter_values=parameter_values,
+    )
+    sim.solve(**(solve_kwargs or {}))
+
+    return sim.solution
+
+
+def parallel_solve(jobs, processes=None, solver=solve_simulation):
+    """
+    Solves independent simulations in a pool of processes.
+
+    Parameters
+    ----------
+        jobs : list
+            Arguments of `solver` for every simulation. By default, should be of the
+            form -
+            [
+                (model, parameter_values, experiment, solve_kwargs),
+                (model, parameter_values, experiment, solve_kwargs)
+            ]
+        processes : int
+            default : None
+            Number of processes in the pool. Defaults to the number of jobs,
+            capped by the number of CPUs.
+        solver : callable
+            default : solve_simulation
+            Function called with the arguments of every job, should be picklable
+            (defined at the top level of a module).
+
+    Returns
+    -------
+        solutions : list
+            Values returned by `solver`, in the order of `jobs`.
+    """
+    if processes is None:
+        processes = min(len(jobs), multiprocessing.cpu_count())
+
+    # a single process doesn't need a pool
+    if processes <= 1 or len(jobs) <= 1:
+        return [solver(*job) for job in jobs]
+
+    with multiprocessing.Pool(processes) as pool:
+        return pool.starmap(solver, jobs)
@@ -0,0 +1,86 @@
+import pybamm
+
+# parameter values loaded in this process, of the form -
+# {chemistry: pybamm.ParameterValues}
+parameter_values = {}
+
+# metadata of the loaded chemistries, of the form -
+# {
+#   chemistry: {
+#       "citation": str,
+#       "nominal capacity": numerical,
+#       "default current": numerical,
+#   }
+# }
+metadata = {}
+
+
+def load_parameter_values(chemistry):
+    """
+    Loads the parameter values of a chemistry, once per process. The returned
+    parameter values are shared and should not be modified, use
+    `get_parameter_values` for a copy which can be.
+
+    Parameters
+    ----------
+        chemistry : str
+            A PyBaMM chemistry.
+
+    Returns
+    -------
+        parameter_values : :class:`pybamm.ParameterValues`
+    """
+    if chemistry not in parameter_values:
+        params = pybamm.ParameterValues(chemistry)
+        parameter_values.update({chemistry: params})
+        metadata.update(
+            {
+                chemistry: {
+                    "citation": params["citations"][0],
+                    "nominal capacity": params["Nominal cell capacity [A.h]"],
+                    "default current": params["Current function [A]"],
+                }
+            }
+        )
+
+    return parameter_values[chemistry]
+
+
+def get_parameter_values(chemistry):
+    """
+    Returns a copy of the parameter values of a chemistry, which can be modified.
+
+    Parameters
+    ----------
+        chemistry : str
+            A PyBaMM chemistry.
+
+    Returns
+    -------
+        parameter_values : :class:`pybamm.ParameterValues`
+    """
+    return load_parameter_values(chemistry).copy()
+
+
+def get_metadata(chemistry):
+    """
+    Returns the metadata of a chemistry.
+
+    Parameters
+    ----------
+        chemistry : str
+            A PyBaMM chemistry.
+
+    Returns
+    -------
+        metadata : dict
+            Of the form -
+            {
+                "citation": str,
+                "nominal capacity": numerical,
+                "default current": numerical,
+            }
+    """
+    load_parameter_values(chemistry)
+
+    return metadata[chemistry]
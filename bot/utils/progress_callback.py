@@ -0,0 +1,152 @@
+import time
+import pybamm
+import logging
+import numpy as np
+
+
+class TimeBudgetExceeded(Exception):
+    """
+    Raised by :class:`ProgressCallback` to stop an experiment once its wall-clock
+    budget is spent.
+    """
+
+
+class ProgressCallback(pybamm.callbacks.Callback):
+    """
+    Reports the progress of an experiment at the end of every cycle and stops it
+    once a deadline has passed. The summary variables of the completed cycles are
+    kept by the callback, so an experiment which was stopped can still be plotted.
+    The reason why PyBaMM stopped the experiment before its last cycle (which is
+    not stored in the solution) is kept in `termination` - "capacity", "voltage",
+    "infeasible", "error", or None if it was not stopped.
+
+    Parameters
+    ----------
+        label : str
+            Label of the simulation in the reports.
+        deadline : numerical
+            default : None
+            Time (as returned by `time.time()`) after which the experiment is
+            stopped, at the end of the cycle being solved. Never stopped if None.
+        report : callable
+            default : None
+            Called with the progress after every cycle, the progress is logged if
+            None. Should be picklable to be used in a pool of processes. The
+            progress is of the form -
+            {
+                "label": str,
+                "cycles completed": int,
+                "total cycles": int,
+                "capacity fade": numerical or None,
+                "elapsed time": numerical,
+            }
+    """
+
+    def __init__(self, label, deadline=None, report=None):
+        self.label = label
+        self.deadline = deadline
+        self.report = report
+        self.all_summary_variables = []
+        self.start_time = None
+        self.termination = None
+
+    def resume(self, solution):
+        """
+        Continues from the cycles of a solution, to be used when an experiment is
+        solved in chunks which start from the solution of the previous chunks.
+
+        Parameters
+        ----------
+            solution : :class:`pybamm.Solution`
+                Solution of the completed cycles.
+        """
+        self.all_summary_variables = list(solution.all_summary_variables)
+
+    def on_experiment_start(self, logs):
+        # the elapsed time is measured from the first chunk of the experiment
+        if self.start_time is None:
+            self.start_time = time.time()
+        self.termination = None
+
+    def on_cycle_end(self, logs):
+        cycle_summary_variables = logs.get("summary variables")
+        if cycle_summary_variables is not None:
+            self.all_summary_variables.append(cycle_summary_variables)
+
+        # capacity fade since the first cycle, not available for every chemistry
+        capacity_fade = None
+        if self.all_summary_variables:
+            start_capacity = self.all_summary_variables[0].get("Capacity [A.h]")
+            capacity = self.all_summary_variables[-1].get("Capacity [A.h]")
+            if start_capacity and capacity is not None:
+                capacity_fade = 1 - capacity / start_capacity
+
+        progress = {
+            "label": self.label,
+            "cycles completed": len(self.all_summary_variables),
+            "total cycles": logs["cycle number"][1],
+            "capacity fade": capacity_fade,
+            "elapsed time": time.time() - self.start_time,
+        }
+        # the stopping conditions checked by PyBaMM after this callback
+        stopping_conditions = logs.get("stopping conditions") or {}
+        capacity_stop = stopping_conditions.get("capacity")
+        voltage_stop = stopping_conditions.get("voltage")
+        if cycle_summary_variables is not None:
+            capacity = cycle_summary_variables.get("Capacity [A.h]")
+            if (
+                capacity_stop is not None
+                and not np.isnan(capacity)
+                and capacity <= capacity_stop
+            ):
+                self.termination = "capacity"
+            elif (
+                voltage_stop is not None
+                and cycle_summary_variables["Minimum voltage [V]"] <= voltage_stop[0]
+            ):
+                self.termination = "voltage"
+
+        if self.report is not None:
+            self.report(progress)
+        else:
+            logging.getLogger(__name__).info(
+                "%s: %d/%d cycles, capacity fade %s, %.0f s",
+                progress["label"],
+                progress["cycles completed"],
+                progress["total cycles"],
+                "{:.1%}".format(capacity_fade) if capacity_fade is not None else "-",
+                progress["elapsed time"],
+            )
+
+        if self.deadline is not None and time.time() > self.deadline:
+            raise TimeBudgetExceeded(
+                f"{self.label} was stopped after "
+                f"{len(self.all_summary_variables)} cycles"
+            )
+
+    def on_experiment_infeasible(self, logs):
+        self.termination = "infeasible"
+
+    def on_experiment_error(self, logs):
+        self.termination = "error"
+
+    def summary_variables(self):
+        """
+        Returns the summary variables of the completed cycles, in the same form as
+        `pybamm.Solution.summary_variables`.
+
+        Returns
+        -------
+            summary_variables : :class:`pybamm.FuzzyDict`
+        """
+        summary_variables = {
+            name: np.array([x[name] for x in self.all_summary_variables])
+            for name in (
+                self.all_summary_variables[0] if self.all_summary_variables else []
+            )
+        }
+        summary_variables.update(
+            {"Cycle number": np.arange(1, len(self.all_summary_variables) + 1)}
+        )
+
+        return pybamm.FuzzyDict(summary_variables)
@@ -1,85 +1,77 @@
+import os
 from PIL import Image
+from utils.gif_writer import GifWriter
 
 
 # Original code - https://stackoverflow.com/a/41827681/14746647
-def resize_gif(path, resize_to):
+def resize_gif(path, resize_to, save_as=None):
     """
-    Resizes the GIF to a given length
+    Resizes the GIF to one or more given lengths. The frames are decoded, resized
+    and encoded one by one, so only a couple of frames are kept in memory, and
+    the GIF is decoded only once for all the given lengths.
 
     Parameters
     ----------
         path : str
             Path of the GIF to resize.
-        resize_to : tuple
-            Dimensions to be resize to.
+        resize_to : tuple or list
+            Dimensions to be resize to, or a list of dimensions.
+        save_as : str or list
+            default : None
+            Path of the resized GIF, or a list of paths with one path for every
+            dimensions in `resize_to`. Overwrites the given GIF if None, or saves
+            every resized GIF next to it (as "plot_1080x1080.gif" for "plot.gif")
+            if None and `resize_to` is a list.
     """
+    if isinstance(resize_to, tuple):
+        resize_to = [resize_to]
+        save_as = [save_as if save_as is not None else path]
+    elif save_as is None:
+        root, ext = os.path.splitext(path)
+        save_as = [f"{root}_{width}x{height}{ext}" for width, height in resize_to]
+    elif isinstance(save_as, str) or len(save_as) != len(resize_to):
+        raise ValueError("save_as should have one path for every dimensions")
+
+    # every frame is resized from the previous (bigger) resized frame, which is
+    # much cheaper than resizing the original frame every time
+    targets = sorted(zip(resize_to, save_as), key=lambda x: x[0], reverse=True)
+    writers = [GifWriter(output_path, loop=1000) for _, output_path in targets]
 
-    all_frames = extract_and_resize_frames(path, resize_to)
-
-    save_as = path
-
-    all_frames[0].save(
-        save_as, optimize=True, save_all=True, append_images=all_frames[1:], loop=1000
-    )
-
-
-def analyseImage(path):
+    try:
+        for frame, duration in extract_frames(path):
+            resized_frame = frame.convert("RGB")
+            for (dimensions, _), writer in zip(targets, writers):
+                resized_frame = resized_frame.copy()
+                resized_frame.thumbnail(dimensions, Image.LANCZOS)
+                writer.write_frame(resized_frame, duration)
+    except BaseException:
+        for writer in writers:
+            writer.abort()
+        raise
+
+    for writer in writers:
+        writer.close()
+
+
+def extract_frames(path):
     """
-    Pre-process pass over the image to determine the mode (full or additive).
-    Necessary as assessing single frames isn't reliable. Need to know the mode
-    before processing all frames.
+    Iterates the GIF, yielding every frame as a full RGBA image.
 
     Parameters
     ----------
         path : str
-            Path of the GIF to resize.
-    """
-    im = Image.open(path)
-    results = {
-        "size": im.size,
-        "mode": "full",
-    }
-    try:
-        while True:
-            if im.tile:
-                tile = im.tile[0]
-                update_region = tile[1]
-                update_region_dimensions = update_region[2:]
-                if update_region_dimensions != im.size:  # pragma: no cover
-                    results["mode"] = "partial"
-                    break
-            im.seek(im.tell() + 1)
+            Path of the GIF.
 
-    except EOFError:
-        pass
-
-    im.close()
-
-    return results
-
-
-def extract_and_resize_frames(path, resize_to):
-    """
-    Iterate the GIF, extracting each frame and resizing them
-
-    Parameter
-    ---------
-        path : str
-            Path of the GIF to resize.
-
-    Returns
-    -------
-        all_frames : list
+    Yields
+    ------
+        frame : :class:`PIL.Image.Image`
+        duration : numerical
+            Time (in milliseconds) for which the frame is shown.
     """
-    mode = analyseImage(path)["mode"]
-
     im = Image.open(path)
 
-    i = 0
     p = im.getpalette()
-    last_frame = im.convert("RGBA")
-
-    all_frames = []
+    last_frame = None
 
     try:
         while True:
@@ -94,25 +86,26 @@ def extract_and_resize_frames(path, resize_to):
             new_frame = Image.new("RGBA", im.size)
 
             """
-            Is this file a "partial"-mode GIF where frames update a region of
-            a different size to the entire image? If so, we need to construct
-            the new frame by pasting it on top of the preceding frames.
+            Does this frame update a region of a different size to the entire
+            image? If so, we need to construct the new frame by pasting it on top
+            of the preceding frame.
             """
-            if mode == "partial":  # pragma: no cover
+            if (
+                last_frame is not None
+                and im.tile
+                and im.tile[0][1][2:] != im.size
+            ):  # pragma: no cover
                 new_frame.paste(last_frame)
 
             new_frame.paste(im, (0, 0), im.convert("RGBA"))
 
-            new_frame.thumbnail(resize_to, Image.ANTIALIAS)
-            all_frames.append(new_frame)
+            yield new_frame, im.info.get("duration")
 
-            i += 1
             last_frame = new_frame
             im.seek(im.tell() + 1)
 
     except EOFError:
         pass
 
-    im.close()
-
-    return all_frames
+    finally:
+        im.close()
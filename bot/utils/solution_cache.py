@@ -0,0 +1,150 @@
+import os
+import pickle
+import logging
+import pybamm
+from utils.disk_cache import DiskCache
+from utils.canonical_hash import canonical_hash
+
+
+class SolutionCache(DiskCache):
+    """
+    An on-disk cache of solved simulations, keyed by the content of the
+    simulation configuration. The least recently used solutions are evicted
+    once the size of the cache exceeds `max_size`.
+
+    Parameters
+    ----------
+        cache_dir : str
+            default : "solution_cache"
+            Directory in which the solutions are stored.
+        max_size : numerical
+            default : 1073741824 (1 GB)
+            Maximum size of the cache in bytes.
+    """
+
+    def __init__(self, cache_dir="solution_cache", max_size=1073741824):
+        super().__init__(cache_dir, max_size)
+
+    def generate_key(
+        self,
+        model,
+        chemistry,
+        parameter_values,
+        cycle=None,
+        number=None,
+        termination=None,
+        t_eval=None,
+        save_at_cycles=None,
+    ):
+        """
+        Generates the key of a single solution.
+
+        Parameters
+        ----------
+            model : :class:`pybamm.BaseBatteryModel`
+                Model used in the simulation.
+            chemistry : str
+                A PyBaMM chemistry.
+            parameter_values : :class:`pybamm.ParameterValues`
+                Parameter values used in the simulation (with the varied values
+                already plugged in).
+            cycle : list
+                default : None
+                Single cycle of the experiment, if any.
+            number : numerical
+                default : None
+                The number with which the cycle is multiplied.
+            termination : dict
+                default : None
+                Termination conditions of the experiment, if any.
+            t_eval : list
+                default : None
+                Time span of the simulation, if there is no experiment.
+            save_at_cycles : int or list
+                default : None
+                Cycles whose full solutions are kept, if only some of them are.
+
+        Returns
+        -------
+            key : str
+        """
+        return canonical_hash(
+            {
+                "pybamm": pybamm.__version__,
+                "model": model,
+                "chemistry": chemistry,
+                "parameter_values": parameter_values,
+                "cycle": cycle,
+                "number": number,
+                "termination": termination,
+                "t_eval": t_eval,
+                "save_at_cycles": save_at_cycles,
+            }
+        )
+
+    def path(self, key):
+        """
+        Returns the path of the file in which the solution with the given key is
+        stored.
+
+        Parameters
+        ----------
+            key : str
+        """
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+    def get(self, key):
+        """
+        Loads a solution from the cache.
+
+        Parameters
+        ----------
+            key : str
+
+        Returns
+        -------
+            solution : :class:`pybamm.Solution` or None
+                None if the solution is not in the cache.
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                solution = pickle.load(f)
+        except Exception as e:  # pragma: no cover
+            # a corrupt or incompatible entry is treated as a miss
+            logging.getLogger().info(f"Removing unreadable cache entry {key}: {e}")
+            os.remove(path)
+            return None
+
+        self.touch(path)
+
+        return solution
+
+    def put(self, key, solution):
+        """
+        Stores a solution in the cache and evicts the least recently used
+        solutions if the cache is too big.
+
+        Parameters
+        ----------
+            key : str
+            solution : :class:`pybamm.Solution`
+        """
+        path = self.path(key)
+        # write to a temporary file first so that a concurrent reader never sees
+        # a partially written solution
+        tmp_path = path + "." + str(os.getpid()) + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(solution, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:  # pragma: no cover
+            logging.getLogger().info(f"Could not cache the solution {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        self.evict()
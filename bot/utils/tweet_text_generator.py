@@ -1,4 +1,4 @@
-import pybamm
+from utils.parameter_registry import get_metadata
 
 
 def tweet_text_generator(
@@ -37,7 +37,7 @@ def tweet_text_generator(
             Not none if the tweet text exceeds twitter limit.
     """
 
-    param_values = pybamm.ParameterValues(chemistry)
+    citation = get_metadata(chemistry)["citation"]
 
     if is_comparison:
         # calculate C-rate and Temperature to add in tweet text
@@ -51,7 +51,7 @@ def tweet_text_generator(
     # summary variable
     if is_experiment and not is_comparison:
         tweet_text = (
-            f"Plotting {model.name} with {param_values['citations'][0]} "
+            f"Plotting {model.name} with {citation} "
             f"parameters and {degradation_value} {degradation_mode} "
             f"for the following experiment: {cycle} * {number}"
         )
@@ -63,13 +63,13 @@ def tweet_text_generator(
             if len(model) == 2:
                 tweet_text = (
                     f"Comparing {model[0].name} and {model[1].name} "
-                    f"with {param_values['citations'][0]} parameters at {temp}°C for "
+                    f"with {citation} parameters at {temp}°C for "
                     f"the following experiment: {cycle} * {number}"
                 )
             else:
                 tweet_text = (
                     f"Comparing {model[0].name}, {model[1].name}, and "
-                    f"{model[2].name} with {param_values['citations'][0]} "
+                    f"{model[2].name} with {citation} "
                     f"parameters at {temp}°C for the following experiment: "
                     f"{cycle} * {number}"
                 )
@@ -77,7 +77,7 @@ def tweet_text_generator(
         # a parameter
         elif param_to_vary is not None and is_comparison:
             tweet_text = (
-                f"{model[0].name} with {param_values['citations'][0]} parameters "
+                f"{model[0].name} with {citation} parameters "
                 f"varying '{param_to_vary}' at {temp}°C for the following experiment: "
                 f"{cycle} * {number}"
             )
@@ -90,20 +90,20 @@ def tweet_text_generator(
             if len(model) == 2:
                 tweet_text = (
                     f"Comparing {model[0].name} and {model[1].name} with "
-                    f"{param_values['citations'][0]} parameters for a {c_rate} C "
+                    f"{citation} parameters for a {c_rate} C "
                     f"discharge at {temp}°C"
                 )
             else:
                 tweet_text = (
                     f"Comparing {model[0].name}, {model[1].name}, and "
-                    f"{model[2].name} with {param_values['citations'][0]} "
+                    f"{model[2].name} with {citation} "
                     f"parameters for a {c_rate} C discharge at {temp}°C"
                 )
 
         # comparing a single model by varying a parameter value
         elif param_to_vary is not None and is_comparison:
             tweet_text = (
-                f"{model[0].name} with {param_values['citations'][0]} parameters "
+                f"{model[0].name} with {citation} parameters "
                 f"varying '{param_to_vary}' for a {c_rate} C discharge at "
                 f"{temp}°C"
             )
@@ -0,0 +1,406 @@
+import os
+import time
+import pickle
+import signal
+import itertools
+import traceback
+import multiprocessing
+import multiprocessing.reduction
+import multiprocessing.connection
+
+
+def worker(job_conn, result_conn, initializer=None, initargs=()):
+    """
+    Runs the jobs received on `job_conn` one after another and sends their results
+    back on `result_conn`, until None is received.
+
+    Parameters
+    ----------
+        job_conn : :class:`multiprocessing.connection.Connection`
+            Connection on which the jobs are received. Should be of the form -
+            (job_id, func, args, kwargs)
+        result_conn : :class:`multiprocessing.connection.Connection`
+            Connection on which the results are sent. Of the form -
+            (job_id, result, exception)
+        initializer : callable
+            default : None
+            Called once when the worker starts.
+        initargs : tuple
+            default : ()
+            Arguments passed to `initializer`.
+    """
+    # the worker leads its own process group, so that the processes started by
+    # its jobs are killed with it
+    start_process_group()
+
+    if initializer is not None:
+        initializer(*initargs)
+
+    while True:
+        try:
+            job = job_conn.recv()
+        except EOFError:  # pragma: no cover
+            # the pool has gone away
+            break
+        if job is None:
+            break
+
+        job_id, func, args, kwargs = job
+        try:
+            result = func(*args, **kwargs)
+            exception = None
+        except Exception as e:
+            result = None
+            exception = (e, traceback.format_exc())
+
+            # the parent can only receive picklable Exceptions
+            try:
+                pickle.dumps(e)
+            except Exception:  # pragma: no cover
+                exception = (Exception(str(e)), exception[1])
+
+        # a result which can't be pickled fails the job without taking the worker
+        try:
+            data = multiprocessing.reduction.ForkingPickler.dumps(
+                (job_id, result, exception)
+            )
+        except Exception as e:
+            data = multiprocessing.reduction.ForkingPickler.dumps(
+                (job_id, None, (Exception(str(e)), traceback.format_exc()))
+            )
+
+        result_conn.send_bytes(data)
+
+
+def start_process_group(pid=0):
+    """
+    Makes a process (this one if 0) the leader of a new process group, which the
+    processes it starts belong to. Nothing is done where process groups are not
+    supported.
+
+    Parameters
+    ----------
+        pid : int
+            default : 0
+    """
+    if not hasattr(os, "setpgid"):  # pragma: no cover
+        return
+
+    try:
+        os.setpgid(pid, 0)
+    except OSError:  # pragma: no cover
+        # the process has already exited, or already started its group
+        pass
+
+
+def kill_process_group(process):
+    """
+    Kills a process and every process of its group, so that the processes
+    started by it (like the pools of `utils.parallel_solver`) don't keep running.
+
+    Parameters
+    ----------
+        process : :class:`multiprocessing.Process`
+            The leader of the process group, see `start_process_group`.
+    """
+    if hasattr(os, "killpg"):
+        try:
+            # the group is only the process' own if it is leading it
+            if os.getpgid(process.pid) == process.pid:
+                os.killpg(process.pid, signal.SIGKILL)
+        except OSError:  # pragma: no cover
+            # the process has already exited
+            pass
+    process.kill()
+    process.join()
+
+
+class WorkerPool:
+    """
+    A pool of long-lived worker processes. The workers are started once, run the
+    (optional) `initializer` and then receive jobs one after another, so the cost
+    of starting a process and warming it up is paid only once. A job that takes
+    longer than `timeout` is cancelled by killing its worker (with the processes
+    started by the job), which is then replaced by a new one.
+
+    The workers are not daemonic, so a job can start processes of its own.
+
+    Parameters
+    ----------
+        processes : int
+            default : 2
+            Number of worker processes.
+        timeout : numerical
+            default : 1200
+            Time (in seconds) after which a running job is cancelled.
+        initializer : callable
+            default : None
+            Called once in every worker when it starts. Should be a module level
+            function.
+        initargs : tuple
+            default : ()
+            Arguments passed to `initializer`.
+    """
+
+    def __init__(self, processes=2, timeout=1200, initializer=None, initargs=()):
+        self.processes = processes
+        self.timeout = timeout
+        self.initializer = initializer
+        self.initargs = initargs
+        self.job_ids = itertools.count()
+        # of the form - [(job_id, func, args, kwargs)]
+        self.pending = []
+        # of the form - {worker index: (job_id, start_time)}
+        self.running = {}
+        # the jobs which couldn't be sent to a worker, of the form -
+        # [(job_id, None, (Exception, traceback))]
+        self.failed = []
+        self.workers = [self.start_worker() for i in range(processes)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def start_worker(self):
+        """
+        Starts a worker process.
+
+        Returns
+        -------
+            worker : dict
+                Of the form -
+                {
+                    "process": multiprocessing.Process,
+                    "job_conn": multiprocessing.connection.Connection,
+                    "result_conn": multiprocessing.connection.Connection
+                }
+        """
+        job_conn_recv, job_conn_send = multiprocessing.Pipe(duplex=False)
+        result_conn_recv, result_conn_send = multiprocessing.Pipe(duplex=False)
+
+        process = multiprocessing.Process(
+            target=worker,
+            args=(job_conn_recv, result_conn_send, self.initializer, self.initargs),
+            daemon=False,
+        )
+        process.start()
+        # also set here, so that the group exists even if the worker is killed
+        # before it starts
+        start_process_group(process.pid)
+
+        # the ends used by the worker are closed in this process, so that a
+        # dead worker can be detected
+        job_conn_recv.close()
+        result_conn_send.close()
+
+        return {
+            "process": process,
+            "job_conn": job_conn_send,
+            "result_conn": result_conn_recv,
+        }
+
+    def restart_worker(self, index):
+        """
+        Kills a worker and replaces it with a new one.
+
+        Parameters
+        ----------
+            index : int
+                Index of the worker in `self.workers`.
+        """
+        worker = self.workers[index]
+        kill_process_group(worker["process"])
+        worker["job_conn"].close()
+        worker["result_conn"].close()
+
+        self.workers[index] = self.start_worker()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Adds a job to the queue of the pool.
+
+        Parameters
+        ----------
+            func : callable
+                Should be a module level function. Its arguments and its return
+                value should be picklable, a job which can't be pickled finishes
+                with the pickling Exception.
+            args, kwargs
+                Arguments passed to `func`.
+
+        Returns
+        -------
+            job_id : int
+        """
+        job_id = next(self.job_ids)
+        self.pending.append((job_id, func, args, kwargs))
+        self.dispatch()
+
+        return job_id
+
+    def dispatch(self):
+        """
+        Sends the queued jobs to the idle workers.
+        """
+        for index in range(0, self.processes):
+            if index in self.running:
+                continue
+
+            while self.pending:
+                job = self.pending.pop(0)
+                # a job which can't be pickled fails without taking the worker,
+                # and is returned by the next `collect`
+                try:
+                    data = multiprocessing.reduction.ForkingPickler.dumps(job)
+                except Exception as e:
+                    self.failed.append((job[0], None, (e, traceback.format_exc())))
+                    continue
+
+                self.workers[index]["job_conn"].send_bytes(data)
+                self.running.update({index: (job[0], time.time())})
+                break
+
+    def collect(self):
+        """
+        Collects the finished jobs, cancelling the ones which have timed out.
+
+        Returns
+        -------
+            finished : list
+                Of the form -
+                [
+                    (job_id, result, exception)
+                ]
+                where exception is None or (Exception, traceback).
+        """
+        finished, self.failed = self.failed, []
+
+        for index in list(self.running):
+            job_id, start_time = self.running[index]
+            worker = self.workers[index]
+
+            if worker["result_conn"].poll():
+                try:
+                    finished.append(worker["result_conn"].recv())
+                    del self.running[index]
+                    continue
+                except EOFError:  # pragma: no cover
+                    pass
+
+            if not worker["process"].is_alive():  # pragma: no cover
+                # the worker died without sending a result
+                e = RuntimeError(
+                    "The worker exited with code " + str(worker["process"].exitcode)
+                )
+                finished.append((job_id, None, (e, "")))
+                del self.running[index]
+                self.restart_worker(index)
+            elif time.time() - start_time >= self.timeout:
+                # time-out, only the stuck worker is replaced
+                e = TimeoutError(
+                    "The job took more than " + str(self.timeout) + " seconds"
+                )
+                finished.append((job_id, None, (e, "")))
+                del self.running[index]
+                self.restart_worker(index)
+
+        return finished
+
+    def wait(self, timeout=None):
+        """
+        Waits till at least one of the submitted jobs finishes or times out.
+
+        Parameters
+        ----------
+            timeout : numerical
+                default : None
+                Maximum time (in seconds) to wait for. Waits till a job finishes
+                if None.
+
+        Returns
+        -------
+            finished : list
+                Of the form -
+                [
+                    (job_id, result, exception)
+                ]
+                where exception is None or (Exception, traceback). Empty if
+                nothing finished within `timeout`.
+        """
+        self.dispatch()
+        if self.failed:
+            return self.collect()
+        deadline = time.time() + timeout if timeout is not None else None
+
+        while self.running:
+            # wake up for the oldest job's time-out
+            wait_until = min(start for _, start in self.running.values())
+            wait_until += self.timeout
+            if deadline is not None:
+                wait_until = min(wait_until, deadline)
+
+            multiprocessing.connection.wait(
+                [self.workers[index]["result_conn"] for index in self.running]
+                + [self.workers[index]["process"].sentinel for index in self.running],
+                timeout=max(0, wait_until - time.time()),
+            )
+
+            finished = self.collect()
+            self.dispatch()
+
+            if finished or (deadline is not None and time.time() >= deadline):
+                return finished
+
+        return []
+
+    def run(self, func, *args, **kwargs):
+        """
+        Runs a single job in the pool and waits for its result. Should not be used
+        while other submitted jobs are running.
+
+        Parameters
+        ----------
+            func : callable
+                Should be a module level function. Its arguments and its return
+                value should be picklable.
+            args, kwargs
+                Arguments passed to `func`.
+
+        Returns
+        -------
+            result
+                The value returned by `func`. The Exception raised by `func` (or a
+                TimeoutError) is raised again.
+        """
+        job_id = self.submit(func, *args, **kwargs)
+
+        while True:
+            for finished_job_id, result, exception in self.wait():
+                if finished_job_id != job_id:  # pragma: no cover
+                    continue
+                if exception is not None:
+                    raise exception[0]
+                return result
+
+    def close(self):
+        """
+        Stops all the workers.
+        """
+        for worker in self.workers:
+            try:
+                worker["job_conn"].send(None)
+            except (BrokenPipeError, OSError):  # pragma: no cover
+                pass
+
+        for worker in self.workers:
+            worker["process"].join(5)
+            if worker["process"].is_alive():  # pragma: no cover
+                kill_process_group(worker["process"])
+            worker["job_conn"].close()
+            worker["result_conn"].close()
+
+        self.pending = []
+        self.running = {}
+        self.failed = []
@@ -1,7 +1,7 @@
 import os
 import pybamm
 import unittest
-from bot.twitter_api.upload import Upload
+from bot.twitter_api.upload import Upload, MediaStream, StatusPoller
 from bot.plotting.random_plot_generator import random_plot_generator
 
 
@@ -85,6 +85,47 @@ class TestUpload(unittest.TestCase):
 
         os.remove(plot)
 
+    def test_media_stream(self):
+        return_dict = {}
+        random_plot_generator(
+            return_dict,
+            "model comparison",
+            {
+                "chemistry": "Chen2020",
+                "models_for_comp": {
+                    0: pybamm.lithium_ion.DFN(),
+                    1: pybamm.lithium_ion.SPM(),
+                },
+                "is_experiment": False,
+                "cycle": None,
+                "number": None,
+                "param_to_vary_info": None,
+                "bounds": None,
+                "params": pybamm.ParameterValues(
+                    "Chen2020"
+                ),
+                "varied_values_override": None,
+            },
+            True,
+            media_stream=MediaStream(),
+        )
+
+        # the GIF was uploaded while it was encoded
+        self.assertIsNotNone(return_dict["media_id"])
+        # the processing of the GIF is followed by the caller
+        self.assertEqual(
+            StatusPoller(
+                Upload(), return_dict["media_id"], return_dict["processing_info"]
+            ).wait()["state"],
+            "succeeded",
+        )
+        self.assertEqual(
+            return_dict["plot_settings"]["total_bytes"],
+            os.path.getsize(return_dict["plot"]),
+        )
+
+        os.remove(return_dict["plot"])
+
 
 if __name__ == "__main__":
     unittest.main()
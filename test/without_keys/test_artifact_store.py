@@ -0,0 +1,59 @@
+import os
+import shutil
+import unittest
+import pybamm
+from PIL import Image
+from bot.utils.artifact_store import ArtifactStore
+
+
+class TestArtifactStore(unittest.TestCase):
+    def setUp(self):
+        self.store_dir = "test_artifact_store"
+        self.config = {
+            "chemistry": "Chen2020",
+            "models_for_comp": {
+                0: pybamm.lithium_ion.SPM(),
+                1: pybamm.lithium_ion.DFN(),
+            },
+            "is_experiment": False,
+            "cycle": None,
+            "number": None,
+            "param_to_vary_info": None,
+            "params": pybamm.ParameterValues("Chen2020"),
+            "varied_values_override": None,
+        }
+        Image.new("RGB", (100, 100)).save("plot.gif")
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+        os.remove("plot.gif")
+
+    def test_artifact_store(self):
+        artifact_store = ArtifactStore(self.store_dir)
+
+        key = artifact_store.generate_key("model comparison", self.config)
+        self.assertEqual(
+            key, artifact_store.generate_key("model comparison", dict(self.config))
+        )
+        self.assertNotEqual(
+            key, artifact_store.generate_key("parameter comparison", self.config)
+        )
+
+        self.assertIsNone(artifact_store.get(key))
+
+        artifact_store.put(key, "plot.gif")
+        path, total_bytes = artifact_store.get(key)
+
+        self.assertTrue(path.endswith(".gif"))
+        self.assertEqual(total_bytes, os.path.getsize("plot.gif"))
+
+        # the least recently used plot is evicted once the store is full
+        artifact_store.max_size = total_bytes * 1.5
+        artifact_store.put("other", "plot.gif")
+
+        self.assertIsNone(artifact_store.get(key))
+        self.assertIsNotNone(artifact_store.get("other"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import shutil
+import unittest
+import pybamm
+from bot.utils.checkpoint_store import CheckpointStore
+
+
+class TestCheckpointStore(unittest.TestCase):
+    def setUp(self):
+        self.checkpoint_dir = "test_checkpoints"
+        self.model = pybamm.lithium_ion.SPM()
+        self.params = pybamm.ParameterValues("Chen2020")
+        sim = pybamm.Simulation(self.model, parameter_values=self.params)
+        sim.solve([0, 600])
+        self.solution = sim.solution
+
+    def tearDown(self):
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+
+    def test_checkpoint_store(self):
+        checkpoint_store = CheckpointStore(self.checkpoint_dir)
+        key = checkpoint_store.generate_key(self.model, "Chen2020", self.params)
+
+        self.assertIsNone(checkpoint_store.get(key))
+
+        checkpoint_store.put(key, self.solution)
+        self.assertTrue(os.path.exists(checkpoint_store.path(key)))
+        self.assertEqual(checkpoint_store.get(key).t[-1], self.solution.t[-1])
+
+        checkpoint_store.remove(key)
+        self.assertIsNone(checkpoint_store.get(key))
+
+        # removing a checkpoint which doesn't exist does nothing
+        checkpoint_store.remove(key)
+
+
+if __name__ == "__main__":
+    unittest.main()
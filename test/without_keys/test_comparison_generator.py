@@ -1,6 +1,9 @@
+import shutil
+import tempfile
 import unittest
 import pybamm
 from bot.plotting.comparison_generator import ComparisonGenerator
+from bot.utils.solution_cache import SolutionCache
 import os
 
 
@@ -241,5 +244,139 @@ class TestComparisonGenerator(unittest.TestCase):
         assert os.path.exists("plot.gif")
 
 
+class TestComparisonGeneratorOutputDir(unittest.TestCase):
+    def setUp(self):
+        self.output_dirs = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+
+    def tearDown(self):
+        for output_dir in self.output_dirs:
+            shutil.rmtree(output_dir)
+
+    def test_output_dir(self):
+        for output_dir in self.output_dirs:
+            comparison_generator = ComparisonGenerator(
+                models_for_comp={"SPM": pybamm.lithium_ion.SPM()},
+                chemistry="Chen2020",
+                is_experiment=False,
+                param_to_vary_info={
+                    "Current function [A]": {
+                        "print_name": None,
+                        "bounds": (None, None),
+                    }
+                },
+                params=pybamm.ParameterValues("Chen2020"),
+                varied_values_override=[5.2, 5.4],
+                output_dir=output_dir,
+            )
+
+            comparison_generator.parameter_comparison(testing=True)
+
+            self.assertEqual(
+                comparison_generator.plot, os.path.join(output_dir, "plot.gif")
+            )
+            # only the GIF is left in the output directory
+            self.assertEqual(os.listdir(output_dir), ["plot.gif"])
+
+
+class TestComparisonGeneratorParallel(unittest.TestCase):
+    def test_parallel_solve(self):
+        params = pybamm.ParameterValues("Chen2020")
+        parameter_values_for_comp = {0: params, 1: params.copy()}
+        parameter_values_for_comp[1]["Current function [A]"] = 2.5
+
+        solutions = []
+        for processes in [1, 2]:
+            comparison_generator = ComparisonGenerator(
+                models_for_comp={
+                    "SPM": pybamm.lithium_ion.SPM(),
+                    "SPMe": pybamm.lithium_ion.SPMe(),
+                },
+                chemistry="Chen2020",
+                is_experiment=False,
+                params=params,
+                processes=processes,
+            )
+            solutions.append(
+                comparison_generator.solve(parameter_values_for_comp, [0, 3600])
+            )
+
+        # the pool returns the solutions in the order of pybamm.BatchStudy
+        self.assertEqual(len(solutions[0]), 4)
+        for batch_solution, pool_solution in zip(*solutions):
+            self.assertEqual(
+                batch_solution.all_models[0].name, pool_solution.all_models[0].name
+            )
+            self.assertAlmostEqual(
+                batch_solution["Time [s]"].entries[-1],
+                pool_solution["Time [s]"].entries[-1],
+            )
+
+
+class TestComparisonGeneratorSolutionCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_cache_hits(self):
+        params = pybamm.ParameterValues("Chen2020")
+        parameter_values_for_comp = {0: params, 1: params.copy()}
+        parameter_values_for_comp[1]["Current function [A]"] = 2.5
+
+        comparison_generator = ComparisonGenerator(
+            models_for_comp={"SPM": pybamm.lithium_ion.SPM()},
+            chemistry="Chen2020",
+            is_experiment=False,
+            params=params,
+            solution_cache=SolutionCache(self.cache_dir),
+        )
+
+        solutions = comparison_generator.solve(parameter_values_for_comp, [0, 3600])
+        self.assertEqual(comparison_generator.cache_hits, 0)
+
+        # solved before, so loaded from the cache
+        cached_solutions = comparison_generator.solve(
+            parameter_values_for_comp, [0, 3600]
+        )
+        self.assertEqual(comparison_generator.cache_hits, 2)
+        for solution, cached_solution in zip(solutions, cached_solutions):
+            self.assertAlmostEqual(
+                solution["Time [s]"].entries[-1],
+                cached_solution["Time [s]"].entries[-1],
+            )
+
+    def test_partial_cache_hits(self):
+        params = pybamm.ParameterValues("Chen2020")
+        parameter_values_for_comp = {0: params, 1: params.copy()}
+        parameter_values_for_comp[1]["Nominal cell capacity [A.h]"] = 2.5
+
+        comparison_generator = ComparisonGenerator(
+            models_for_comp={"SPM": pybamm.lithium_ion.SPM()},
+            chemistry="Chen2020",
+            is_experiment=True,
+            params=params,
+            cycle=[("Discharge at 1C for 10 minutes", "Rest for 5 minutes")],
+            number=1,
+            solution_cache=SolutionCache(self.cache_dir),
+        )
+        comparison_generator.solve(parameter_values_for_comp)
+        self.assertEqual(comparison_generator.cache_hits, 0)
+
+        # only the new parameter values are solved
+        parameter_values_for_comp.update({2: params.copy()})
+        parameter_values_for_comp[2]["Nominal cell capacity [A.h]"] = 1.5
+        solutions = comparison_generator.solve(parameter_values_for_comp)
+        self.assertEqual(comparison_generator.cache_hits, 2)
+        self.assertEqual(len(solutions), 3)
+        # 1C is the nominal capacity of every parameter set
+        for solution, current in zip(solutions, [5, 2.5, 1.5]):
+            self.assertAlmostEqual(solution["Current [A]"].entries[0], current)
+
+        # and stored for the next time
+        comparison_generator.solve(parameter_values_for_comp)
+        self.assertEqual(comparison_generator.cache_hits, 3)
+
+
 if __name__ == "__main__":
     unittest.main()
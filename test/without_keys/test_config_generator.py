@@ -1,6 +1,10 @@
+import os
+import shutil
+import tempfile
 import unittest
 import pybamm
 from bot.plotting.config_generator import config_generator
+from bot.utils.cost_estimator import CostEstimator, CostExceeded
 
 
 class TestConfigGenerator(unittest.TestCase):
@@ -185,3 +189,26 @@ class TestConfigGenerator(unittest.TestCase):
         self.assertIsNone(config["param_to_vary_info"])
         self.assertIsInstance(config["params"], pybamm.ParameterValues)
         self.assertIsNone(config["varied_values_override"])
+
+    def test_config_generator_cost_estimator(self):
+        history_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, history_dir)
+        history_file = os.path.join(history_dir, "cost_history.json")
+
+        # the 500 cycles of a degradation comparison are reduced to fit in the budget
+        cost_estimator = CostEstimator(history_file, budget=100, min_history=0)
+        config = config_generator(
+            "degradation comparison", cost_estimator=cost_estimator
+        )
+        self.assertGreaterEqual(config["number"], 1)
+        self.assertLess(config["number"], 500)
+        self.assertLessEqual(
+            cost_estimator.estimate("degradation comparison", config), 100
+        )
+
+        # rejected if not even a single cycle fits in the budget
+        with self.assertRaises(CostExceeded):
+            config_generator(
+                "degradation comparison",
+                cost_estimator=CostEstimator(budget=1, min_history=0),
+            )
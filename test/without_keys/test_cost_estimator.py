@@ -0,0 +1,212 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+import pybamm
+from bot.utils.cost_estimator import CostEstimator, CostExceeded, step_duration
+
+
+class TestCostEstimator(unittest.TestCase):
+    def setUp(self):
+        self.history_dir = tempfile.mkdtemp()
+        self.history_file = os.path.join(self.history_dir, "cost_history.json")
+        self.params = pybamm.ParameterValues("Chen2020")
+        self.config = {
+            "chemistry": "Chen2020",
+            "models_for_comp": {
+                0: pybamm.lithium_ion.SPM(),
+                1: pybamm.lithium_ion.DFN(),
+            },
+            "is_experiment": True,
+            "cycle": [
+                (
+                    "Discharge at 1 C until 3.3 V",
+                    "Rest for 10 minutes",
+                    "Charge at C/2 until 4.1 V",
+                    "Hold at 4.1 V until 50 mA",
+                )
+            ],
+            "number": 10,
+            "params": self.params,
+            "param_to_vary_info": None,
+            "varied_values_override": None,
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.history_dir)
+
+    def test_step_duration(self):
+        self.assertEqual(step_duration("Discharge at 2 C until 3.3 V", 5), 0.5)
+        self.assertEqual(step_duration("Discharge at C/10 until 3.3 V", 5), 10)
+        self.assertEqual(step_duration("Charge at 1 A until 4.1 V", 5), 5)
+        self.assertEqual(step_duration("Charge at 500 mA until 4.1 V", 5), 10)
+        self.assertEqual(step_duration("Rest for 30 minutes", 5), 0.5)
+        self.assertEqual(step_duration("Discharge at C/10 for 2 hours", 5), 2)
+        self.assertEqual(step_duration("Hold at 4.1 V until 50 mA", 5), 0.5)
+
+    def test_estimate(self):
+        cost_estimator = CostEstimator(self.history_file)
+        estimate = cost_estimator.estimate("model comparison", self.config)
+        self.assertGreater(estimate, 0)
+
+        # longer experiments, heavier models and options cost more
+        longer_config = dict(self.config, number=20)
+        self.assertGreater(
+            cost_estimator.estimate("model comparison", longer_config), estimate
+        )
+        dfn_config = dict(
+            self.config,
+            models_for_comp={
+                0: pybamm.lithium_ion.DFN(),
+                1: pybamm.lithium_ion.DFN(),
+            },
+        )
+        self.assertGreater(
+            cost_estimator.estimate("model comparison", dfn_config), estimate
+        )
+        sei_config = dict(
+            self.config,
+            models_for_comp={
+                0: pybamm.lithium_ion.SPM({"SEI": "reaction limited"}),
+                1: pybamm.lithium_ion.DFN(),
+            },
+        )
+        self.assertGreater(
+            cost_estimator.estimate("model comparison", sei_config), estimate
+        )
+
+        # a single discharge costs less than 10 cycles
+        discharge_config = dict(
+            self.config, is_experiment=False, cycle=None, number=None
+        )
+        self.assertLess(
+            cost_estimator.estimate("model comparison", discharge_config), estimate
+        )
+
+        # the simulations of a parameter comparison
+        parameter_config = dict(
+            self.config,
+            models_for_comp={0: pybamm.lithium_ion.SPM()},
+            varied_values_override=[1, 2],
+        )
+        self.assertEqual(
+            len(cost_estimator.simulations("parameter comparison", parameter_config)),
+            2,
+        )
+
+    def test_history(self):
+        cost_estimator = CostEstimator(self.history_file, max_history=3)
+        estimate = cost_estimator.estimate("model comparison", self.config)
+        self.assertEqual(cost_estimator.load_history(), [])
+
+        # the estimates follow the recorded runtimes
+        cost_estimator.record("model comparison", self.config, 2 * estimate)
+        self.assertAlmostEqual(
+            cost_estimator.estimate("model comparison", self.config), 2 * estimate
+        )
+
+        # configurations of another kind use all the runtimes
+        other_config = dict(self.config, chemistry="Marquis2019")
+        fixed_cost, cycle_cost = cost_estimator.heuristic(
+            "model comparison", other_config
+        )
+        heuristic = fixed_cost + 10 * cycle_cost
+        self.assertAlmostEqual(
+            cost_estimator.estimate("model comparison", other_config),
+            2 * heuristic,
+        )
+        cost_estimator.record("model comparison", other_config, heuristic)
+        self.assertAlmostEqual(
+            cost_estimator.estimate("model comparison", other_config), heuristic
+        )
+
+        # only the last `max_history` runtimes are kept
+        for _ in range(3):
+            cost_estimator.record("model comparison", self.config, estimate)
+        with open(self.history_file) as f:
+            history = json.load(f)
+        self.assertEqual(len(history), 3)
+        self.assertAlmostEqual(
+            cost_estimator.estimate("model comparison", self.config), estimate
+        )
+
+    def test_fit(self):
+        # nothing is reduced before enough runtimes are recorded
+        cost_estimator = CostEstimator(self.history_file, min_history=1)
+        self.assertFalse(cost_estimator.calibrated())
+        self.assertEqual(
+            cost_estimator.fit("model comparison", dict(self.config), 1)["number"], 10
+        )
+        cost_estimator.record(
+            "model comparison",
+            self.config,
+            cost_estimator.estimate("model comparison", self.config),
+        )
+        self.assertTrue(cost_estimator.calibrated())
+
+        estimate = cost_estimator.estimate("model comparison", self.config)
+
+        # nothing to do without a budget or within the budget
+        self.assertEqual(
+            cost_estimator.fit("model comparison", dict(self.config))["number"], 10
+        )
+        self.assertEqual(
+            cost_estimator.fit("model comparison", dict(self.config), estimate)[
+                "number"
+            ],
+            10,
+        )
+
+        # fewer cycles to fit in a smaller budget
+        fixed_cost, cycle_cost = cost_estimator.costs("model comparison", self.config)
+        budget = fixed_cost + 4.5 * cycle_cost
+        self.assertEqual(
+            cost_estimator.max_number("model comparison", self.config, budget), 4
+        )
+        config = cost_estimator.fit("model comparison", dict(self.config), budget)
+        self.assertEqual(config["number"], 4)
+        self.assertLessEqual(cost_estimator.estimate("model comparison", config), budget)
+
+        # rejected if a single cycle does not fit
+        with self.assertRaises(CostExceeded) as context:
+            cost_estimator.fit("model comparison", dict(self.config), fixed_cost)
+        self.assertEqual(context.exception.max_number, 0)
+        self.assertEqual(context.exception.budget, fixed_cost)
+
+        # a configuration which is not an experiment can only be rejected
+        discharge_config = dict(
+            self.config, is_experiment=False, cycle=None, number=None
+        )
+        self.assertIsNone(
+            cost_estimator.max_number("model comparison", discharge_config, 1)
+        )
+        with self.assertRaises(CostExceeded):
+            cost_estimator.fit("model comparison", discharge_config, 1)
+
+    def test_concurrent_record(self):
+        processes = [
+            multiprocessing.Process(
+                target=record_runtimes, args=(self.history_file, self.config, 20)
+            )
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        # no entry is lost
+        history = CostEstimator(self.history_file).load_history()
+        self.assertEqual(len(history), 80)
+
+
+def record_runtimes(history_file, config, number):
+    cost_estimator = CostEstimator(history_file)
+    for i in range(number):
+        cost_estimator.record("model comparison", config, i)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,14 @@
 import unittest
 import pybamm
-from bot.plotting.degradation_comparison_generator import DegradationComparisonGenerator
+import matplotlib.pyplot as plt
+from bot.plotting.degradation_comparison_generator import (
+    DegradationComparisonGenerator,
+    solve_variant,
+)
 import os
+import shutil
+from bot.utils.checkpoint_store import CheckpointStore
+from bot.utils.progress_callback import ProgressCallback
 
 
 class TestDegradationComparisonGenerator(unittest.TestCase):
@@ -69,9 +76,192 @@ class TestDegradationComparisonGenerator(unittest.TestCase):
         for solution in degradation_comparison_generator.solutions:
             self.assertIsInstance(solution, pybamm.Solution)
 
+        figures = plt.get_fignums()
         degradation_comparison_generator.generate_summary_variables()
 
         assert os.path.exists("plot.png")
+        # the figure is closed after it is saved
+        self.assertEqual(plt.get_fignums(), figures)
+
+    def test_save_at_cycles(self):
+        degradation_comparison_generator = DegradationComparisonGenerator(
+            self.model,
+            self.chemistry,
+            self.param_values_mohtat,
+            self.degradation_parameter,
+            self.cycle,
+            3,
+            save_at_cycles=[3],
+        )
+
+        degradation_comparison_generator.solve()
+
+        for solution, summary_variables in zip(
+            degradation_comparison_generator.solutions,
+            degradation_comparison_generator.summary_variables,
+        ):
+            # the summary variables of every cycle are kept
+            self.assertEqual(len(summary_variables["Cycle number"]), 3)
+            # but only the first and the last cycles are kept in full
+            self.assertIsNotNone(solution.cycles[0])
+            self.assertIsNone(solution.cycles[1])
+            self.assertIsNotNone(solution.cycles[2])
+
+        degradation_comparison_generator.generate_summary_variables()
+
+        assert os.path.exists("plot.png")
+
+    def test_time_budget(self):
+        degradation_comparison_generator = DegradationComparisonGenerator(
+            self.model,
+            self.chemistry,
+            self.param_values_mohtat,
+            self.degradation_parameter,
+            self.cycle,
+            3,
+            time_budget=0,
+        )
+
+        degradation_comparison_generator.solve()
+
+        # both the variants are stopped after their first cycle, and are plotted
+        self.assertEqual(len(degradation_comparison_generator.stopped_early), 2)
+        for solution, summary_variables in zip(
+            degradation_comparison_generator.solutions,
+            degradation_comparison_generator.summary_variables,
+        ):
+            self.assertIsNone(solution)
+            self.assertEqual(len(summary_variables["Cycle number"]), 1)
+
+        degradation_comparison_generator.generate_summary_variables()
+
+        assert os.path.exists("plot.png")
+
+    def test_checkpoints(self):
+        checkpoint_store = CheckpointStore("test_checkpoints")
+
+        def kill(progress):
+            # the process is killed during the second cycle of the first variant
+            if progress["cycles completed"] == 2:
+                raise RuntimeError("killed")
+
+        degradation_comparison_generator = DegradationComparisonGenerator(
+            self.model,
+            self.chemistry,
+            self.param_values_mohtat[:1],
+            self.degradation_parameter,
+            self.cycle,
+            3,
+            report=kill,
+            checkpoint_store=checkpoint_store,
+            checkpoint_every=1,
+        )
+        with self.assertRaisesRegex(RuntimeError, "killed"):
+            degradation_comparison_generator.solve()
+
+        # the first cycle was checkpointed
+        self.assertEqual(len(os.listdir("test_checkpoints")), 1)
+
+        progress = []
+        degradation_comparison_generator.report = progress.append
+        degradation_comparison_generator.solve()
+
+        # the experiment continues from the checkpoint
+        self.assertEqual([x["cycles completed"] for x in progress], [2, 3])
+        self.assertEqual(degradation_comparison_generator.cache_hits, 1)
+        summary_variables = degradation_comparison_generator.summary_variables[0]
+        self.assertEqual(len(summary_variables["Cycle number"]), 3)
+        self.assertEqual(len(degradation_comparison_generator.solutions[0].cycles), 3)
+        self.assertEqual(os.listdir("test_checkpoints"), [])
+
+        degradation_comparison_generator.generate_summary_variables()
+
+        assert os.path.exists("plot.png")
+        shutil.rmtree("test_checkpoints")
+
+
+class TestSolveVariant(unittest.TestCase):
+    def test_termination_at_chunk_end(self):
+        model = pybamm.lithium_ion.SPM(options={"SEI": "electron-migration limited"})
+        parameter_values = pybamm.ParameterValues("Mohtat2020")
+        cycle = [
+            (
+                "Discharge at 2 C until 3.6 V",
+                "Charge at 3 C until 3.8 V",
+                "Hold at 3.8 V until 98 mA",
+                "Rest for 4 minutes",
+            )
+        ]
+        # the capacity (about 4.97 A.h) is below the termination after the first
+        # cycle, which is also the last cycle of the first chunk
+        experiment = pybamm.Experiment(cycle * 3, termination="5 Ah capacity")
+        checkpoint_store = CheckpointStore("test_checkpoints")
+
+        for store in [None, checkpoint_store]:
+            callback = ProgressCallback("test")
+            solution, summary_variables, _ = solve_variant(
+                model,
+                parameter_values,
+                experiment,
+                {},
+                callback,
+                checkpoint_store=store,
+                checkpoint_key="test" if store is not None else None,
+                checkpoint_every=1,
+            )
+
+            # chunked or not, the experiment stops at its termination
+            self.assertEqual(len(solution.all_summary_variables), 1)
+            self.assertEqual(len(summary_variables["Cycle number"]), 1)
+            self.assertEqual(callback.termination, "capacity")
+
+        self.assertEqual(os.listdir("test_checkpoints"), [])
+        shutil.rmtree("test_checkpoints")
+
+    def test_save_at_cycles_in_chunks(self):
+        model = pybamm.lithium_ion.SPM(options={"SEI": "electron-migration limited"})
+        parameter_values = pybamm.ParameterValues("Mohtat2020")
+        cycle = [
+            (
+                "Discharge at 2 C until 3.6 V",
+                "Charge at 3 C until 3.8 V",
+                "Hold at 3.8 V until 98 mA",
+                "Rest for 4 minutes",
+            )
+        ]
+        experiment = pybamm.Experiment(cycle * 4)
+
+        # the number of full cycles in every checkpoint
+        saved_cycles = []
+
+        class Store(CheckpointStore):
+            def put(self, key, solution):
+                saved_cycles.append(
+                    len([x for x in solution.cycles if x is not None])
+                )
+                super().put(key, solution)
+
+        solution, summary_variables, _ = solve_variant(
+            model,
+            parameter_values,
+            experiment,
+            {"save_at_cycles": [4]},
+            ProgressCallback("test"),
+            checkpoint_store=Store("test_checkpoints"),
+            checkpoint_key="test",
+            checkpoint_every=1,
+        )
+
+        # only the first cycle (and the last one, once it is solved) is kept in
+        # full, not the first and the last cycles of every chunk
+        self.assertEqual(saved_cycles, [1, 1, 1])
+        self.assertEqual(len(solution.cycles), 4)
+        self.assertEqual(len([x for x in solution.cycles if x is not None]), 2)
+        self.assertIsNotNone(solution.cycles[0])
+        self.assertIsNotNone(solution.cycles[3])
+        self.assertEqual(len(summary_variables["Cycle number"]), 4)
+
+        shutil.rmtree("test_checkpoints")
 
 
 if __name__ == "__main__":
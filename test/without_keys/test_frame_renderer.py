@@ -0,0 +1,157 @@
+import os
+import unittest
+import pybamm
+import numpy as np
+from bot.utils.frame_renderer import QuickPlotFrames, adaptive_time_array
+from bot.utils.gif_encoder import encode_gif
+from PIL import Image, ImageChops
+
+
+class TestQuickPlotFrames(unittest.TestCase):
+    def setUp(self):
+        sim = pybamm.Simulation(pybamm.lithium_ion.SPM())
+        sim.solve([0, 3600])
+        self.quick_plot = pybamm.QuickPlot(sim.solution)
+        self.frames = QuickPlotFrames(self.quick_plot, number_of_frames=3, duration=200)
+
+    def test_frames(self):
+        files = os.listdir(".")
+
+        frames = list(self.frames.frames([0, 2], (1080, 1080)))
+        self.assertEqual(len(frames), 2)
+        for frame, duration in frames:
+            self.assertEqual(frame.mode, "RGB")
+            self.assertEqual(max(frame.size), 1080)
+            self.assertLessEqual(min(frame.size), 1080)
+            self.assertEqual(duration, 200)
+
+        # the frames are rendered at the requested resolution
+        frame = self.frames.render(2, (720, 720))
+        self.assertEqual(max(frame.size), 720)
+
+        # nothing is written to the disk
+        self.assertEqual(os.listdir("."), files)
+
+    def test_blitting(self):
+        self.assertTrue(self.frames.can_blit())
+        frames = [frame for frame, _ in self.frames.frames([0, 1, 2], (720, 720))]
+
+        # the blitted frames are the same as the frames drawn from scratch
+        for i, frame in enumerate(frames):
+            fresh_frame = self.frames.render(i, (720, 720))
+            self.assertIsNone(ImageChops.difference(frame, fresh_frame).getbbox())
+
+        # the figure is closed once the frames are rendered
+        self.assertIsNone(self.frames.fig)
+
+    def test_interpolate(self):
+        self.frames.interpolate()
+
+        for key, variable_lists in self.quick_plot.variables.items():
+            if variable_lists[0][0].dimensions != 1:
+                self.assertNotIn(key, self.frames.arrays)
+                continue
+            spatial_vars = self.quick_plot.spatial_variable_dict[key]
+            variable = variable_lists[0][0]
+            array = self.frames.arrays[key][0][0]
+            self.assertEqual(array.shape[0], 3)
+            for i, t in enumerate(self.frames.time_array):
+                np.testing.assert_array_equal(
+                    array[i],
+                    variable(
+                        t * self.quick_plot.time_scaling_factor,
+                        **spatial_vars,
+                        warn=False,
+                    ),
+                )
+
+    def test_without_blitting(self):
+        sim = pybamm.Simulation(pybamm.lithium_ion.SPM())
+        sim.solve([0, 3600])
+        frames = QuickPlotFrames(
+            pybamm.QuickPlot(sim.solution, variable_limits="tight"),
+            number_of_frames=3,
+        )
+        self.assertFalse(frames.can_blit())
+
+        frames = list(frames.frames([0, 1, 2], (720, 720)))
+        self.assertEqual(len(frames), 3)
+        for frame, duration in frames:
+            self.assertEqual(max(frame.size), 720)
+            self.assertEqual(duration, 100)
+
+    def test_parallel(self):
+        frames = QuickPlotFrames(
+            self.quick_plot, number_of_frames=3, duration=200, processes=2
+        )
+        parallel_frames = list(frames.frames([0, 1, 2], (720, 720)))
+        serial_frames = list(self.frames.frames([0, 1, 2], (720, 720)))
+
+        # the frames are rendered in chunks but are yielded in order
+        self.assertEqual(len(parallel_frames), 3)
+        for (frame, _), (serial_frame, _) in zip(parallel_frames, serial_frames):
+            self.assertIsNone(ImageChops.difference(frame, serial_frame).getbbox())
+
+        # the same GIF is encoded
+        encode_gif(frames, "parallel.gif", resolutions=[(720, 720)])
+        encode_gif(self.frames, "serial.gif", resolutions=[(720, 720)])
+        with open("parallel.gif", "rb") as f, open("serial.gif", "rb") as g:
+            self.assertEqual(f.read(), g.read())
+
+        os.remove("parallel.gif")
+        os.remove("serial.gif")
+
+    def test_encode_gif(self):
+        settings = encode_gif(self.frames, "plot.gif")
+
+        self.assertFalse(settings["compressed"])
+        self.assertEqual(settings["number_of_frames"], 3)
+
+        gif = Image.open("plot.gif")
+        self.assertEqual(gif.size, settings["size"])
+        self.assertEqual(max(gif.size), 1440)
+        self.assertEqual(gif.n_frames, 3)
+        self.assertEqual(gif.info["duration"], 200)
+        gif.close()
+
+        os.remove("plot.gif")
+
+
+class TestAdaptiveTimeArray(unittest.TestCase):
+    def test_adaptive_time_array(self):
+        experiment = pybamm.Experiment(
+            ["Discharge at 1C for 20 minutes", "Rest for 2 hours"]
+        )
+        sim = pybamm.Simulation(pybamm.lithium_ion.SPM(), experiment=experiment)
+        quick_plot = pybamm.QuickPlot(sim.solve())
+
+        time_array = adaptive_time_array(quick_plot, max_frames=40)
+        self.assertEqual(len(time_array), 40)
+        self.assertAlmostEqual(time_array[0], quick_plot.min_t)
+        self.assertAlmostEqual(time_array[-1], quick_plot.max_t)
+        self.assertTrue((np.diff(time_array) > 0).all())
+
+        # the frames are denser during the discharge than at the end of the rest
+        discharge = np.sum(time_array <= 1 / 3)
+        end_of_rest = np.sum(time_array >= quick_plot.max_t - 1 / 3)
+        self.assertGreater(discharge, 2 * end_of_rest)
+
+        # the frames are evenly spaced in time if nothing changes
+        sim = pybamm.Simulation(
+            pybamm.lithium_ion.SPM(),
+            experiment=pybamm.Experiment(["Rest for 2 hours"]),
+        )
+        quick_plot = pybamm.QuickPlot(sim.solve())
+        time_array = adaptive_time_array(quick_plot, max_frames=40)
+        self.assertLess(len(time_array), 40)
+        np.testing.assert_allclose(
+            time_array,
+            np.linspace(quick_plot.min_t, quick_plot.max_t, len(time_array)),
+        )
+
+        frames = QuickPlotFrames(quick_plot, number_of_frames=40, adaptive=True)
+        self.assertEqual(frames.number_of_frames, len(time_array))
+
+
+if __name__ == "__main__":
+    unittest.main()
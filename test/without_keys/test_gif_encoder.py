@@ -0,0 +1,146 @@
+import os
+import unittest
+from PIL import Image, ImageDraw
+from bot.utils.gif_writer import GifWriter
+from bot.utils.gif_encoder import encode_gif, read_settings
+
+
+class TestGifEncoder(unittest.TestCase):
+    def setUp(self):
+        self.path = "test_gif_encoder.gif"
+        with GifWriter(self.path) as writer:
+            for i in range(12):
+                frame = Image.new("RGB", (1600, 800), "white")
+                draw = ImageDraw.Draw(frame)
+                for j in range(20):
+                    draw.line(
+                        [(0, 40 * j), (1600, 40 * j + 10 * i)],
+                        fill=(10 * j, 100, 255 - 10 * j),
+                        width=3,
+                    )
+                writer.write_frame(frame, duration=100)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_encode_gif(self):
+        settings = encode_gif(self.path, self.path)
+
+        # the best settings fit in Twitter's limit
+        self.assertFalse(settings["compressed"])
+        self.assertEqual(settings["resolution"], (1440, 1440))
+        self.assertEqual(settings["size"], (1440, 720))
+        self.assertEqual(settings["frame_step"], 1)
+        self.assertEqual(settings["number_of_frames"], 12)
+        self.assertEqual(settings["total_bytes"], os.path.getsize(self.path))
+
+        gif = Image.open(self.path)
+        self.assertEqual(gif.size, (1440, 720))
+        self.assertEqual(gif.n_frames, 12)
+        gif.close()
+
+        settings.pop("estimated_bytes")
+        self.assertEqual(read_settings(self.path), settings)
+
+    def test_encode_gif_compressed(self):
+        max_bytes = os.path.getsize(self.path) // 2
+        settings = encode_gif(self.path, "compressed.gif", max_bytes=max_bytes)
+
+        self.assertTrue(settings["compressed"])
+        self.assertLessEqual(os.path.getsize("compressed.gif"), max_bytes)
+        self.assertEqual(settings["total_bytes"], os.path.getsize("compressed.gif"))
+
+        # the smallest candidate is used if none of them fit
+        settings = encode_gif(self.path, "compressed.gif", max_bytes=1)
+        self.assertTrue(settings["compressed"])
+        self.assertEqual(settings["resolution"], (720, 720))
+        self.assertEqual(read_settings("compressed.gif")["compressed"], True)
+
+        gif = Image.open("compressed.gif")
+        self.assertEqual(gif.size, settings["size"])
+        self.assertEqual(gif.n_frames, settings["number_of_frames"])
+        self.assertEqual(gif.info["duration"], 100 * settings["frame_step"])
+        gif.close()
+
+        os.remove("compressed.gif")
+
+        self.assertIsNone(read_settings(self.path))
+
+    def test_encode_gif_stream(self):
+        stream = Stream()
+        settings = encode_gif(self.path, "streamed.gif", stream=stream)
+        self.addCleanup(os.remove, "streamed.gif")
+
+        # the GIF is streamed while it is encoded and padded to the announced size
+        self.assertTrue(stream.closed)
+        self.assertEqual(settings["media_id"], 1)
+        # the processing of the upload is left to the caller
+        self.assertEqual(settings["processing_info"], {"state": "pending"})
+        self.assertEqual(len(stream.data), stream.total_bytes)
+        # the GIF on disk is the streamed GIF without its padding
+        with open("streamed.gif", "rb") as f:
+            data = f.read()
+        self.assertTrue(bytes(stream.data).startswith(data[:-1]))
+        self.assertEqual(settings["total_bytes"], len(data))
+        self.assertLessEqual(settings["total_bytes"], stream.total_bytes)
+        self.assertEqual(read_settings("streamed.gif")["number_of_frames"], 12)
+
+        # the stream is aborted if the GIF is bigger than the estimate
+        stream = Stream()
+        settings = encode_gif(
+            self.path, "streamed.gif", stream=stream, safety_factor=0.5
+        )
+        self.assertTrue(stream.aborted)
+        self.assertIsNone(settings["media_id"])
+        self.assertIsNone(settings["processing_info"])
+        self.assertGreater(settings["total_bytes"], stream.total_bytes)
+        self.assertEqual(read_settings("streamed.gif")["number_of_frames"], 12)
+
+        # or if it is so much smaller that it would be mostly padding, and it is
+        # written without padding then
+        stream = Stream()
+        settings = encode_gif(self.path, "streamed.gif", stream=stream, safety_factor=3)
+        self.assertTrue(stream.aborted)
+        self.assertFalse(stream.closed)
+        self.assertIsNone(settings["media_id"])
+        self.assertLess(settings["total_bytes"], stream.total_bytes / 2)
+        self.assertEqual(read_settings("streamed.gif")["number_of_frames"], 12)
+
+        # or if the upload fails
+        stream = Stream(fail=True)
+        settings = encode_gif(self.path, "streamed.gif", stream=stream)
+        self.assertTrue(stream.aborted)
+        self.assertIsNone(settings["media_id"])
+        self.assertEqual(read_settings("streamed.gif")["number_of_frames"], 12)
+
+
+class Stream:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.data = bytearray()
+        self.total_bytes = None
+        self.media_id = None
+        self.processing_info = None
+        self.closed = False
+        self.aborted = False
+
+    def start(self, total_bytes):
+        self.total_bytes = total_bytes
+        self.media_id = 1
+
+    def write(self, data):
+        self.data += data
+
+    def close(self):
+        if self.fail:
+            raise RuntimeError("The upload failed")
+        self.closed = True
+        self.processing_info = {"state": "pending"}
+
+    def abort(self):
+        self.aborted = True
+        self.media_id = None
+
+
+if __name__ == "__main__":
+    unittest.main()
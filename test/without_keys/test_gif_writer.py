@@ -0,0 +1,97 @@
+import io
+import os
+import unittest
+from PIL import Image, ImageDraw
+from bot.utils.gif_writer import GifWriter, padding_comment
+
+
+class TestGifWriter(unittest.TestCase):
+    def setUp(self):
+        self.path = "test_gif_writer.gif"
+        self.frames = []
+        for i in range(3):
+            frame = Image.new("RGB", (200, 100), "white")
+            ImageDraw.Draw(frame).rectangle([10 + 40 * i, 10, 40 + 40 * i, 40], "red")
+            self.frames.append(frame)
+        # an unchanged frame
+        self.frames.append(self.frames[-1].copy())
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_gif_writer(self):
+        with GifWriter(self.path, loop=1000) as writer:
+            for frame in self.frames:
+                writer.write_frame(frame, duration=200)
+
+            # nothing is written to `path` till the writer is closed
+            self.assertFalse(os.path.exists(self.path))
+
+        self.assertEqual(writer.number_of_frames, 4)
+
+        gif = Image.open(self.path)
+        self.assertEqual(gif.size, (200, 100))
+        self.assertEqual(gif.n_frames, 4)
+        self.assertEqual(gif.info["loop"], 1000)
+
+        for i, frame in enumerate(self.frames):
+            gif.seek(i)
+            self.assertEqual(gif.info["duration"], 200)
+            self.assertEqual(
+                list(gif.convert("RGB").getdata()), list(frame.getdata())
+            )
+        gif.close()
+
+    def test_abort(self):
+        with self.assertRaises(ValueError):
+            with GifWriter(self.path) as writer:
+                writer.write_frame(self.frames[0])
+                raise ValueError
+
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(writer.tmp_path))
+
+    def test_stream(self):
+        stream = io.BytesIO()
+        writer = GifWriter(self.path, stream=stream)
+        for frame in self.frames:
+            writer.write_frame(frame, duration=200)
+        total_bytes = writer.bytes_written + 1000
+        writer.close(total_bytes)
+
+        # the streamed GIF is padded to `total_bytes` without changing its frames
+        self.assertEqual(len(stream.getvalue()), total_bytes)
+        gif = Image.open(io.BytesIO(stream.getvalue()))
+        self.assertEqual(gif.n_frames, 4)
+        gif.seek(3)
+        self.assertEqual(
+            list(gif.convert("RGB").getdata()), list(self.frames[3].getdata())
+        )
+        gif.close()
+
+        # but the GIF on disk isn't padded
+        with open(self.path, "rb") as f:
+            data = f.read()
+        self.assertEqual(len(data), total_bytes - 1000)
+        self.assertTrue(stream.getvalue().startswith(data[:-1]))
+        self.assertEqual(data[-1:], b";")
+
+        # the GIF is still written if it is bigger than `total_bytes`
+        writer = GifWriter(self.path)
+        writer.write_frame(self.frames[0])
+        with self.assertRaises(ValueError):
+            writer.close(writer.bytes_written)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_padding_comment(self):
+        for number_of_bytes in [0, 3, 5, 258, 259, 260, 261, 100000]:
+            self.assertEqual(len(padding_comment(number_of_bytes)), number_of_bytes)
+
+        for number_of_bytes in [-1, 1, 2, 4]:
+            with self.assertRaises(ValueError):
+                padding_comment(number_of_bytes)
+
+
+if __name__ == "__main__":
+    unittest.main()
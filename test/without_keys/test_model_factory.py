@@ -0,0 +1,72 @@
+import unittest
+import pybamm
+import pickle
+from bot.utils.model_factory import (
+    ModelSpec,
+    build_model,
+    freeze,
+    from_specs,
+    to_specs,
+)
+
+
+class TestModelFactory(unittest.TestCase):
+    def test_freeze(self):
+        self.assertEqual(freeze(None), ())
+        self.assertEqual(freeze({}), ())
+        self.assertEqual(
+            freeze({"SEI": "reaction limited", "SEI porosity change": "true"}),
+            freeze({"SEI porosity change": "true", "SEI": "reaction limited"}),
+        )
+        hash(freeze({"particle mechanics": ("swelling only", "none")}))
+
+    def test_build_model(self):
+        model = build_model(pybamm.lithium_ion.SPM)
+
+        self.assertIsInstance(model, pybamm.lithium_ion.SPM)
+        self.assertIs(build_model(pybamm.lithium_ion.SPM, None), model)
+        self.assertIsNot(build_model(pybamm.lithium_ion.SPMe), model)
+
+        options = {"SEI": "reaction limited", "SEI porosity change": "true"}
+        model_with_options = build_model(pybamm.lithium_ion.SPM, options)
+
+        self.assertIsNot(model_with_options, model)
+        self.assertEqual(model_with_options.options["SEI"], "reaction limited")
+        self.assertIs(
+            build_model(pybamm.lithium_ion.SPM, dict(reversed(options.items()))),
+            model_with_options,
+        )
+
+    def test_specs(self):
+        options = {"SEI": "reaction limited"}
+        model = build_model(pybamm.lithium_ion.SPM, options)
+        other_model = pybamm.lithium_ion.SPMe()
+        config = {
+            "model": model,
+            "models_for_comp": {0: model, 1: other_model},
+            "chemistry": "Chen2020",
+        }
+
+        spec_config = to_specs(config)
+
+        # the built models are replaced by their specs, the others are kept
+        self.assertIsInstance(spec_config["model"], ModelSpec)
+        self.assertEqual(spec_config["model"].options, options)
+        self.assertIsInstance(spec_config["models_for_comp"][0], ModelSpec)
+        self.assertIs(spec_config["models_for_comp"][1], other_model)
+        self.assertEqual(spec_config["chemistry"], "Chen2020")
+        # the given configuration is unchanged
+        self.assertIs(config["model"], model)
+
+        # the models are looked up again after the specs are sent to a process
+        built_config = from_specs(pickle.loads(pickle.dumps(spec_config)))
+
+        self.assertIs(built_config["model"], model)
+        self.assertIs(built_config["models_for_comp"][0], model)
+        self.assertIsInstance(
+            built_config["models_for_comp"][1], pybamm.lithium_ion.SPMe
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import pybamm
+from bot.utils.parallel_solver import parallel_solve, solve_simulation
+
+
+class TestParallelSolver(unittest.TestCase):
+    def setUp(self):
+        self.model = pybamm.lithium_ion.SPM()
+        self.params = []
+        for current in [5, 2.5]:
+            params = pybamm.ParameterValues("Chen2020")
+            params["Current function [A]"] = current
+            self.params.append(params)
+
+    def test_solve_simulation(self):
+        solution = solve_simulation(
+            self.model, self.params[0], solve_kwargs={"t_eval": [0, 3600]}
+        )
+
+        self.assertIsInstance(solution, pybamm.Solution)
+
+    def test_parallel_solve(self):
+        jobs = [
+            (self.model, params, None, {"t_eval": [0, 3600]}) for params in self.params
+        ]
+
+        solutions = parallel_solve(jobs, processes=2)
+
+        self.assertEqual(len(solutions), 2)
+        for solution in solutions:
+            self.assertIsInstance(solution, pybamm.Solution)
+
+        # the solutions are returned in the order of the jobs
+        self.assertLess(
+            solutions[0]["Time [s]"].entries[-1],
+            solutions[1]["Time [s]"].entries[-1],
+        )
+        self.assertEqual(
+            [len(solution.t) for solution in solutions],
+            [len(solution.t) for solution in parallel_solve(jobs, processes=1)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
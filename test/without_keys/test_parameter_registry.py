@@ -0,0 +1,41 @@
+import unittest
+import pybamm
+from bot.utils.parameter_registry import (
+    get_metadata,
+    get_parameter_values,
+    load_parameter_values,
+)
+
+
+class TestParameterRegistry(unittest.TestCase):
+    def test_parameter_registry(self):
+        chemistry = "Chen2020"
+
+        # loaded only once
+        self.assertIs(load_parameter_values(chemistry), load_parameter_values(chemistry))
+
+        params = get_parameter_values(chemistry)
+
+        self.assertIsInstance(params, pybamm.ParameterValues)
+        self.assertIsNot(params, load_parameter_values(chemistry))
+
+        # the copies can be modified without changing the loaded parameter values
+        params["Current function [A]"] = 1
+        self.assertEqual(
+            get_parameter_values(chemistry)["Current function [A]"],
+            pybamm.ParameterValues(chemistry)["Current function [A]"],
+        )
+
+        self.assertEqual(
+            get_metadata(chemistry),
+            {
+                "citation": "Chen2020",
+                "nominal capacity": 5.0,
+                "default current": 5.0,
+            },
+        )
+        self.assertEqual(get_metadata("Ai2020")["citation"], "Ai2019")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import time
+import unittest
+import numpy as np
+from bot.utils.progress_callback import ProgressCallback, TimeBudgetExceeded
+
+
+class TestProgressCallback(unittest.TestCase):
+    def setUp(self):
+        self.progress = []
+        self.logs = [
+            {
+                "cycle number": (i + 1, 3),
+                "summary variables": {"Capacity [A.h]": capacity, "x_0": 0.1 * i},
+            }
+            for i, capacity in enumerate([5, 4.5, 4])
+        ]
+
+    def test_progress_callback(self):
+        callback = ProgressCallback("test", report=self.progress.append)
+        callback.on_experiment_start({})
+        for logs in self.logs:
+            callback.on_cycle_end(logs)
+
+        self.assertEqual(len(self.progress), 3)
+        self.assertEqual(self.progress[-1]["label"], "test")
+        self.assertEqual(self.progress[-1]["cycles completed"], 3)
+        self.assertEqual(self.progress[-1]["total cycles"], 3)
+        self.assertAlmostEqual(self.progress[0]["capacity fade"], 0)
+        self.assertAlmostEqual(self.progress[-1]["capacity fade"], 0.2)
+        self.assertGreaterEqual(self.progress[-1]["elapsed time"], 0)
+
+        summary_variables = callback.summary_variables()
+        np.testing.assert_array_equal(summary_variables["Cycle number"], [1, 2, 3])
+        np.testing.assert_array_equal(summary_variables["Capacity [A.h]"], [5, 4.5, 4])
+        np.testing.assert_allclose(summary_variables["x_0"], [0, 0.1, 0.2])
+
+    def test_termination(self):
+        callback = ProgressCallback("test", report=self.progress.append)
+        callback.on_experiment_start({})
+        for logs in self.logs:
+            logs.update({"stopping conditions": {"capacity": 4.2, "voltage": None}})
+            callback.on_cycle_end(logs)
+            if logs["cycle number"][0] < 3:
+                self.assertIsNone(callback.termination)
+        self.assertEqual(callback.termination, "capacity")
+
+        # every solve starts without a termination
+        callback.on_experiment_start({})
+        self.assertIsNone(callback.termination)
+        callback.on_experiment_infeasible({})
+        self.assertEqual(callback.termination, "infeasible")
+
+    def test_deadline(self):
+        callback = ProgressCallback(
+            "test", deadline=time.time() - 1, report=self.progress.append
+        )
+        callback.on_experiment_start({})
+
+        # the experiment is stopped at the end of the first cycle
+        with self.assertRaisesRegex(TimeBudgetExceeded, "stopped after 1 cycles"):
+            callback.on_cycle_end(self.logs[0])
+        self.assertEqual(len(self.progress), 1)
+        self.assertEqual(len(callback.summary_variables()["Cycle number"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
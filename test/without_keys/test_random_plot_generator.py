@@ -1,7 +1,11 @@
 import unittest
 import pybamm
 import multiprocessing
-from bot.plotting.random_plot_generator import random_plot_generator
+from bot.plotting.random_plot_generator import random_plot_generator, warm_up
+from bot.plotting.config_generator import chemistries, degradation_chemistry
+
+# the registry of the modules imported by the bot, see test/__init__.py
+from utils.parameter_registry import parameter_values
 import os
 
 
@@ -177,6 +181,13 @@ class TestRandomPlotGenerator(unittest.TestCase):
         self.assertIsInstance(return_dict["is_experiment"], bool)
         self.assertIsInstance(return_dict["is_comparison"], bool)
 
+    def test_warm_up(self):
+        warm_up()
+
+        # every chemistry which can be chosen is loaded
+        for chemistry in chemistries + [degradation_chemistry]:
+            self.assertIn(chemistry, parameter_values)
+
 
 if __name__ == "__main__":
     unittest.main()
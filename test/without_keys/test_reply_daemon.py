@@ -0,0 +1,149 @@
+import time
+import tweepy
+import asyncio
+import tempfile
+import unittest
+from bot.utils.worker_pool import WorkerPool
+from bot.twitter_api.upload import StatusPoller
+from bot.twitter_api.reply_daemon import ReplyDaemon
+
+
+class Mention:
+    def __init__(self, mention_id):
+        self._json = {"id": mention_id}
+
+
+class Reply:
+    # reads the given requests once, and records the replies instead of
+    # posting them
+    def __init__(self, requests, worker_pool, jobs_dir):
+        self.requests = list(requests)
+        self.worker_pool = worker_pool
+        self.jobs_dir = jobs_dir
+        self.artifact_store = None
+        self.replies = []
+        self.exceptions = []
+
+    def read_mentions(self):
+        requests, self.requests = self.requests, []
+        return requests
+
+    def get_worker_pool(self):
+        return self.worker_pool
+
+    def plot_job(self, choice, reply_config, output_dir):
+        # a job whose arguments can't be sent to a worker
+        if choice == "unpicklable":
+            return make_plot, (choice,), {"duration": lambda: 0}
+        return make_plot, (choice,), {"duration": reply_config["duration"]}
+
+    def upload_plot(self, plot, media_type=None, media_id=None, processing_info=None):
+        # a media which needs no processing
+        return StatusPoller(
+            self, media_id if media_id is not None else plot, processing_info
+        )
+
+    def plot_reply(self, mention, plot, media_type=None, settings=None, media_id=None):
+        return {"in_reply_to_status_id": mention._json["id"], "media_ids": media_id}
+
+    def post_reply(self, mention, reply, result):
+        self.replies.append((reply, result["state"], time.time()))
+
+    def reply_with_exception(self, mention, exception):
+        self.exceptions.append((mention._json["id"], type(exception)))
+        if mention._json["id"] == 4:
+            raise tweepy.TweepyException("The reply failed")
+
+
+def make_plot(choice, duration):
+    if choice == "invalid":
+        raise Exception("The test is working")
+    time.sleep(duration)
+    return {
+        "plot": f"{choice}.gif",
+        "media_type": "image/gif",
+        "plot_settings": None,
+        "media_id": None,
+        "processing_info": None,
+    }
+
+
+class TestReplyDaemon(unittest.TestCase):
+    def test_reply_daemon(self):
+        requests = [
+            (Mention(1), "slow", {"duration": 2}),
+            (Mention(2), "fast", {"duration": 0}),
+            (Mention(3), "invalid", {"duration": 0}),
+        ]
+
+        with WorkerPool(processes=2, timeout=10) as worker_pool:
+            reply = Reply(requests, worker_pool, tempfile.mkdtemp())
+            daemon = ReplyDaemon(reply, poll_interval=0.1, pool_interval=0.1)
+
+            start_time = time.time()
+            asyncio.run(daemon.run(iterations=2))
+
+        # every request is answered, the fast ones before the slow one
+        self.assertEqual(
+            [reply for reply, _, _ in reply.replies],
+            [
+                {"in_reply_to_status_id": 2, "media_ids": "fast.gif"},
+                {"in_reply_to_status_id": 1, "media_ids": "slow.gif"},
+            ],
+        )
+        self.assertEqual([state for _, state, _ in reply.replies], ["succeeded"] * 2)
+        self.assertEqual(reply.exceptions, [(3, Exception)])
+        self.assertLess(reply.replies[0][2] - start_time, 1.5)
+
+        self.assertEqual(daemon.jobs, {})
+        self.assertEqual(daemon.tasks, set())
+
+    def test_pool_failure(self):
+        requests = [
+            (Mention(1), "unpicklable", {}),
+            (Mention(2), "fast", {"duration": 0}),
+            (Mention(3), "unpicklable", {}),
+            (Mention(4), "unpicklable", {}),
+        ]
+
+        with WorkerPool(processes=1, timeout=10) as worker_pool:
+            reply = Reply(requests, worker_pool, tempfile.mkdtemp())
+            daemon = ReplyDaemon(reply, poll_interval=0.1, pool_interval=0.1)
+
+            asyncio.run(asyncio.wait_for(daemon.run(iterations=1), 30))
+
+        # the jobs which couldn't be sent fail on their own, and a failed reply
+        # doesn't cancel the others
+        self.assertEqual(
+            [reply for reply, _, _ in reply.replies],
+            [{"in_reply_to_status_id": 2, "media_ids": "fast.gif"}],
+        )
+        mention_ids = sorted(mention_id for mention_id, _ in reply.exceptions)
+        self.assertEqual(mention_ids, [1, 3, 4])
+        self.assertEqual(daemon.jobs, {})
+        self.assertIsNone(daemon.submitting)
+
+    def test_pump_failure(self):
+        reply = Reply(
+            [(Mention(1), "fast", {"duration": 0})], BrokenPool(), tempfile.mkdtemp()
+        )
+        daemon = ReplyDaemon(reply, poll_interval=0.1, pool_interval=0.1)
+
+        # the simulation fails instead of waiting forever
+        asyncio.run(asyncio.wait_for(daemon.run(iterations=1), 30))
+        self.assertEqual(reply.exceptions, [(1, RuntimeError)])
+        self.assertEqual(daemon.jobs, {})
+
+
+class BrokenPool:
+    # a pool which loses every submitted job
+    pending = []
+    running = {}
+    failed = []
+
+    def submit(self, func, *args, **kwargs):
+        raise RuntimeError("The pool is broken")
+
+
+if __name__ == "__main__":
+    unittest.main()
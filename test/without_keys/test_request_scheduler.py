@@ -0,0 +1,179 @@
+import time
+import unittest
+import requests
+import multiprocessing
+from bot.twitter_api.request_scheduler import RequestScheduler
+
+
+def response(status_code, headers={}):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    response.url = "https://upload.twitter.com/1.1/media/upload.json"
+    response._content = b""
+    return response
+
+
+class Session:
+    # returns the given responses one after another, and raises the exceptions
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.times = []
+
+    def request(self, method, url, **kwargs):
+        self.times.append(time.time())
+        next_response = self.responses.pop(0)
+        if isinstance(next_response, Exception):
+            raise next_response
+        return next_response
+
+
+class TestRequestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.url = "https://upload.twitter.com/1.1/media/upload.json"
+
+    def test_success(self):
+        scheduler = RequestScheduler(Session([response(200)]))
+        self.assertEqual(scheduler.post(self.url, data={}).status_code, 200)
+        self.assertEqual(scheduler.counters["requests"], 1)
+        self.assertEqual(scheduler.counters["retries"], 0)
+
+    def test_server_error(self):
+        session = Session(
+            [response(503), requests.ConnectionError(), response(500), response(200)]
+        )
+        scheduler = RequestScheduler(session, backoff=0.05, jitter=0)
+
+        self.assertEqual(scheduler.get(self.url).status_code, 200)
+        self.assertEqual(scheduler.counters["server errors"], 2)
+        self.assertEqual(scheduler.counters["connection errors"], 1)
+        self.assertEqual(scheduler.counters["retries"], 3)
+
+        # exponential backoff
+        waits = [b - a for a, b in zip(session.times, session.times[1:])]
+        self.assertGreaterEqual(waits[0], 0.05)
+        self.assertGreaterEqual(waits[1], 0.1)
+        self.assertGreaterEqual(waits[2], 0.2)
+
+        # gives up after `max_retries`
+        scheduler = RequestScheduler(
+            Session([response(500), response(500)]), max_retries=1, backoff=0.01
+        )
+        with self.assertRaises(requests.HTTPError):
+            scheduler.get(self.url)
+        self.assertEqual(scheduler.counters["failures"], 1)
+
+    def test_client_error(self):
+        session = Session([response(400), response(200)])
+        scheduler = RequestScheduler(session)
+
+        # not retried
+        with self.assertRaises(requests.HTTPError):
+            scheduler.post(self.url)
+        self.assertEqual(scheduler.counters["client errors"], 1)
+        self.assertEqual(scheduler.counters["retries"], 0)
+        self.assertEqual(len(session.responses), 1)
+
+    def test_redirect(self):
+        session = Session([response(304), response(200)])
+        scheduler = RequestScheduler(session)
+
+        # raised instead of being returned as a success, and not retried
+        with self.assertRaises(requests.HTTPError):
+            scheduler.get(self.url)
+        self.assertEqual(scheduler.counters["retries"], 0)
+        self.assertEqual(len(session.responses), 1)
+
+    def test_unknown_status(self):
+        session = Session([response(199), response(200)])
+        scheduler = RequestScheduler(session)
+
+        with self.assertRaises(requests.HTTPError):
+            scheduler.get(self.url)
+        self.assertEqual(scheduler.counters["retries"], 0)
+
+    def test_rate_limit(self):
+        reset = time.time() + 0.3
+        session = Session(
+            [
+                response(
+                    200,
+                    {"x-rate-limit-remaining": "0", "x-rate-limit-reset": str(reset)},
+                ),
+                response(200),
+            ]
+        )
+        scheduler = RequestScheduler(session)
+
+        scheduler.get(self.url)
+        self.assertEqual(
+            scheduler.limits["upload.twitter.com/1.1/media/upload.json"],
+            {"remaining": 0, "reset": reset},
+        )
+
+        # waits until the limit resets
+        scheduler.get(self.url)
+        self.assertGreaterEqual(session.times[1], reset)
+        self.assertLess(session.times[1], reset + 0.2)
+        self.assertEqual(scheduler.counters["rate limit waits"], 1)
+
+        # other endpoints are not limited
+        scheduler.session = Session([response(200)])
+        start_time = time.time()
+        scheduler.get("https://api.twitter.com/1.1/statuses/update.json")
+        self.assertLess(time.time() - start_time, 0.1)
+
+    def test_shared_limits(self):
+        reset = time.time() + 0.3
+        with multiprocessing.Manager() as manager:
+            limits = manager.dict()
+            limits_lock = manager.Lock()
+
+            # the limit is learnt by a scheduler in another process
+            process = multiprocessing.Process(
+                target=get_limited, args=(self.url, reset, limits, limits_lock)
+            )
+            process.start()
+            process.join()
+
+            # and followed by this one
+            session = Session([response(200)])
+            scheduler = RequestScheduler(
+                session, limits=limits, limits_lock=limits_lock
+            )
+            scheduler.get(self.url)
+            self.assertGreaterEqual(session.times[0], reset)
+            self.assertEqual(scheduler.counters["rate limit waits"], 1)
+
+    def test_retry_after(self):
+        session = Session([response(429, {"Retry-After": "0.2"}), response(200)])
+        scheduler = RequestScheduler(session, backoff=10)
+
+        self.assertEqual(scheduler.post(self.url).status_code, 200)
+        self.assertGreaterEqual(session.times[1] - session.times[0], 0.2)
+        self.assertLess(session.times[1] - session.times[0], 1)
+        self.assertEqual(scheduler.counters["throttled"], 1)
+
+        self.assertIsNone(scheduler.retry_after(response(503)))
+        self.assertEqual(
+            scheduler.retry_after(
+                response(503, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+            ),
+            0,
+        )
+
+
+def get_limited(url, reset, limits, limits_lock):
+    session = Session(
+        [
+            response(
+                200,
+                {"x-rate-limit-remaining": "0", "x-rate-limit-reset": str(reset)},
+            )
+        ]
+    )
+    RequestScheduler(session, limits=limits, limits_lock=limits_lock).get(url)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -60,6 +60,51 @@ class TestResizeGif(unittest.TestCase):
         self.assertTrue(height <= 1440)
         self.assertTrue(os.stat("plot.gif").st_size <= 15000000)
 
+    def test_resize_gif_multiple(self):
+        resize_gif(
+            "plot.gif",
+            [(1080, 1080), (1440, 1440)],
+            save_as=["plot_1080.gif", "plot_1440.gif"],
+        )
+
+        for path, length in [("plot_1080.gif", 1080), ("plot_1440.gif", 1440)]:
+            gif = Image.open(path)
+            self.assertEqual(gif.size[0], length)
+            self.assertEqual(gif.n_frames, 3)
+            gif.close()
+            os.remove(path)
+
+    def test_resize_gif_multiple_default_names(self):
+        gif = Image.open("plot.gif")
+        size = gif.size
+        gif.close()
+
+        resize_gif("plot.gif", [(1080, 1080), (1440, 1440)])
+
+        for path, length in [
+            ("plot_1080x1080.gif", 1080),
+            ("plot_1440x1440.gif", 1440),
+        ]:
+            gif = Image.open(path)
+            self.assertEqual(gif.size[0], length)
+            gif.close()
+            os.remove(path)
+
+        # the given GIF is not overwritten
+        gif = Image.open("plot.gif")
+        self.assertEqual(gif.size, size)
+        gif.close()
+
+    def test_resize_gif_multiple_wrong_names(self):
+        with self.assertRaisesRegex(ValueError, "one path for every dimensions"):
+            resize_gif(
+                "plot.gif", [(1080, 1080), (1440, 1440)], save_as=["plot_1080.gif"]
+            )
+        with self.assertRaisesRegex(ValueError, "one path for every dimensions"):
+            resize_gif("plot.gif", [(1080, 1080)], save_as="plot_1080.gif")
+
+        self.assertFalse(os.path.exists("plot_1080.gif"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,107 @@
+import os
+import shutil
+import unittest
+import multiprocessing
+import numpy as np
+import pybamm
+from bot.utils.solution_cache import SolutionCache
+from bot.utils.canonical_hash import canonical_hash
+
+
+class TestSolutionCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = "test_solution_cache"
+        self.model = pybamm.lithium_ion.SPM()
+        self.chemistry = "Chen2020"
+        self.params = pybamm.ParameterValues(self.chemistry)
+        sim = pybamm.Simulation(self.model, parameter_values=self.params)
+        sim.solve([0, 600])
+        self.solution = sim.solution
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_canonical_hash(self):
+        params = self.params.copy()
+        self.assertEqual(canonical_hash(params), canonical_hash(self.params))
+
+        params["Ambient temperature [K]"] = 300
+        self.assertNotEqual(canonical_hash(params), canonical_hash(self.params))
+
+        # floating point noise should not change the hash
+        self.assertEqual(
+            canonical_hash({"t_eval": [0, 3600.0000000000005]}),
+            canonical_hash({"t_eval": [0, 3600]}),
+        )
+
+        self.assertEqual(
+            canonical_hash(pybamm.lithium_ion.SPM()),
+            canonical_hash(self.model),
+        )
+        self.assertNotEqual(
+            canonical_hash(pybamm.lithium_ion.SPMe()),
+            canonical_hash(self.model),
+        )
+
+    def test_canonical_hash_in_processes(self):
+        # the same configuration gets the same key in another process
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            self.assertEqual(pool.apply(config_key), config_key())
+
+        # an object without a canonical form isn't hashed by its address
+        with self.assertRaises(TypeError):
+            canonical_hash({"solver": object()})
+
+    def test_solution_cache(self):
+        solution_cache = SolutionCache(self.cache_dir)
+
+        key = solution_cache.generate_key(
+            self.model, self.chemistry, self.params, t_eval=[0, 600]
+        )
+
+        self.assertEqual(
+            key,
+            solution_cache.generate_key(
+                pybamm.lithium_ion.SPM(),
+                self.chemistry,
+                self.params.copy(),
+                t_eval=[0, 600],
+            ),
+        )
+        self.assertNotEqual(
+            key,
+            solution_cache.generate_key(
+                self.model, self.chemistry, self.params, t_eval=[0, 700]
+            ),
+        )
+
+        self.assertIsNone(solution_cache.get(key))
+
+        solution_cache.put(key, self.solution)
+
+        self.assertTrue(os.path.exists(solution_cache.path(key)))
+        solution = solution_cache.get(key)
+        self.assertIsInstance(solution, pybamm.Solution)
+        self.assertEqual(solution.t[-1], self.solution.t[-1])
+
+        # the least recently used solution is evicted once the cache is full
+        solution_cache.max_size = os.path.getsize(solution_cache.path(key)) * 1.5
+        solution_cache.put("other", self.solution)
+
+        self.assertFalse(os.path.exists(solution_cache.path(key)))
+        self.assertTrue(os.path.exists(solution_cache.path("other")))
+
+
+def config_key():
+    return canonical_hash(
+        {
+            "model": pybamm.lithium_ion.SPM({"SEI": "reaction limited"}),
+            "params": pybamm.ParameterValues("Chen2020"),
+            "number": np.int64(2),
+            "bounds": (np.float64(0.1), None),
+        }
+    )
+
+
+if __name__ == "__main__":
+    unittest.main()
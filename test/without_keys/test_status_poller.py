@@ -0,0 +1,113 @@
+import time
+import asyncio
+import unittest
+from bot.twitter_api.upload import StatusPoller
+
+
+class Response:
+    def __init__(self, processing_info):
+        self.processing_info = processing_info
+
+    def json(self):
+        return {"processing_info": self.processing_info}
+
+
+class Scheduler:
+    # returns the given processing states one after another
+    def __init__(self, states):
+        self.states = list(states)
+        self.requests = 0
+
+    def get(self, url, params, auth, max_retries=None):
+        self.requests += 1
+        state = self.states.pop(0)
+        if state == "failed":
+            return Response({"state": state, "error": {"name": "InvalidMedia"}})
+        return Response({"state": state, "check_after_secs": 0.1})
+
+
+class Upload:
+    media_endpoint_url = "https://upload.twitter.com/1.1/media/upload.json"
+    oauth = None
+
+    def __init__(self, states):
+        self.scheduler = Scheduler(states)
+
+
+class TestStatusPoller(unittest.TestCase):
+    def setUp(self):
+        self.processing_info = {"state": "pending", "check_after_secs": 0.1}
+
+    def test_status_poller(self):
+        upload = Upload(["in_progress", "succeeded"])
+        status_poller = StatusPoller(
+            upload, 1, self.processing_info, max_interval=0.2, jitter=0
+        )
+
+        # nothing is requested before the check is due
+        self.assertIsNone(status_poller.poll())
+        self.assertEqual(upload.scheduler.requests, 0)
+        self.assertGreater(status_poller.seconds_until_next_check(), 0)
+
+        result = status_poller.wait()
+        self.assertEqual(result["media_id"], 1)
+        self.assertEqual(result["state"], "succeeded")
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["checks"], 2)
+        self.assertEqual(status_poller.seconds_until_next_check(), 0)
+
+        # a media which needs no processing
+        self.assertEqual(StatusPoller(upload, 2).poll()["state"], "succeeded")
+
+    def test_failed(self):
+        status_poller = StatusPoller(
+            Upload(["failed"]), 1, self.processing_info, max_interval=0.2
+        )
+        result = status_poller.wait()
+
+        self.assertEqual(result["state"], "failed")
+        self.assertEqual(result["error"], {"name": "InvalidMedia"})
+
+    def test_timed_out(self):
+        status_poller = StatusPoller(
+            Upload(["in_progress"] * 100),
+            1,
+            self.processing_info,
+            max_wait=0.5,
+            max_interval=0.2,
+        )
+        start_time = time.time()
+        result = status_poller.wait()
+
+        self.assertEqual(result["state"], "timed out")
+        self.assertLess(time.time() - start_time, 1)
+
+    def test_wait_async(self):
+        status_poller = StatusPoller(
+            Upload(["in_progress", "succeeded"]),
+            1,
+            self.processing_info,
+            max_interval=0.2,
+        )
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(time.time())
+                await asyncio.sleep(0.05)
+
+        async def wait():
+            ticker = asyncio.create_task(tick())
+            result = await status_poller.wait_async()
+            ticker.cancel()
+            return result
+
+        result = asyncio.run(wait())
+
+        # the event loop kept running while the status was polled
+        self.assertEqual(result["state"], "succeeded")
+        self.assertGreater(len(ticks), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import time
+import tempfile
+import unittest
+import multiprocessing
+from bot.utils.worker_pool import WorkerPool
+
+
+class TestWorkerPool(unittest.TestCase):
+    def test_worker_pool(self):
+        with WorkerPool(processes=2, timeout=5, initializer=set_warm) as pool:
+            # the workers are reused for every job
+            self.assertEqual(pool.run(get_pid), pool.run(get_pid))
+            self.assertTrue(pool.run(is_warm))
+
+            self.assertEqual(pool.run(add, 2, b=3), 5)
+
+            with self.assertRaisesRegex(Exception, "The test is working"):
+                pool.run(raise_exception)
+
+            job_ids = [pool.submit(add, i, b=i) for i in range(4)]
+            results = {}
+            while len(results) < len(job_ids):
+                for job_id, result, exception in pool.wait():
+                    self.assertIsNone(exception)
+                    results.update({job_id: result})
+
+            self.assertEqual(
+                [results[job_id] for job_id in job_ids], [0, 2, 4, 6]
+            )
+
+    def test_unpicklable_job(self):
+        with WorkerPool(processes=1, timeout=5) as pool:
+            running_job_id = pool.submit(time.sleep, 0.5)
+            job_id = pool.submit(add, lambda: 1, b=1)
+            next_job_id = pool.submit(add, 1, b=1)
+
+            finished = {}
+            while len(finished) < 3:
+                for finished_job_id, result, exception in pool.wait():
+                    finished.update({finished_job_id: (result, exception)})
+
+            # only the job which can't be pickled fails
+            self.assertIsNone(finished[running_job_id][1])
+            self.assertIsInstance(finished[job_id][1][0], Exception)
+            self.assertEqual(finished[next_job_id], (2, None))
+
+            with self.assertRaises(Exception):
+                pool.run(add, lambda: 1, b=1)
+            self.assertEqual(pool.run(add, 2, b=3), 5)
+
+    def test_unpicklable_result(self):
+        with WorkerPool(processes=1, timeout=5) as pool:
+            pid = pool.run(get_pid)
+
+            # the job fails, but the worker is kept
+            with self.assertRaises(Exception):
+                pool.run(get_lambda)
+            self.assertEqual(pool.run(get_pid), pid)
+
+    def test_timeout(self):
+        with WorkerPool(processes=2, timeout=1) as pool:
+            pids = [pool.workers[i]["process"].pid for i in range(2)]
+
+            stuck_job_id = pool.submit(time.sleep, 60)
+            job_id = pool.submit(add, 1, b=1)
+
+            finished = {}
+            while len(finished) < 2:
+                for finished_job_id, result, exception in pool.wait():
+                    finished.update({finished_job_id: (result, exception)})
+
+            self.assertEqual(finished[job_id], (2, None))
+            self.assertIsInstance(finished[stuck_job_id][1][0], TimeoutError)
+
+            # only the stuck worker is replaced
+            self.assertNotEqual(pool.workers[0]["process"].pid, pids[0])
+            self.assertEqual(pool.workers[1]["process"].pid, pids[1])
+            self.assertEqual(pool.run(add, 1, b=2), 3)
+
+    def test_timeout_kills_children(self):
+        pids_file = tempfile.mktemp()
+        self.addCleanup(os.remove, pids_file)
+
+        with WorkerPool(processes=1, timeout=3) as pool:
+            job_id = pool.submit(start_children, pids_file)
+            finished = pool.wait()
+            while not finished:  # pragma: no cover
+                finished = pool.wait()
+            self.assertIsInstance(finished[0][2][0], TimeoutError)
+            self.assertEqual(finished[0][0], job_id)
+
+            # the processes started by the cancelled job are killed with it
+            with open(pids_file) as f:
+                pids = [int(pid) for pid in f.read().split()]
+            self.assertEqual(len(pids), 2)
+            deadline = time.time() + 5
+            while any(is_running(pid) for pid in pids) and time.time() < deadline:
+                time.sleep(0.1)
+            self.assertFalse(any(is_running(pid) for pid in pids))
+
+
+warm = False
+
+
+def set_warm():
+    global warm
+    warm = True
+
+
+def is_warm():
+    return warm
+
+
+def get_pid():
+    return os.getpid()
+
+
+def add(a, b=0):
+    return a + b
+
+
+def get_lambda():
+    return lambda: 1
+
+
+def raise_exception():
+    raise Exception("The test is working")
+
+
+def start_children(pids_file):
+    with multiprocessing.Pool(2) as pool:
+        pids = pool.map(get_pid_after, [0.5, 0.5])
+        with open(pids_file, "w") as f:
+            f.write(" ".join(str(pid) for pid in pids))
+        # the children keep running until the job is cancelled
+        pool.map(time.sleep, [60, 60])
+
+
+def get_pid_after(delay):
+    time.sleep(delay)
+    return os.getpid()
+
+
+def is_running(pid):
+    # a killed process which wasn't reaped yet is a zombie
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+if __name__ == "__main__":
+    unittest.main()